@@ -4,6 +4,7 @@ import math
 import data
 import common
 import copy
+import numpy as np
 from PySide.QtCore import *
 from PySide.QtGui import *
 
@@ -518,15 +519,11 @@ class CircView(QGraphicsView):
             outerPath = QPainterPath()
             outerPath.moveTo(centerPoint)
             #No. of coverage data items ranging from 249250 to 59373 -- far too much to draw..
-            #sum a number of entries as specified in bpWindow and create an average
-            if self.useCoverageLog:
-                coverageChunks = [chromo.coverageLog[i:i+self.bpWindow] for i in range(0,len(chromo.coverageLog),self.bpWindow)]
-            else:
-                coverageChunks = [chromo.coverage[i:i+self.bpWindow] for i in range(0,len(chromo.coverage),self.bpWindow)]
-            angleIncr = ((chrEndAngle) / len(coverageChunks))
+            #the average of a number of entries as specified in bpWindow is taken from the coverage pyramid
+            coverageMeans = chromo.getCoveragePyramid(self.useCoverageLog).windowStats(self.bpWindow)[0]
+            angleIncr = ((chrEndAngle) / len(coverageMeans))
             curAngle = chrStartAngle
-            for chunk in coverageChunks:
-                avgCoverage = sum(chunk) / len(chunk)
+            for avgCoverage in coverageMeans.tolist():
                 #for chromosomes up to 22, 150% of norm is max and 50% is min (default).
                 #find the tVal using linear interpolation between these two points
                 if (avgCoverage > normValue*self.maxCoverage):
@@ -586,17 +583,10 @@ class CircView(QGraphicsView):
                 curAngle_A = self.chromosome_angle_list[chrA.name][0]
                 curAngle_B = self.chromosome_angle_list[chrB.name][0]
                 #The windows of each variant (WINA, WINB) are used to determine where on the chromosome the interaction is located
-                #If chrA higher in order than chrB, WINA and WINB are switched, so check this first
-                if self.chromosomes.index(chrA) > self.chromosomes.index(chrB):
-                    bp_End_A = int(connection[3].split(',')[1])
-                    chrA_length = int(chrA.end)
-                    bp_End_B = int(connection[2].split(',')[1])
-                    chrB_length = int(chrB.end)
-                else:
-                    bp_End_A = int(connection[2].split(',')[1])
-                    chrA_length = int(chrA.end)
-                    bp_End_B = int(connection[3].split(',')[1])
-                    chrB_length = int(chrB.end)
+                bp_End_A = connection[2]
+                chrA_length = int(chrA.end)
+                bp_End_B = connection[3]
+                chrB_length = int(chrB.end)
                 #A percentage of the total angle (used to draw the chromosome in makeItems) determines where on the
                 #chromosome the connection is located
                 angleIncr_A = (1-((chrA_length - bp_End_A) / chrA_length)) * (self.chromosome_angle_list[chrA.name][1]-2)
@@ -750,8 +740,8 @@ class CircView(QGraphicsView):
 
     #Imports either a tab file with specified regions to color, or a cytoband file
     def importColorTab(self):
-        fileName = QFileDialog.getOpenFileName(None, "Specify a color tab-file", QDir.currentPath(), "tab-files (*.tab *.txt)")[0]
-        if fileName.endswith("tab"):
+        fileName = QFileDialog.getOpenFileName(None, "Specify a color tab-file", QDir.currentPath(), "tab-files (*.tab *.txt *.tab.gz *.txt.gz)")[0]
+        if fileName.replace(".gz","").endswith("tab"):
             colorTab = data.readGeneralTab(fileName)
             self.colorRegions(colorTab,False,1)
         else:
@@ -760,15 +750,13 @@ class CircView(QGraphicsView):
 
     def colorCentromeres(self):
         #Look in the cyto file definitions for acen regions, prepare a list of chromosomes and positions for these
-        cytoTab = self.dataDict['cytoTab']
         centromereRegions = []
-        for cyto in cytoTab:
-            if cyto[4] == 'acen':
-                chromoName = cyto[0]
-                cytoStart = int(cyto[1])
-                cytoEnd = int(cyto[2])
-                color = 'red'
-                centromereRegions.append([chromoName,cytoStart,cytoEnd,color])
+        for cyto in self.dataDict['cytoIndex'].stainedBands('acen'):
+            chromoName = cyto[0]
+            cytoStart = int(cyto[1])
+            cytoEnd = int(cyto[2])
+            color = 'red'
+            centromereRegions.append([chromoName,cytoStart,cytoEnd,color])
         self.colorRegions(centromereRegions,False,0.5)
 
     def colorRegions(self,colorTab,cytoband,opacity):
@@ -871,90 +859,81 @@ class CircView(QGraphicsView):
         self.initscene()
 
     def highlightVariants(self):
-        selectedVariants = []
         for chrA in self.chromosomes:
             if not chrA.display:
                 continue
-            if self.activeChromo and self.varTable and self.activeChromo.display:
-                selectedVariants = common.returnVariants(self.activeChromo,self.varTable)
-            for variant in chrA.variants:
-                if variant[9] and not variant[2].startswith("G") and not variant[2].startswith("M") and (variant in selectedVariants or variant[11]):
-                    if not self.chromosomeDict[variant[2]].display:
-                            continue
-                    chrB = self.chromosomeDict[variant[2]]
-                    #The curAngle determines where on the circle the chromosome is located (also used in makeItems)
-                    curAngle_A = self.chromosome_angle_list[chrA.name][0]
-                    curAngle_B = self.chromosome_angle_list[chrB.name][0]
-                    #The windows of each variant (WINA, WINB) are used to determine where on the chromosome the interaction is located
-                    #If chrA higher in order than chrB, WINA and WINB are switched, so check this first
-                    if "WINA" in variant[5]:
-                        
-                        if self.chromosomes.index(chrA) > self.chromosomes.index(chrB):
-                            bp_End_A = int(variant[5]["WINB"].split(',')[1])
-                            chrA_length = int(chrA.end)
-                            bp_End_B = int(variant[5]["WINA"].split(',')[1])
-                            chrB_length = int(chrB.end)
-                        else:
-                            bp_End_A = int(variant[5]["WINA"].split(',')[1])
-                            chrA_length = int(chrA.end)
-                            bp_End_B = int(variant[5]["WINB"].split(',')[1])
-                            chrB_length = int(chrB.end)
-                    else:
-                        bp_End_A = variant[1]
-                        chrA_length = int(chrA.end)
-                        bp_End_B = variant[3]
-                        chrB_length = int(chrB.end)
-                    #A percentage of the total angle (used to draw the chromosome in makeItems) determines where on the
-                    #chromosome the connection is located
-                    angleIncr_A = (1-((chrA_length - bp_End_A) / chrA_length)) * (self.chromosome_angle_list[chrA.name][1]-2)
-                    angleIncr_B = (1-((chrB_length - bp_End_B) / chrB_length)) * (self.chromosome_angle_list[chrB.name][1]-2)
-                    #A Path is created to assign the position for the connections
-                    tempPath = QPainterPath()
-                    #The arMoveTo() function is used to get the different points on each chromosome the connection is located
-                    tempPath.arcMoveTo(self.innerChrRect, - (curAngle_A + angleIncr_A))
-                    posA = tempPath.currentPosition()
-                    tempPath.arcMoveTo(self.innerChrRect, - (curAngle_B + angleIncr_B))
-                    posB = tempPath.currentPosition()
-                    centerPos = self.outerChrRect.center()
-                    #A Bezier curve is then created between these three points
-                    connectionPath = QPainterPath()
-                    connectionPath.moveTo(posA)
-                    connectionPath.quadTo(centerPos,posB)
-                    #The path is converted to a graphics path item
-                    connectionItem = QGraphicsPathItem(connectionPath)
-                    #The PathItem is given the color of chromosome B and a width (default is 1 pixel wide)
-                    pen = QPen(Qt.red, self.connWidth)
-                    pen.setStyle(Qt.DashLine)
-                    connectionItem.setPen(pen)
-                    connectionItem.setZValue(2)
-                    connectionItem.setOpacity(0.6)
-                    self.scene.addItem(connectionItem)
-
-    #Iterates through lists of regions for each chr formatted as identifier,start,end,text ..  and adds a circle layer with these regions
+            table = chrA.getVariantTable()
+            #Marked variants are shown, as well as variants selected in the variant table of the active chromosome
+            shownVariants = table.marked.copy()
+            if chrA is self.activeChromo and self.varTable:
+                shownVariants |= table.rowMask(common.returnVariantRows(self.varTable))
+            shownVariants &= table.active & ~table.chrBPrefixMask(("G","M"))
+            for row in np.flatnonzero(shownVariants):
+                variant = chrA.variants[row]
+                if not self.chromosomeDict[variant.chrB].display:
+                        continue
+                chrB = self.chromosomeDict[variant.chrB]
+                #The curAngle determines where on the circle the chromosome is located (also used in makeItems)
+                curAngle_A = self.chromosome_angle_list[chrA.name][0]
+                curAngle_B = self.chromosome_angle_list[chrB.name][0]
+                #The windows of each variant (WINA, WINB) are used to determine where on the chromosome the interaction is located
+                if table.hasWindows[row]:
+                    bp_End_A = int(table.winAEnd[row])
+                    chrA_length = int(chrA.end)
+                    bp_End_B = int(table.winBEnd[row])
+                    chrB_length = int(chrB.end)
+                else:
+                    bp_End_A = variant.posA
+                    chrA_length = int(chrA.end)
+                    bp_End_B = variant.posB
+                    chrB_length = int(chrB.end)
+                #A percentage of the total angle (used to draw the chromosome in makeItems) determines where on the
+                #chromosome the connection is located
+                angleIncr_A = (1-((chrA_length - bp_End_A) / chrA_length)) * (self.chromosome_angle_list[chrA.name][1]-2)
+                angleIncr_B = (1-((chrB_length - bp_End_B) / chrB_length)) * (self.chromosome_angle_list[chrB.name][1]-2)
+                #A Path is created to assign the position for the connections
+                tempPath = QPainterPath()
+                #The arMoveTo() function is used to get the different points on each chromosome the connection is located
+                tempPath.arcMoveTo(self.innerChrRect, - (curAngle_A + angleIncr_A))
+                posA = tempPath.currentPosition()
+                tempPath.arcMoveTo(self.innerChrRect, - (curAngle_B + angleIncr_B))
+                posB = tempPath.currentPosition()
+                centerPos = self.outerChrRect.center()
+                #A Bezier curve is then created between these three points
+                connectionPath = QPainterPath()
+                connectionPath.moveTo(posA)
+                connectionPath.quadTo(centerPos,posB)
+                #The path is converted to a graphics path item
+                connectionItem = QGraphicsPathItem(connectionPath)
+                #The PathItem is given the color of chromosome B and a width (default is 1 pixel wide)
+                pen = QPen(Qt.red, self.connWidth)
+                pen.setStyle(Qt.DashLine)
+                connectionItem.setPen(pen)
+                connectionItem.setZValue(2)
+                connectionItem.setOpacity(0.6)
+                self.scene.addItem(connectionItem)
+
+    #Iterates through the bed tracks of each chr and adds a circle layer with the regions of each track
     def addLayers(self):
         for chromo in self.chromosomes:
             if not chromo.display:
                 continue
             layerIndex = 0
-            for regionList in self.bedDict[chromo.name]:
+            for bedTrack in self.bedDict[chromo.name]:
                 layerRects = self.addedLayers[layerIndex]
                 layerRects[0].moveCenter(self.innerCoverageRect.center())
                 layerRects[1].moveCenter(self.innerCoverageRect.center())
-                for region in regionList:
-                    #where on the circle does this chromosome start, how much does it span?
-                    startAngle = self.chromosome_angle_list[chromo.name][0]
-                    angleSpan = self.chromosome_angle_list[chromo.name][1]
+                #where on the circle does this chromosome start, how much does it span?
+                startAngle = self.chromosome_angle_list[chromo.name][0]
+                angleSpan = self.chromosome_angle_list[chromo.name][1]
+                #if the files are slightly misaligned, set maximum end to chromo end
+                regionEnds = np.minimum(bedTrack.ends, int(chromo.end))
+                #Only construct an item if the span is larger than the min limit
+                rows = np.flatnonzero(regionEnds - bedTrack.starts > self.minBedBp*1000)
+                for (row,regionStart,regionEnd) in zip(rows.tolist(),bedTrack.starts[rows].tolist(),regionEnds[rows].tolist()):
                     #the region starts and ends at certain points in this span
-                    regionStart = int(region[1])
-                    regionEnd = int(region[2])
-                    #if the files are slightly misaligned, set maximum end to chromo end
-                    if regionEnd > int(chromo.end):
-                        regionEnd = int(chromo.end)
                     regionStartAngle = startAngle + (regionStart/int(chromo.end))*(angleSpan-2)
                     regionEndAngle = startAngle + (regionEnd/int(chromo.end))*(angleSpan-2)
-                    #Only construct an item if the span is larger than one degree
-                    if (regionEnd-regionStart) <= self.minBedBp*1000:
-                        continue
                     #Define two painter paths constructing circle sectors
                     outer = QPainterPath()
                     inner = QPainterPath()
@@ -969,7 +948,7 @@ class CircView(QGraphicsView):
                     #Remove the inner circle sector from the outer sector to get the area to display
                     regionPath = outer.subtracted(inner)
                     regionPath = regionPath.subtracted(leftoverArea)
-                    regionItem = BedRegionItem(regionPath,region)
+                    regionItem = BedRegionItem(regionPath,bedTrack.texts[row])
                     regionItem.setBrush(self.chromoColors[chromo.name])
                     self.scene.addItem(regionItem)
                 layerIndex += 1
@@ -986,16 +965,16 @@ class CircView(QGraphicsView):
         self.addedLayers.append([newRectInner,newRectOuter])
         self.outermostRect = newRectOuter
 
-    #Reads a bed file and adds a list of bed (or any similarly structured file) elements for each chromosome
+    #Reads a bed file and adds a track of bed (or any similarly structured file) elements for each chromosome
     def addNewLayer(self):
         newBedDict = common.createBedDict()
-        #Insert the list with new layer regions for each chromosome
+        #Insert the track with new layer regions for each chromosome
         for key in self.chromosomeDict.keys():
             if key in newBedDict.keys():
                 self.bedDict[key].append(newBedDict[key])
             else:
-                #If no match in newly created list, insert empty region list for this chromosome
-                self.bedDict[key].append([])
+                #If no match in newly created tracks, insert an empty track for this chromosome
+                self.bedDict[key].append(data.BedTrack("",[]))
         self.addLayerRect()
         self.initscene()
 
@@ -1010,9 +989,9 @@ class CircView(QGraphicsView):
 #Bed graphic item with some convenience functions for marking etc
 class BedRegionItem(QGraphicsPathItem):
 
-    def __init__(self,path,bedFields):
+    def __init__(self,path,bedText):
         super().__init__(path)
-        self.bedText = bedFields[3]
+        self.bedText = bedText
         self.setToolTip(self.bedText)
         self.marked = False
         self.setData(0,"bedItem")
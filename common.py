@@ -5,13 +5,13 @@ import data
 #Reads a bed file and adds a list of bed elements for each chromosome
 def createBedDict():
     #Construct a dict to contain all relevant lines for each chromosome
-    #Each line should have final format [bed,start,end,text1...]
+    #Each line should have final format [bed,start,end,text1...], the lines of each chromosome are stored as a data.BedTrack
     newBedDict = {}
     bedFile = QFileDialog.getOpenFileName(None,"Specify bed file",QDir.currentPath(),
-    "bed files (*.bed *.txt *.tab)")[0]
+    "bed files (*.bed *.txt *.tab *.bed.gz *.txt.gz *.tab.gz)")[0]
     if bedFile:
         bedLines = data.readGeneralTab(bedFile)
-        bedFileName = bedFile.split('/')[-1].replace('.bed','').replace('.txt','').replace('.tab','')
+        bedFileName = bedFile.split('/')[-1].replace('.gz','').replace('.bed','').replace('.txt','').replace('.tab','')
         for line in bedLines:
             chrName = line[0]
             #If this is a new chrName, construct empty list
@@ -22,6 +22,7 @@ def createBedDict():
             line.pop(0)
             lineElements.extend(line)
             newBedDict[chrName].append(lineElements)
+        newBedDict = {chrName: data.BedTrack(bedFileName,lines) for (chrName,lines) in newBedDict.items()}
     return newBedDict
 
 #Creates and returns data model for variants in given chromosome
@@ -35,43 +36,43 @@ def createVariantInfo(chromo):
         #this is a check for displaying a variant or not
         dispCheckItem = QStandardItem()
         dispCheckItem.setCheckable(False)
-        if variant[9]:
+        if variant.active:
             dispCheckItem.setCheckState(Qt.Checked)
         else:
             dispCheckItem.setCheckState(Qt.Unchecked)
         infoitem.append(dispCheckItem)
         #this is event_type in the variant
-        infoitem.append(QStandardItem(variant[4]))
+        infoitem.append(QStandardItem(variant.eventType))
         #this is posA in the variant
         startItem = QStandardItem()
         #set data with start as role 0
-        startItem.setData(variant[1],0)
+        startItem.setData(variant.posA,0)
         infoitem.append(startItem)
         #this is posB or chrB: posB in the variant (if interchromosomal)
-        if variant[0] is not variant[2]:
-            endText = str(variant[2]) + ": " + str(variant[3])
+        if variant.chrA != variant.chrB:
+            endText = str(variant.chrB) + ": " + str(variant.posB)
             endItem = QStandardItem()
             #if chrB, set this as data with role 32, end as role 33
-            endItem.setData(variant[2],32)
-            endItem.setData(variant[3],33)
+            endItem.setData(variant.chrB,32)
+            endItem.setData(variant.posB,33)
         else:
-            endText = str(variant[3])
+            endText = str(variant.posB)
             endItem = QStandardItem()
             #if no chrB, set 0 as role 32, end as role 33
             endItem.setData(str(0),32)
-            endItem.setData(variant[3],33)
+            endItem.setData(variant.posB,33)
         endItem.setData(endText,Qt.DisplayRole)
         infoitem.append(endItem)
         #this is allGenes in the variant
-        infoitem.append(QStandardItem(variant[7]))
+        infoitem.append(QStandardItem(variant.genes))
         #this is cband in the variant
-        infoitem.append(QStandardItem(variant[8]))
+        infoitem.append(QStandardItem(variant.cytoband))
         #this is rankscore in the variant
-        infoitem.append(QStandardItem(variant[10]))
+        infoitem.append(QStandardItem(variant.rankScore))
         #this is a check for whether a variant is marked or not!
         markCheckItem = QStandardItem()
         markCheckItem.setCheckable(False)
-        if variant[11]:
+        if variant.marked:
             markCheckItem.setCheckState(Qt.Checked)
         else:
             markCheckItem.setCheckState(Qt.Unchecked)
@@ -155,12 +156,12 @@ def toggleVariants(chromo, varView):
     selectedRows = set(selectedRows)
     for row in selectedRows:
         dispVarItem = varView.model().sourceModel().item(row,0)
-        if chromo.variants[row][9]:
+        if chromo.variants[row].active:
             dispVarItem.setCheckState(Qt.Unchecked)
-            chromo.variants[row][9] = False
+            chromo.setVariantActive(row, False)
         else:
             dispVarItem.setCheckState(Qt.Checked)
-            chromo.variants[row][9] = True
+            chromo.setVariantActive(row, True)
     chromo.createConnections()
 
 def markVariants(chromo, varView):
@@ -171,12 +172,12 @@ def markVariants(chromo, varView):
     selectedRows = set(selectedRows)
     for row in selectedRows:
         markVarItem = varView.model().sourceModel().item(row,7)
-        if chromo.variants[row][11]:
+        if chromo.variants[row].marked:
             markVarItem.setCheckState(Qt.Unchecked)
-            chromo.variants[row][11] = False
+            chromo.setVariantMarked(row, False)
         else:
             markVarItem.setCheckState(Qt.Checked)
-            chromo.variants[row][11] = True
+            chromo.setVariantMarked(row, True)
     chromo.createConnections()
 
 #Toggles individual variants on and off
@@ -191,6 +192,13 @@ def returnVariants(chromo, varView):
         selectedVariants.append(chromo.variants[row])
     return selectedVariants
 
+#Returns the rows of the selected variants, which are also their indexes in chromo.variants
+def returnVariantRows(varView):
+    selectedProxyIndexes = varView.selectedIndexes()
+    #Selected indexes are indexes in proxy model, so translate to source indexes
+    selectedIndexes = [varView.model().mapToSource(proxyIndex) for proxyIndex in selectedProxyIndexes]
+    return set([index.row() for index in selectedIndexes])
+
 #Template for adding a custom variant to selected chromosomes.
 #This function is currently not fully supported.
 def addVariant(chromo,chromosomes):
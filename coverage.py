@@ -1,8 +1,10 @@
 from PySide.QtCore import *
 from PySide.QtGui import *
 import math
+import numpy as np
 import common
 import data
+import searchIndex
 
 class CoverageView(QWidget):
 
@@ -27,7 +29,7 @@ class CoverageView(QWidget):
         self.dataDict = dataDict
         self.chromosomes = self.dataDict['chromosomeList']
         self.chromosomeDict = {chromo.name: chromo for chromo in self.chromosomes}
-        self.cytoInfo = self.dataDict['cytoTab']
+        self.cytoIndex = self.dataDict['cytoIndex']
         self.colorNames = parent.colorNames
         self.colors = parent.colors
         self.bpWindow = int(self.coverageSettings["bpWindow"])
@@ -43,8 +45,12 @@ class CoverageView(QWidget):
         self.createChInfo()
         #Initialize a dict with an empty list for each chromosome, to contain bed tracks
         self.bedDict = {chromo.name: [] for chromo in self.chromosomes}
-        #Initialize an excluded region dict
-        self.excludeDict = {chromo.name: [] for chromo in self.chromosomes}
+        #Genome-wide search index of the dataset, and one for the bed tracks added to this view
+        self.searchIndex = self.dataDict['searchIndex']
+        self.bedSearchIndex = searchIndex.SearchIndex([chromo.name for chromo in self.chromosomes])
+        #The search results last suggested by searchCompletions, by their text
+        self.searchResults = {}
+        self.varTable = None
         self.mainView.setRenderHints(QPainter.Antialiasing)
         self.overviewView.setRenderHints(QPainter.Antialiasing)
         self.splitter.addWidget(self.mainView)
@@ -287,80 +293,70 @@ class CoverageView(QWidget):
         bandYPos = self.overviewArea.top() + bandHeight/2
         firstAcen = True
         #Find each cytoband for this chromosome, and create band items using this data
-        for cyto in self.cytoInfo:
-            if cyto[0] == chromo.name:
-                totalCytoBP = int(cyto[2]) - int(cyto[1])
-                bandXPos = self.overviewArea.left() + (int(cyto[1]) / int(chromo.end)) * chromoWidth
-                bandWidth = (totalCytoBP / int(chromo.end)) * chromoWidth
-                #If first item, round on left
-                if int(cyto[1]) is 0:
-                    rect = QRectF(bandXPos,bandYPos,bandWidth,bandHeight)
-                    rect.setRight(rect.right() + rect.width())
-                    roundPath = QPainterPath(rect.center())
-                    roundPath.arcTo(rect,-90,-180)
-                    roundPath.closeSubpath()
-                    bandRectItem = QGraphicsPathItem(roundPath)
-                #If first acen, round on right
-                elif cyto[4] == 'acen' and firstAcen:
-                    rect = QRectF(bandXPos,bandYPos,bandWidth,bandHeight)
-                    rect.setLeft(rect.left() - rect.width())
-                    roundPath = QPainterPath(rect.center())
-                    roundPath.arcTo(rect,-90,180)
-                    roundPath.closeSubpath()
-                    bandRectItem = QGraphicsPathItem(roundPath)
-                    firstAcen = False
-                #If second acen, round on left
-                elif cyto[4] == 'acen':
-                    rect = QRectF(bandXPos,bandYPos,bandWidth,bandHeight)
-                    rect.setRight(rect.right() + rect.width())
-                    roundPath = QPainterPath(rect.center())
-                    roundPath.arcTo(rect,-90,-180)
-                    roundPath.closeSubpath()
-                    bandRectItem = QGraphicsPathItem(roundPath)
-                #If last item, round on right (i.e. last index in last chr or new chr next on next index)
-                elif self.cytoInfo.index(cyto) == len(self.cytoInfo)-1:
-                    rect = QRectF(bandXPos,bandYPos,bandWidth,bandHeight)
-                    rect.setLeft(rect.left() - rect.width())
-                    roundPath = QPainterPath(rect.center())
-                    roundPath.arcTo(rect,-90,180)
-                    roundPath.closeSubpath()
-                    bandRectItem = QGraphicsPathItem(roundPath)
-                elif self.cytoInfo[self.cytoInfo.index(cyto)+1][0] != chromo.name:
-                    rect = QRectF(bandXPos,bandYPos,bandWidth,bandHeight)
-                    rect.setLeft(rect.left() - rect.width())
-                    roundPath = QPainterPath(rect.center())
-                    roundPath.arcTo(rect,-90,180)
-                    roundPath.closeSubpath()
-                    bandRectItem = QGraphicsPathItem(roundPath)
-                else:
-                    #Create a rect item with corresponding stain color, tooltip, set data to band name for later use
-                    bandRectItem = QGraphicsRectItem(bandXPos,bandYPos,bandWidth,bandHeight)
-                bandRectItem.setBrush(self.colors[cyto[4]])
-                bandRectItem.setToolTip(cyto[3] + ": " + str(totalCytoBP) + " bp")
-                self.overviewScene.addItem(bandRectItem)
-                #Add the chromosome name to the left of the area
-                nameItem = QGraphicsTextItem(chromo.name)
-                nameItem.setPos( QPointF(self.overviewArea.left()-20, self.overviewArea.top()+5) )
-                font = QFont()
-                font.setBold(True)
-                nameItem.setFont(font)
-                self.overviewScene.addItem(nameItem)
+        bands = self.cytoIndex.chromosomeBands(chromo.name)
+        for (bandIndex,cyto) in enumerate(bands):
+            totalCytoBP = int(cyto[2]) - int(cyto[1])
+            bandXPos = self.overviewArea.left() + (int(cyto[1]) / int(chromo.end)) * chromoWidth
+            bandWidth = (totalCytoBP / int(chromo.end)) * chromoWidth
+            #If first item, round on left
+            if int(cyto[1]) is 0:
+                rect = QRectF(bandXPos,bandYPos,bandWidth,bandHeight)
+                rect.setRight(rect.right() + rect.width())
+                roundPath = QPainterPath(rect.center())
+                roundPath.arcTo(rect,-90,-180)
+                roundPath.closeSubpath()
+                bandRectItem = QGraphicsPathItem(roundPath)
+            #If first acen, round on right
+            elif cyto[4] == 'acen' and firstAcen:
+                rect = QRectF(bandXPos,bandYPos,bandWidth,bandHeight)
+                rect.setLeft(rect.left() - rect.width())
+                roundPath = QPainterPath(rect.center())
+                roundPath.arcTo(rect,-90,180)
+                roundPath.closeSubpath()
+                bandRectItem = QGraphicsPathItem(roundPath)
+                firstAcen = False
+            #If second acen, round on left
+            elif cyto[4] == 'acen':
+                rect = QRectF(bandXPos,bandYPos,bandWidth,bandHeight)
+                rect.setRight(rect.right() + rect.width())
+                roundPath = QPainterPath(rect.center())
+                roundPath.arcTo(rect,-90,-180)
+                roundPath.closeSubpath()
+                bandRectItem = QGraphicsPathItem(roundPath)
+            #If last item of the chromosome, round on right
+            elif bandIndex == len(bands)-1:
+                rect = QRectF(bandXPos,bandYPos,bandWidth,bandHeight)
+                rect.setLeft(rect.left() - rect.width())
+                roundPath = QPainterPath(rect.center())
+                roundPath.arcTo(rect,-90,180)
+                roundPath.closeSubpath()
+                bandRectItem = QGraphicsPathItem(roundPath)
+            else:
+                #Create a rect item with corresponding stain color, tooltip, set data to band name for later use
+                bandRectItem = QGraphicsRectItem(bandXPos,bandYPos,bandWidth,bandHeight)
+            bandRectItem.setBrush(self.colors[cyto[4]])
+            bandRectItem.setToolTip(cyto[3] + ": " + str(totalCytoBP) + " bp")
+            self.overviewScene.addItem(bandRectItem)
+            #Add the chromosome name to the left of the area
+            nameItem = QGraphicsTextItem(chromo.name)
+            nameItem.setPos( QPointF(self.overviewArea.left()-20, self.overviewArea.top()+5) )
+            font = QFont()
+            font.setBold(True)
+            nameItem.setFont(font)
+            self.overviewScene.addItem(nameItem)
 
     def createPlot(self,chromo,ptype,limits):
-        coverageData = []
         normValue = self.coverageNorm
         minCov = normValue*self.minCoverage
         maxCov = normValue*self.maxCoverage
-        #Create an average values for coverage, depending into user defined window
-        coverageChunks = [chromo.coverage[i:i+(self.bpWindow)] for i in range(0,len(chromo.coverage),(self.bpWindow))]
-        for chunk in coverageChunks:
-            val = sum(chunk) / len(chunk)
-            if val > maxCov:
-                val = maxCov
-            if val < minCov:
-                val = minCov
-            #Presuming we're dealing with a diploid genome, the norm should represent 2 copies, so multiply by 2
-            coverageData.append(2*val/normValue)
+        #Average values for coverage in the user defined window. Excluded bins are left out here,
+        #and windows with only excluded bins get no data point.
+        (coverageMeans,windowIndexes) = chromo.windowCoverage(self.bpWindow)
+        windowCount = -(-len(chromo.coverage) // self.bpWindow)
+        coverageMeans = np.maximum(np.minimum(coverageMeans, maxCov), minCov)
+        #Presuming we're dealing with a diploid genome, the norm should represent 2 copies, so multiply by 2
+        coverageData = (2*coverageMeans/normValue).tolist()
+        windowIndexes = windowIndexes.tolist()
 
         #Draw the y axis
         leftLine = QLineF(self.graphArea.bottomLeft(),self.graphArea.topLeft())
@@ -420,25 +416,25 @@ class CoverageView(QWidget):
         #Place the actual data values on the graph
         if ptype == 0:
 
-            for index in range(len(coverageData)):
+            for (index,value) in zip(windowIndexes,coverageData):
                 pointRect = QRectF(0,0,5,5)
-                xPos = self.graphArea.left() + (index/len(coverageData))*self.graphArea.width() -2.5
-                yPos = self.graphArea.bottom() - coverageData[index]*yAxisIncrement -2.5
+                xPos = self.graphArea.left() + (index/windowCount)*self.graphArea.width() -2.5
+                yPos = self.graphArea.bottom() - value*yAxisIncrement -2.5
                 pointItem = QGraphicsEllipseItem(pointRect)
                 pointItem.setPos(xPos,yPos)
-                if coverageData[index] < self.delLimit:
+                if value < self.delLimit:
                     pointItem.setBrush(QBrush(Qt.red))
-                elif coverageData[index] > self.dupLimit:
+                elif value > self.dupLimit:
                     pointItem.setBrush(QBrush(Qt.green))
                 else:
                     pointItem.setBrush(QBrush(Qt.black))
                 #Set data with key 0 as 'plotItem' for convenience
                 pointItem.setData(0,'plotItem')
                 pointBp = index*self.bpWindow*1000
-                pointItem.setToolTip( str(pointBp) + " bp: " +  str(round(coverageData[index],4)) )
+                pointItem.setToolTip( str(pointBp) + " bp: " +  str(round(value,4)) )
                 pointItem.setZValue(1)
                 pointItem.setData(1,pointBp)
-                pointItem.setData(2,coverageData[index])
+                pointItem.setData(2,value)
                 self.mainScene.addItem(pointItem)
                 self.dataPoints.append(pointItem)
 
@@ -458,21 +454,28 @@ class CoverageView(QWidget):
             colorPen = QPen()
             colorPen.setBrush(colorBrush)
 
-            for index in range(len(coverageData)-1):
-                startPoint = QPointF( self.graphArea.left() + (index/len(coverageData))*self.graphArea.width(),
-                                      self.graphArea.bottom() - coverageData[index]*yAxisIncrement)
-                endPoint = QPointF( self.graphArea.left() + ((index+1)/len(coverageData))*self.graphArea.width(),
-                                      self.graphArea.bottom() - coverageData[index+1]*yAxisIncrement)
+            for dataIndex in range(len(coverageData)-1):
+                index = windowIndexes[dataIndex]
+                nextIndex = windowIndexes[dataIndex+1]
+                #Lines are not drawn over excluded windows
+                if nextIndex != index+1:
+                    continue
+                startPoint = QPointF( self.graphArea.left() + (index/windowCount)*self.graphArea.width(),
+                                      self.graphArea.bottom() - coverageData[dataIndex]*yAxisIncrement)
+                endPoint = QPointF( self.graphArea.left() + (nextIndex/windowCount)*self.graphArea.width(),
+                                      self.graphArea.bottom() - coverageData[dataIndex+1]*yAxisIncrement)
                 line = QLineF(startPoint,endPoint)
                 lineItem = QGraphicsLineItem()
                 lineItem.setLine(line)
                 lineItem.setPen(colorPen)
                 lineItem.setData(0,'plotItem')
                 pointBp = index*self.bpWindow*1000
-                lineItem.setToolTip( str(pointBp) + " bp: " + str(round(coverageData[index],4)) )
+                lineItem.setToolTip( str(pointBp) + " bp: " + str(round(coverageData[dataIndex],4)) )
                 lineItem.setZValue(1)
                 lineItem.setData(1,pointBp)
-                lineItem.setData(2,coverageData[index])
+                lineItem.setData(2,coverageData[dataIndex])
+                #The position of the end of the line, used when placing the line
+                lineItem.setData(3,nextIndex*self.bpWindow*1000)
                 self.mainScene.addItem(lineItem)
                 self.dataPoints.append(lineItem)
 
@@ -487,16 +490,16 @@ class CoverageView(QWidget):
                 else:
                     point.hide()
         elif self.plotType == 1:
-            for index in range(len(self.dataPoints)-1):
-                if self.dataPoints[index].data(1) >= self.limits[0] and self.dataPoints[index].data(1) <= self.limits[0] + self.limits[1]:
-                    oldLine = self.dataPoints[index].line()
-                    startX = self.graphArea.left() + (self.dataPoints[index].data(1)-self.limits[0])/(self.limits[1]) * self.graphArea.width()
-                    endX = self.graphArea.left() + (self.dataPoints[index+1].data(1)-self.limits[0])/(self.limits[1]) *self.graphArea.width()
+            for lineItem in self.dataPoints:
+                if lineItem.data(1) >= self.limits[0] and lineItem.data(1) <= self.limits[0] + self.limits[1]:
+                    oldLine = lineItem.line()
+                    startX = self.graphArea.left() + (lineItem.data(1)-self.limits[0])/(self.limits[1]) * self.graphArea.width()
+                    endX = self.graphArea.left() + (lineItem.data(3)-self.limits[0])/(self.limits[1]) *self.graphArea.width()
                     newLine = QLineF(startX,oldLine.y1(),endX,oldLine.y2())
-                    self.dataPoints[index].setLine(newLine)
-                    self.dataPoints[index].show()
+                    lineItem.setLine(newLine)
+                    lineItem.show()
                 else:
-                    self.dataPoints[index].hide()
+                    lineItem.hide()
         #Redraw bp ticks
         for item in self.tickItems:
             self.mainScene.removeItem(item)
@@ -526,6 +529,7 @@ class CoverageView(QWidget):
         #Create and add selection marker
         self.selectorItem = AreaSelectorItem(mRect,self.overviewArea,self)
         self.overviewScene.addItem(self.selectorItem)
+        self.updateRegionStats()
         bedSceneRect = self.bedScene.sceneRect()
         self.trackViewArea.setHeight(bedSceneRect.height()+20)
         self.bedView.setSceneRect(self.trackViewArea)
@@ -538,7 +542,6 @@ class CoverageView(QWidget):
         #If this chromosome has any bed tracks, add these
         if self.bedDict[chromo.name]:
             self.addTracks(chromo)
-        self.excludeRegions()
         #Exception when changing between views and variant table is old; needs to be fixed
         #Should save the view's active chromosome and select this again on view change (in mainwin)
         try:
@@ -566,21 +569,34 @@ class CoverageView(QWidget):
         self.createPlot(chromo,self.plotType,self.limits)
         self.updatePlot()
 
-    def updateLimits(self):
+    #Returns the start and length in bp of the region marked by markRect in the overview
+    def markedRegion(self,markRect):
         chromo = self.chromosomes[self.activeChromo]
-        #Find the marked region by looking at marker edges
-        markRect = self.selectorItem.returnMarkerRect()
         regionStart = round((markRect.left() - self.overviewArea.left()) / self.overviewArea.width() * int(chromo.end))
         if regionStart < 0:
             regionStart = 0
         regionLength = round(markRect.width() / self.overviewArea.width() * int(chromo.end))
         if regionLength > int(chromo.end):
             regionLength = int(chromo.end)
-        limits = [regionStart, regionLength]
-        self.limits = limits
+        return [regionStart, regionLength]
+
+    def updateLimits(self):
+        #Find the marked region by looking at marker edges
+        self.limits = self.markedRegion(self.selectorItem.returnMarkerRect())
         if self.startBox and self.endBox:
             self.updatePositionBoxes()
 
+    #Shows the mean and standard deviation of coverage in the marked region as tooltip of the marker
+    def updateRegionStats(self):
+        chromo = self.chromosomes[self.activeChromo]
+        (regionStart,regionLength) = self.markedRegion(self.selectorItem.returnMarkerRect())
+        stats = chromo.coverageStats(regionStart,regionStart+regionLength)
+        if stats is None:
+            self.selectorItem.setToolTip("")
+            return
+        (meanCoverage,sdCoverage) = stats
+        self.selectorItem.setToolTip("Mean coverage: " + str(round(meanCoverage,2)) + "\nStandard deviation: " + str(round(sdCoverage,2)))
+
     def connectPositionBoxes(self,startBox,endBox):
         self.startBox = startBox
         self.endBox = endBox
@@ -685,169 +701,192 @@ class CoverageView(QWidget):
         itemY = self.trackArea.top()
         maxLength = self.trackArea.width()
         viewedBp = self.limits[1]
-        for bedLines in self.bedDict[chromo.name]:
+        for bedTrack in self.bedDict[chromo.name]:
             #Uses the first letter of the bed file as track name. Better names might exist.
-            trackName = bedLines[0][0]
-            trackName = trackName[0]
+            trackName = bedTrack.name[0]
             trackNameItem = QGraphicsTextItem(trackName)
             font = QFont()
             font.setPointSize(12)
             trackNameItem.setFont(font)
             self.bedScene.addItem(trackNameItem)
             trackNameItem.setPos(QPointF(self.trackArea.left()-20,itemY))
-            for line in bedLines:
-                if int(line[1]) >= self.limits[0] and int(line[2]) <= self.limits[1]+self.limits[0]:
-                    itemStart = self.trackArea.left() + (int(line[1])-self.limits[0]) / (viewedBp) * maxLength
-                    itemWidth = (int(line[2])-int(line[1])) / (viewedBp) * maxLength
-                    rect = QRectF(itemStart,itemY,itemWidth,itemHeight)
-                    #Only display items that are larger than min limit
-                    if (int(line[2])-int(line[1])) >= self.minBedBp*1000:
-                        rectItem = BedRectItem(rect,line)
-                        rectItem.setBrush(Qt.green)
-                        self.bedScene.addItem(rectItem)
-                        toolText = line[3]
-                        textItem = QGraphicsTextItem(toolText)
-                        font = QFont()
-                        font.setPointSize(8)
-                        textItem.setFont(font)
-                        #Only display the name on the rect if there's space for it
-                        if textItem.boundingRect().width() < rectItem.boundingRect().width():
-                            #The item should not block events to underlying rect..
-                            self.bedScene.addItem(textItem)
-                            textItem.setPos(QPointF(itemStart,itemY))
+            #Only the items within the viewed region that are larger than min limit are displayed
+            rows = bedTrack.containedRows(self.limits[0],self.limits[1]+self.limits[0])
+            rows = rows[bedTrack.ends[rows] - bedTrack.starts[rows] >= self.minBedBp*1000]
+            for (row,itemStartBp,itemEndBp) in zip(rows.tolist(),bedTrack.starts[rows].tolist(),bedTrack.ends[rows].tolist()):
+                itemStart = self.trackArea.left() + (itemStartBp-self.limits[0]) / (viewedBp) * maxLength
+                itemWidth = (itemEndBp-itemStartBp) / (viewedBp) * maxLength
+                rect = QRectF(itemStart,itemY,itemWidth,itemHeight)
+                toolText = bedTrack.texts[row]
+                rectItem = BedRectItem(rect,toolText)
+                rectItem.setBrush(Qt.green)
+                self.bedScene.addItem(rectItem)
+                textItem = QGraphicsTextItem(toolText)
+                font = QFont()
+                font.setPointSize(8)
+                textItem.setFont(font)
+                #Only display the name on the rect if there's space for it
+                if textItem.boundingRect().width() < rectItem.boundingRect().width():
+                    #The item should not block events to underlying rect..
+                    self.bedScene.addItem(textItem)
+                    textItem.setPos(QPointF(itemStart,itemY))
             itemY += itemHeight+10
 
-    #Reads a bed file and adds a list of bed elements for each chromosome
+    #Reads a bed file and adds a track of bed elements for each chromosome
     def addBed(self):
         newBedDict = common.createBedDict()
         #For each constructed list, search for appropriate chromosome to insert into
         for key in newBedDict.keys():
             if key in self.bedDict.keys():
                 self.bedDict[key].append(newBedDict[key])
+                bedTrack = newBedDict[key]
+                for (start,end,bedText) in zip(bedTrack.starts.tolist(),bedTrack.ends.tolist(),bedTrack.texts):
+                    if bedText:
+                        self.bedSearchIndex.addEntry(bedText,'bed',key,start,end)
         self.updatePlot()
 
     def markVariants(self):
         chrA = self.chromosomes[self.activeChromo]
-        selectedVariants = common.returnVariants(chrA,self.varTable)
         for item in self.markVariantsItems:
             self.mainScene.removeItem(item)
         self.markVariantsItems = []
-        for variant in chrA.variants:
-
-            if variant[9] and not variant[2].startswith("G") and (variant in selectedVariants or variant[11]):
-                if "WINA" in variant[5]:
-                    chrB = self.chromosomeDict[variant[2]]
-                    if self.chromosomes.index(chrA) > self.chromosomes.index(chrB):
-                            startWinA = int(variant[5]["WINB"].split(',')[0])
-                            endWinA = int(variant[5]["WINB"].split(',')[1])
-                            startWinB = int(variant[5]["WINA"].split(',')[0])
-                            endWinB = int(variant[5]["WINA"].split(',')[1])
-                    else:
-                            startWinA = int(variant[5]["WINA"].split(',')[0])
-                            endWinA = int(variant[5]["WINA"].split(',')[1])
-                            startWinB = int(variant[5]["WINB"].split(',')[0])
-                            endWinB = int(variant[5]["WINB"].split(',')[1])
-                    if variant[0] is variant[2] and startWinA > self.limits[0] and endWinB < self.limits[0] + self.limits[1]:
-                        startRegionA = self.graphArea.left() + ( (startWinA-self.limits[0])/self.limits[1] ) * self.graphArea.width()
-                        widthRegionA = (endWinA-startWinA)/self.limits[1] * self.graphArea.width()
-                        startRegionB = self.graphArea.left() + ( (startWinB-self.limits[0])/self.limits[1] ) * self.graphArea.width()
-                        widthRegionB = (endWinB-startWinB)/self.limits[1] * self.graphArea.width()
-                        rectRegionA = QRectF(startRegionA,self.graphArea.top(),widthRegionA,self.graphArea.height())
-                        rectRegionB = QRectF(startRegionB,self.graphArea.top(),widthRegionB,self.graphArea.height())
-                        pen = QPen(QBrush(Qt.red),1)
-                        pen.setStyle(Qt.DashLine)
-                        regionGraphicA = QGraphicsRectItem(rectRegionA)
-                        regionGraphicB = QGraphicsRectItem(rectRegionB)
-                        regionGraphicA.setBrush(Qt.red)
-                        regionGraphicB.setBrush(Qt.red)
-                        regionGraphicA.setPen(pen)
-                        regionGraphicB.setPen(pen)
-                        regionGraphicA.setOpacity(0.6)
-                        regionGraphicB.setOpacity(0.6)
-                        self.markVariantsItems.append(regionGraphicA)
-                        self.markVariantsItems.append(regionGraphicB)
-                        self.mainScene.addItem(regionGraphicA)
-                        self.mainScene.addItem(regionGraphicB)
+        table = chrA.getVariantTable()
+        #Marked and selected variants are shown if they are active and within this chromosome
+        shownVariants = table.marked | table.rowMask(common.returnVariantRows(self.varTable))
+        shownVariants &= table.active & table.chrBMask(chrA.name) & ~table.chrBPrefixMask("G")
+        for row in np.flatnonzero(shownVariants):
+            variant = chrA.variants[row]
+            if table.hasWindows[row]:
+                #Both windows are on this chromosome
+                startWinA = int(table.winAStart[row])
+                endWinA = int(table.winAEnd[row])
+                startWinB = int(table.winBStart[row])
+                endWinB = int(table.winBEnd[row])
+                if startWinA > self.limits[0] and endWinB < self.limits[0] + self.limits[1]:
+                    startRegionA = self.graphArea.left() + ( (startWinA-self.limits[0])/self.limits[1] ) * self.graphArea.width()
+                    widthRegionA = (endWinA-startWinA)/self.limits[1] * self.graphArea.width()
+                    startRegionB = self.graphArea.left() + ( (startWinB-self.limits[0])/self.limits[1] ) * self.graphArea.width()
+                    widthRegionB = (endWinB-startWinB)/self.limits[1] * self.graphArea.width()
+                    rectRegionA = QRectF(startRegionA,self.graphArea.top(),widthRegionA,self.graphArea.height())
+                    rectRegionB = QRectF(startRegionB,self.graphArea.top(),widthRegionB,self.graphArea.height())
+                    pen = QPen(QBrush(Qt.red),1)
+                    pen.setStyle(Qt.DashLine)
+                    regionGraphicA = QGraphicsRectItem(rectRegionA)
+                    regionGraphicB = QGraphicsRectItem(rectRegionB)
+                    regionGraphicA.setBrush(Qt.red)
+                    regionGraphicB.setBrush(Qt.red)
+                    regionGraphicA.setPen(pen)
+                    regionGraphicB.setPen(pen)
+                    regionGraphicA.setOpacity(0.6)
+                    regionGraphicB.setOpacity(0.6)
+                    self.markVariantsItems.append(regionGraphicA)
+                    self.markVariantsItems.append(regionGraphicB)
+                    self.mainScene.addItem(regionGraphicA)
+                    self.mainScene.addItem(regionGraphicB)
 
-                else:
-                    bpStart = variant[1]
-                    bpEnd = variant[3]
-                    if (variant[0] is variant[2]) and bpStart > self.limits[0] and bpEnd < self.limits[0] + self.limits[1]:
-                        regionStart = self.graphArea.left() + ( (bpStart-self.limits[0])/self.limits[1] ) * self.graphArea.width()
-                        regionWidth = (bpEnd-bpStart)/self.limits[1] * self.graphArea.width()
-                        regionRect = QRectF(regionStart,self.graphArea.top(),regionWidth,self.graphArea.height())
-                        pen = QPen(QBrush(Qt.red),1)
-                        pen.setStyle(Qt.DashLine)
-                        regionGraphic = QGraphicsRectItem(regionRect)
-                        regionGraphic.setBrush(Qt.red)
-                        regionGraphic.setPen(pen)
-                        regionGraphic.setOpacity(0.6)
-                        self.markVariantsItems.append(regionGraphic)
-                        self.mainScene.addItem(regionGraphic)
-
-
-    #Reads a tab file (with GC content) and adds a list of excluded regions in each chromosome
+            else:
+                bpStart = variant.posA
+                bpEnd = variant.posB
+                if (variant.chrA == variant.chrB) and bpStart > self.limits[0] and bpEnd < self.limits[0] + self.limits[1]:
+                    regionStart = self.graphArea.left() + ( (bpStart-self.limits[0])/self.limits[1] ) * self.graphArea.width()
+                    regionWidth = (bpEnd-bpStart)/self.limits[1] * self.graphArea.width()
+                    regionRect = QRectF(regionStart,self.graphArea.top(),regionWidth,self.graphArea.height())
+                    pen = QPen(QBrush(Qt.red),1)
+                    pen.setStyle(Qt.DashLine)
+                    regionGraphic = QGraphicsRectItem(regionRect)
+                    regionGraphic.setBrush(Qt.red)
+                    regionGraphic.setPen(pen)
+                    regionGraphic.setOpacity(0.6)
+                    self.markVariantsItems.append(regionGraphic)
+                    self.mainScene.addItem(regionGraphic)
+
+
+    #Reads a tab file (with GC content) and excludes the regions marked in it
     def addExcludeGCFile(self):
         excludeFile = QFileDialog.getOpenFileName(None,"Specify tab file",QDir.currentPath(),
-        "tab files (*.tab)")[0]
+        "tab files (*.tab *.tab.gz)")[0]
         if excludeFile:
             excludeLines = data.readGeneralTab(excludeFile)
             #Read each line and look for positions markd with (-1)
-            #Create a dict and for each chromosome, create a list with excluded positions
-            for line in excludeLines:
-                #Formatted as chr, pos1, pos2, value
-                if line[3] == '-1.0':
-                    region = [int(line[1]), int(line[2])]
-                    if line[0] in self.excludeDict:
-                        self.excludeDict[line[0]].append(region)
-        self.updatePlot()
+            #Formatted as chr, pos1, pos2, value
+            self.excludeLines([line for line in excludeLines if line[3] == '-1.0'])
 
-    #Reads a tab file (with any defined region) and adds a list of excluded regions in each chromosome
+    #Reads a tab file (with any defined region) and excludes these regions
     def addExcludeFile(self):
         excludeFile = QFileDialog.getOpenFileName(None,"Specify exclude file",QDir.currentPath(),
-        "exclude files (*.tab *.txt)")[0]
+        "exclude files (*.tab *.txt *.tab.gz *.txt.gz)")[0]
         if excludeFile:
             excludeLines = data.readGeneralTab(excludeFile)
-            #Create a dict and for each chromosome, create a list with excluded positions
-            for line in excludeLines:
-                #Formatted as chr, start, end
-                region = [int(line[1]), int(line[2])]
-                if line[0] in self.excludeDict:
-                    self.excludeDict[line[0]].append(region)
-        self.updatePlot()
-
-    #Iterates through excluded regions in active chromsome and removes plot points
-    #Might be done in a more efficient way considering performance issues
-    def excludeRegions(self):
-        chromo = self.chromosomes[self.activeChromo]
-        for region in self.excludeDict[chromo.name]:
-            bpStart = region[0]
-            bpEnd = region[1]
-            if bpStart >= self.limits[0] and bpEnd <= self.limits[0] + self.limits[1]:
-                regionStart = self.graphArea.left() + ( (bpStart-self.limits[0])/self.limits[1] ) * self.graphArea.width()
-                regionWidth = (bpEnd-bpStart)/self.limits[1] * self.graphArea.width()
-                regionRect = QRectF(regionStart,self.graphArea.top(),regionWidth,self.graphArea.height())
-                intersectingItems = self.mainScene.items(regionRect)
-                for item in intersectingItems:
-                     if item.data(0) == 'plotItem':
-                         self.mainScene.removeItem(item)
+            #Formatted as chr, start, end
+            self.excludeLines(excludeLines)
+
+    #Excludes the coverage bins of the regions in lines formatted as chr, start, end.. from the plot.
+    #The excluded bins are stored in the chromosomes, and are saved with the dataset.
+    def excludeLines(self,lines):
+        excludedRegions = {}
+        for line in lines:
+            if line[0] in self.chromosomeDict:
+                regions = excludedRegions.setdefault(line[0],([],[]))
+                regions[0].append(int(line[1]))
+                regions[1].append(int(line[2]))
+        for (chromoName,(starts,ends)) in excludedRegions.items():
+            self.chromosomeDict[chromoName].excludeRegions(starts,ends)
+        self.changePlotType(self.plotType)
+
+    #Includes all excluded coverage bins again
+    def clearExclusions(self):
+        for chromo in self.chromosomes:
+            chromo.clearExclusions()
+        self.changePlotType(self.plotType)
 
     #Searches for specified text in cytoband definitions and added track elements
     #and attempts to mark this location if a match is found
     def searchString(self,text):
+        #Results chosen from the search suggestions are shown by showRegion
+        if text in self.searchResults:
+            return
         self.matchLocations = []
         if text:
             chromo = self.chromosomes[self.activeChromo]
             #Search for a cytoband match in this chromosome
-            matches = [ [line[1],line[2]] for line in self.cytoInfo if (line[0] == chromo.name and text in line[3])]
+            matches = [ [line[1],line[2]] for line in self.cytoIndex.chromosomeBands(chromo.name) if text in line[3]]
             self.matchLocations.extend(matches)
             #Search in added track elements for this chromo
             bedmatches = []
-            for bedLines in self.bedDict[chromo.name]:
-                matches = [[line[1],line[2]] for line in bedLines if text in line[3]]
+            for bedTrack in self.bedDict[chromo.name]:
+                matches = [[start,end] for (start,end,bedText) in zip(bedTrack.starts.tolist(),bedTrack.ends.tolist(),bedTrack.texts) if text in bedText]
                 self.matchLocations.extend(matches)
         self.updatePlot()
 
+    #Returns suggestions for the search text from genes, cytobands and bed elements in all chromosomes,
+    #as text describing each result
+    def searchCompletions(self,text):
+        self.searchResults = {}
+        entries = sorted(self.searchIndex.prefixQuery(text,20) + self.bedSearchIndex.prefixQuery(text,20))[:20]
+        completions = []
+        for entry in entries:
+            (name,kind,chromoName,start,end) = self.searchIndex.describeEntry(entry)
+            completion = name + " (" + kind + ", " + chromoName + ": " + str(round(start/1000)) + "-" + str(round(end/1000)) + " kb)"
+            self.searchResults[completion] = (name,kind,chromoName,start,end)
+            completions.append(completion)
+        return completions
+
+    #Shows the region start to end of the active chromosome with some margin, and marks it
+    def showRegion(self,start,end):
+        chromo = self.chromosomes[self.activeChromo]
+        margin = max((end-start)//2,50000)
+        regionStart = max(start-margin,0)
+        regionEnd = min(end+margin,int(chromo.end))
+        self.limits = [regionStart, regionEnd-regionStart]
+        rectStart = self.overviewArea.left() + (regionStart / int(chromo.end)) * self.overviewArea.width()
+        rectWidth = ((regionEnd-regionStart) / int(chromo.end)) * self.overviewArea.width()
+        mRect = QRectF(rectStart,0,rectWidth,30)
+        self.selectorItem = AreaSelectorItem(mRect,self.overviewArea,self)
+        self.matchLocations = [[start,end]]
+        if self.startBox and self.endBox:
+            self.updatePositionBoxes()
+        self.updatePlot()
+
     def markSearchedRegions(self):
         for item in self.searchMarkItems:
             self.mainScene.removeItem(item)
@@ -959,9 +998,9 @@ class BedGraphicsView(QGraphicsView):
 #Bed graphic item with some convenience functions for marking etc
 class BedRectItem(QGraphicsRectItem):
 
-    def __init__(self,rect,bedFields):
+    def __init__(self,rect,bedText):
         super().__init__(rect)
-        self.bedText = bedFields[3]
+        self.bedText = bedText
         self.setToolTip(self.bedText)
         self.marked = False
         self.setData(0,"bedRect")
@@ -1140,6 +1179,7 @@ class AreaSelectorItem(QGraphicsItemGroup):
             newRect.translate(translateBy,0)
             self.markRect.setRect(newRect)
             self.lastXPos = xPos
+        self.parent.updateRegionStats()
 
     def mouseReleaseEvent(self,event):
         self.pressRelease = event.pos()
@@ -1,83 +1,205 @@
 import sys
+import os
+import io
+import gzip
+import multiprocessing
 import math
+import bisect
+import collections
 import readVCF
+import vcfIndex
 import fileinput
+import numpy as np
+
+#Size of the read buffer used when streaming input files
+readBufferSize = 1 << 22
+
+#Opens a file for reading, decompressing it while reading if it is gzip compressed (this includes BGZF).
+#Compression is detected from the magic bytes of the file rather than its extension.
+#mode is 'r' for a text stream or 'rb' for a binary stream.
+def openFile(toRead, mode='r'):
+    with open(toRead, 'rb') as inputFile:
+        magic = inputFile.read(2)
+    if magic == b"\x1f\x8b":
+        stream = io.BufferedReader(gzip.GzipFile(toRead, 'rb'), readBufferSize)
+    else:
+        stream = open(toRead, 'rb', readBufferSize)
+    if mode == 'rb':
+        return stream
+    return io.TextIOWrapper(stream)
+
+#Returns how many bytes of the file on disk have been consumed by a binary stream from openFile.
+#For compressed files this is the position in the compressed data, comparable to the size of the file.
+def filePosition(stream):
+    if isinstance(stream.raw, gzip.GzipFile):
+        return stream.raw.fileobj.tell()
+    return stream.tell()
+
+#TAB files are parsed in blocks of roughly this many bytes, each block ending on a line break.
+tabBlockSize = 1 << 20
+
+#Characters separating the four fields of a TAB line
+lineSeparators = np.array([9, 9, 9, 10], dtype=np.uint8)
+
+#Longest number of digits parsed directly by parseDecimalFields, and the powers of ten it divides by
+maxDecimalLength = 15
+floatPowersOfTen = 10.0**np.arange(maxDecimalLength + 3)
+
+#Size in bp of the coverage bins of a tab file
+coverageBinSize = 1000
 
 #Reads a tab file with name string given by toRead.
 #Constructs a list of chromosome items, one per chromosome, and inserts
 #chromosome name, start bp, end bp, coverage per 1000 bp in these items.
+#The file is read in large blocks which are split into columns with array operations.
 def readTab(toRead):
     totalReadLines = 0
-    tabFileName = toRead
     chromosomes = []
-    coverageNorm = 0
-    coverageNormLog = 0
+    coverageParts = []
+    coverageSum = 0
+    coverageLogSum = 0
     totalBP = 0
-    numChr = 0
-    with open(toRead, 'r') as tab:
+    with openFile(toRead, 'rb') as tab:
         #Read the first line in the file, should start with #CHR.
         line = tab.readline()
-        if (not line.startswith("#CHR")):
+        if (not line.startswith(b"#CHR")):
             print('TAB file is not in correct format')
             return None
         else:
             print('TAB file seems ok, continuing read')
 
-        #Read the second line and create the first Chromosome object.
         #All following lines should be formatted as: chrName\tstart\tend\tcoverage
-        line = tab.readline()
-        fields = line.split('\t')
-        if (not len(fields) == 4):
-            print("TAB file not formatted correctly on line 2")
-            return None
-        else:
-            curChrName = fields[0]
-            chrom = Chromosome(curChrName)
-            chrom.addCoverage(float(fields[3]))
-            coverageNorm += float(fields[3])
-            if(float(fields[3])) > 0:
-                coverageNormLog += math.log(float(fields[3]),2)
-            totalReadLines += 1
-            lastRead = line
-            chromosomes.append(chrom)
-            numChr += 1
-
-        #Iterate over the rest of the lines in the file
-        for line in tab:
-            fields = line.split('\t')
-            if (not len(fields) == 4):
+        while True:
+            block = tab.read(tabBlockSize)
+            if not block:
+                break
+            #Complete the last line of the block so that no line is split between blocks
+            block += tab.readline()
+            if not block.endswith(b"\n"):
+                block += b"\n"
+            parsedBlock = parseTabBlock(block)
+            if parsedBlock is None:
+                if totalReadLines == 0 and len(block[:block.index(b"\n")].split(b"\t")) != 4:
+                    print("TAB file not formatted correctly on line 2")
+                    return None
                 print("TAB file not formatted correctly")
                 return -1
-            #If we come across a new chromosome, assign end on current chromosome (contained in last read line)
-            #Then create a new Chromosome object, assign name & start. Add to list.
-            if fields[0] != curChrName:
-                chrom.setEnd(lastRead.split('\t')[2])
-                curChrName = fields[0]
-                chrom = Chromosome(curChrName)
-                chromosomes.append(chrom)
-                numChr += 1
-            #Every line contains coverage data of interest, for current chromosome
-            chrom.addCoverage(float(fields[3]))
-            coverageNorm += float(fields[3])
-            if(float(fields[3])) > 0:
-                coverageNormLog += math.log(float(fields[3]),2)
-            totalReadLines += 1
-            #Store last read line and go to next line
-            lastRead = line
-        chrom.setEnd(lastRead.split('\t')[2])
-
-        coverageNorm = coverageNorm / totalReadLines
-        coverageNormLog = coverageNormLog / totalReadLines
+            (runs,coverage) = parsedBlock
+            #A chromosome continuing from the previous block is extended, otherwise a new Chromosome is created
+            for (name,runStart,runEnd,end) in runs:
+                if not chromosomes or chromosomes[-1].name != name:
+                    chromosomes.append(Chromosome(name))
+                    coverageParts.append([])
+                chromosomes[-1].setEnd(end)
+                coverageParts[-1].append(coverage[runStart:runEnd].astype(np.float32))
+            coverageSum += coverage.sum()
+            coverageLogSum += np.log2(coverage[coverage > 0]).sum()
+            totalReadLines += len(coverage)
+
+    if totalReadLines == 0:
+        print("TAB file not formatted correctly on line 2")
+        return None
+    for (chrom,parts) in zip(chromosomes,coverageParts):
+        chrom.setCoverage(np.concatenate(parts))
+    coverageNorm = float(coverageSum) / totalReadLines
+    coverageNormLog = float(coverageLogSum) / totalReadLines
 
     #sum total read bp
     for chromo in chromosomes:
         totalBP += int(chromo.end)
     return (chromosomes,coverageNorm,coverageNormLog,totalBP)
 
+#Splits a block of complete TAB lines into chromosome runs and coverage values.
+#Returns a list of (name, first line, last line + 1, end of last bin) per run of lines sharing a chromosome,
+#and the coverage of every line as a float64 array. Returns None if any line does not have 4 fields.
+def parseTabBlock(block):
+    byteArray = np.frombuffer(block, dtype=np.uint8)
+    #Tab and newline are the only expected characters below 11; each line should hold 3 tabs followed by a newline
+    separators = np.flatnonzero(byteArray < 11)
+    if len(separators) % 4 != 0:
+        return None
+    numLines = len(separators) // 4
+    separators = separators.reshape(numLines, 4)
+    if not np.all(byteArray[separators] == lineSeparators):
+        return None
+    lineEnds = separators[:,3]
+    lineStarts = np.empty(numLines, dtype=np.int64)
+    lineStarts[0] = 0
+    lineStarts[1:] = lineEnds[:-1] + 1
+
+    #A new run starts wherever the chromosome name differs from the one on the line before
+    #Names are compared one character column at a time, names of different lengths always differ
+    nameLengths = separators[:,0] - lineStarts
+    nameChanged = nameLengths[1:] != nameLengths[:-1]
+    for column in range(int(nameLengths.max())):
+        characters = byteArray[np.minimum(lineStarts + column, len(byteArray) - 1)]
+        nameChanged |= (characters[1:] != characters[:-1]) & (nameLengths[1:] > column)
+    runStarts = np.concatenate(([0], np.flatnonzero(nameChanged) + 1))
+    runEnds = np.concatenate((runStarts[1:], [numLines]))
+    runs = []
+    for (runStart,runEnd) in zip(runStarts,runEnds):
+        name = block[lineStarts[runStart]:separators[runStart,0]].decode()
+        end = block[separators[runEnd-1,1]+1:separators[runEnd-1,2]].decode()
+        runs.append((name,int(runStart),int(runEnd),end))
+
+    #Coverage is the last field on each line, excluding any carriage return
+    fieldStarts = separators[:,2] + 1
+    fieldEnds = lineEnds - (byteArray[lineEnds - 1] == 13)
+    (coverage,parsed) = parseDecimalFields(block, fieldStarts, fieldEnds - fieldStarts)
+    #Anything that is not a plain decimal number (e.g. exponents or nan) is converted by numpy as float does,
+    #anything numpy does not accept either is left to float to convert or report
+    if not parsed.all():
+        unparsed = np.flatnonzero(~parsed)
+        try:
+            coverage[unparsed] = fieldStrings(byteArray, fieldStarts[unparsed], fieldEnds[unparsed]).astype(np.float64)
+        except ValueError:
+            coverage[unparsed] = [float(block[fieldStarts[i]:fieldEnds[i]]) for i in unparsed]
+    return (runs,coverage)
+
+#Parses fields of block made of digits with at most one decimal point, given their starts and lengths.
+#The fields are read one character column at a time, adding each digit to an integer mantissa which is then
+#divided by the power of ten given by the number of digits after the point. Mantissas of at most 15 digits
+#and these powers are exact in float64, so the result is rounded exactly like float would.
+#Returns the values and a mask of the fields that could be parsed this way.
+def parseDecimalFields(block, starts, lengths):
+    parsed = np.ones(len(starts), dtype=bool)
+    #Columns are compared as bytes, fields too long to be parsed are only read one character past the longest allowed
+    lengths = np.minimum(lengths, maxDecimalLength + 2).astype(np.uint8)
+    byteArray = np.frombuffer(block + b"\0"*(maxDecimalLength + 2), dtype=np.uint8)
+    mantissa = np.zeros(len(starts))
+    fractionDigits = np.zeros(len(starts), dtype=np.uint8)
+    seenPoint = np.zeros(len(starts), dtype=bool)
+    for column in range(int(lengths.max()) if len(lengths) else 0):
+        characters = byteArray[starts + column]
+        inField = lengths > column
+        #Characters below '0' wrap around to large values
+        digits = characters - np.uint8(48)
+        isDigit = (digits < 10) & inField
+        isPoint = (characters == 46) & inField
+        parsed &= isDigit | (isPoint & ~seenPoint) | ~inField
+        #The mantissa is multiplied by 10 and the digit added only where there is a digit
+        mantissa = mantissa*(isDigit*np.uint8(9) + np.uint8(1)) + digits*isDigit
+        fractionDigits += isDigit & seenPoint
+        seenPoint |= isPoint
+    numDigits = lengths - seenPoint
+    parsed &= (numDigits > 0) & (numDigits <= maxDecimalLength)
+    return (mantissa / floatPowersOfTen[fractionDigits],parsed)
+
+#Returns the fields of byteArray from starts to ends (not included) as an array of byte strings
+#The fields are copied into the rows of a byte matrix as wide as the longest field, padded with zero bytes,
+#which is then viewed as fixed width strings (these drop the padding).
+def fieldStrings(byteArray, starts, ends):
+    lengths = ends - starts
+    width = max(int(lengths.max()) if len(lengths) else 0, 1)
+    columns = np.arange(width)
+    fields = byteArray[np.minimum(starts[:,None] + columns, len(byteArray) - 1)]
+    fields[columns >= lengths[:,None]] = 0
+    return np.ascontiguousarray(fields).view("S" + str(width)).ravel()
+
 def readCytoTab(toRead):
     cytoTabName = toRead
     cytoTabInfo = []
-    with open(toRead, 'r') as tab:
+    with openFile(toRead) as tab:
 
 		#Read the first line in the file, should start with #chromosome.
         line = tab.readline()
@@ -100,50 +222,219 @@ def readCytoTab(toRead):
             cytoTabInfo.append(cytoTab)
     return cytoTabInfo
 
-def readVCFFile(toRead, chromosomes):
-    vcfFileName = toRead
-    vcfInfoLines = []
-    with open(toRead, 'r') as vcf:
+#Cytobands of a cytoband file as read by readCytoTab, grouped per chromosome and sorted by start, so that the bands of
+#a chromosome can be accessed directly and the band holding a position found by bisection
+class CytobandIndex():
+
+    def __init__(self, cytoTab):
+        self.bands = {}
+        for cyto in cytoTab or []:
+            self.bands.setdefault(cyto[0], []).append(cyto)
+        self.starts = {}
+        self.ends = {}
+        for (name,bands) in self.bands.items():
+            bands.sort(key=lambda cyto: int(cyto[1]))
+            self.starts[name] = [int(cyto[1]) for cyto in bands]
+            self.ends[name] = [int(cyto[2]) for cyto in bands]
+
+    #Returns the bands of a chromosome as [chromosome, start, end, band name, stain] lists, sorted by start
+    def chromosomeBands(self, chromoName):
+        return self.bands.get(chromoName, [])
+
+    #Returns the [chromosome, start, end, band name, stain] list of the band holding position, or None if there is none
+    def bandAt(self, chromoName, position):
+        if chromoName not in self.bands:
+            return None
+        index = bisect.bisect_right(self.starts[chromoName], position) - 1
+        if index < 0 or position >= self.ends[chromoName][index]:
+            return None
+        return self.bands[chromoName][index]
+
+    #Returns the bands of all chromosomes with a stain, e.g. acen for centromeres
+    def stainedBands(self, stain):
+        return [cyto for bands in self.bands.values() for cyto in bands if cyto[4] == stain]
+
+#Number of variants passed on at a time by readVCFBatches
+vcfBatchSize = 5000
+
+#Uncompressed vcf files of at least this size are by default parsed by several processes,
+#each given a range of roughly vcfRangeSize bytes aligned to line breaks
+parallelVCFSize = 1 << 26
+vcfRangeSize = 1 << 23
+
+#Parses the data lines in a byte range of an uncompressed vcf, given as (file name, start, end).
+#Used by the worker processes of readVCFBatches; returns the variants as given by readVCF.readVCFLine.
+def parseVCFRange(vcfRange):
+    (toRead,start,end) = vcfRange
+    with open(toRead, 'rb') as vcf:
+        vcf.seek(start)
+        lines = vcf.read(end - start).decode().split('\n')
+    if not lines[-1]:
+        lines.pop()
+    return [readVCF.readVCFLine(line) for line in lines]
+
+#Reads a vcf file in batches, yielding (bytesRead, totalBytes, variants) for every batch.
+#bytesRead and totalBytes refer to the file on disk, also when it is compressed.
+#Each variant is the tuple returned by readVCF.readVCFLine: (chrA,posA,chrB,posB,event_type,description,format).
+#The meta-information and header lines are appended to vcfInfoLines before the first batch is yielded.
+#At least one (possibly empty) batch is yielded for a correctly formatted file, none otherwise.
+#If processes is more than 1 an uncompressed file is split into ranges parsed in a pool of that many processes,
+#yielding one batch per range in file order. By default this is done for large files using all cores.
+def readVCFBatches(toRead, vcfInfoLines, batchSize=vcfBatchSize, processes=None):
+    totalBytes = os.path.getsize(toRead)
+    if processes is None:
+        processes = multiprocessing.cpu_count() if totalBytes >= parallelVCFSize else 1
+    #The file is read as bytes so that the number of consumed bytes is known without seeking
+    with openFile(toRead, 'rb') as vcf:
 
         #The first lines should be a number of meta-information lines, prepended by ##.
         #Should begin with fileformat. Store these. Check first line for correct format.
-        line = vcf.readline()
+        line = vcf.readline().decode()
         if (not line.startswith("##fileformat=")):
             print("VCF file is not in correct format")
-            return None
+            return
         else:
             print("VCF file seems ok, continuing read")
         while (line.startswith("##")):
             vcfInfoLines.append(line)
-            line = vcf.readline()
+            line = vcf.readline().decode()
 
         #A header line prepended by # should follow containing 8 fields, tab-delimited.
         #These are in order CHROM, POS, ID, REF, ALT, QUAL, FILTER, INFO. Store in info line list.
         fields = line.split('\t')
         if (not (line.startswith('#') or len(fields) == 8) ):
             print("Header columns missing in VCF file")
-            return None
+            return
         else:
             vcfInfoLines.append(line)
 
         #All following lines are tab-delmited data lines.
-        #Store variant data in chromosome item corresponding to CHROM field
-        numvars = 0
-        for line in vcf:
-            numvars += 1
-            #Feed every data line into readVCF, returning: (chrA,posA,chrB,posB,event_type,description,format)
-            (chrA,posA,chrB,posB,event_type,description,format) = readVCF.readVCFLine(line)
-            #Iterate through chromosome list to find match to insert data into
-            for chromo in chromosomes:
-                if chromo.name == chrA:
-                    chromo.addVariant(chrA,posA,chrB,posB,event_type,description,format)
-                    break
-        return (chromosomes,vcfInfoLines)
+        if processes > 1 and not isinstance(vcf.raw, gzip.GzipFile):
+            vcfRanges = splitVCFRanges(toRead, vcf.tell(), totalBytes)
+            #The workers are spawned rather than forked, as forking from the loader thread while other threads hold locks can deadlock
+            with multiprocessing.get_context('spawn').Pool(min(processes, len(vcfRanges))) as pool:
+                #imap returns the parsed ranges in the order of the file
+                for (vcfRange,variants) in zip(vcfRanges, pool.imap(parseVCFRange, vcfRanges)):
+                    yield (vcfRange[2],totalBytes,variants)
+            yield (totalBytes,totalBytes,[])
+            return
+        #Feed every data line into readVCF and pass the variants on in batches.
+        variants = []
+        for rawLine in vcf:
+            variants.append(readVCF.readVCFLine(rawLine.decode()))
+            if len(variants) == batchSize:
+                yield (filePosition(vcf),totalBytes,variants)
+                variants = []
+        yield (filePosition(vcf),totalBytes,variants)
+
+#Splits the data lines of an uncompressed vcf, from dataStart to the end of the file, into ranges for parseVCFRange.
+#Each range ends at a line break, so that no line is split between ranges.
+def splitVCFRanges(toRead, dataStart, totalBytes):
+    vcfRanges = []
+    with open(toRead, 'rb') as vcf:
+        start = dataStart
+        while start < totalBytes:
+            vcf.seek(min(start + vcfRangeSize, totalBytes))
+            vcf.readline()
+            end = min(vcf.tell(), totalBytes)
+            vcfRanges.append((toRead,start,end))
+            start = end
+    return vcfRanges
+
+#Reads a vcf file, storing variant data in the chromosome item corresponding to the CHROM field.
+#Returns (chromosomes, vcfInfoLines, unplacedVariants), the last being variants on chromosomes not in the list.
+#progressCallback is called as progressCallback(bytesRead, totalBytes) after every batch of variants;
+#if it returns False the read is cancelled and None is returned.
+#processes is passed on to readVCFBatches.
+def readVCFFile(toRead, chromosomes, progressCallback=None, processes=None):
+    vcfInfoLines = []
+    batches = readVCFBatches(toRead, vcfInfoLines, processes=processes)
+    chromosomeIndex = createChromosomeIndex(chromosomes)
+    unplacedVariants = []
+    readBatch = False
+    for (bytesRead,totalBytes,variants) in batches:
+        readBatch = True
+        routeVariants(variants, chromosomeIndex, unplacedVariants)
+        if progressCallback and not progressCallback(bytesRead,totalBytes):
+            batches.close()
+            print("Reading VCF file cancelled")
+            return None
+    #No batch is read if the file is not in correct format
+    if not readBatch:
+        return None
+    setVariantWindows(chromosomes)
+    reportUnplaced(unplacedVariants)
+    return (chromosomes,vcfInfoLines,unplacedVariants)
+
+#Returns a dict of chromosome name to Chromosome, used to find the chromosome of each variant.
+#If a name occurs more than once the first chromosome with the name is used.
+def createChromosomeIndex(chromosomes):
+    chromosomeIndex = {}
+    for chromo in chromosomes:
+        chromosomeIndex.setdefault(chromo.name, chromo)
+    return chromosomeIndex
+
+#Adds variants, as returned by readVCF.readVCFLine, to the chromosome in chromosomeIndex matching their CHROM field.
+#Variants on chromosomes missing from the index (i.e. from the TAB file) are appended to unplacedVariants.
+def routeVariants(variants, chromosomeIndex, unplacedVariants):
+    for variant in variants:
+        chromo = chromosomeIndex.get(variant[0])
+        if chromo is None:
+            unplacedVariants.append(Variant(*variant))
+        else:
+            chromo.addVariant(*variant)
+
+#Sets the windows of the variants in chromosomes, oriented so that winA is on the chromosome holding the variant.
+#Called when variants have been read and when a saved dataset is loaded.
+def setVariantWindows(chromosomes):
+    chromosomeOrder = {}
+    for (position,chromo) in enumerate(chromosomes):
+        chromosomeOrder.setdefault(chromo.name, position)
+    for (position,chromo) in enumerate(chromosomes):
+        for variant in chromo.variants:
+            variant.setWindows(position > chromosomeOrder.get(variant.chrB, position))
+        #Connections and the variant table hold window positions, so these are created again when needed
+        chromo.connections = []
+        chromo.variantTable = None
+
+def reportUnplaced(unplacedVariants):
+    if unplacedVariants:
+        unplacedNames = sorted(set(variant.chrA for variant in unplacedVariants))
+        print(str(len(unplacedVariants)) + " variants on chromosomes not in TAB file: " + ", ".join(unplacedNames))
+
+#Reads only the variants within the given regions of a BGZF compressed vcf, using an index built on first use.
+#regions is a list of (chrom, start, end) as returned by vcfIndex.parseRegions.
+#Returns (chromosomes, vcfInfoLines, unplacedVariants) as readVCFFile does, or None if the file can not be read this way.
+def readVCFRegion(toRead, chromosomes, regions):
+    index = vcfIndex.loadIndex(toRead)
+    if index is None:
+        return None
+    reader = vcfIndex.BgzfReader(toRead)
+    vcfInfoLines = vcfIndex.readHeader(reader)
+    if (not vcfInfoLines or not vcfInfoLines[0].startswith("##fileformat=")):
+        print("VCF file is not in correct format")
+        reader.close()
+        return None
+    chromosomeIndex = createChromosomeIndex(chromosomes)
+    unplacedVariants = []
+    #Overlapping regions could contain the same record, keep track of which have been read
+    readOffsets = set()
+    for (chrom,start,end) in regions:
+        variants = []
+        for (offset,line) in vcfIndex.queryRegion(reader, index, chrom, start, end):
+            if offset not in readOffsets:
+                readOffsets.add(offset)
+                variants.append(readVCF.readVCFLine(line))
+        routeVariants(variants, chromosomeIndex, unplacedVariants)
+    reader.close()
+    setVariantWindows(chromosomes)
+    reportUnplaced(unplacedVariants)
+    return (chromosomes,vcfInfoLines,unplacedVariants)
 
 #Reads a general tab delimited file (such as a bed file)
 def readGeneralTab(toRead):
     tabLines = []
-    with open(toRead, 'r') as tab:
+    with openFile(toRead) as tab:
         #Skip first line
         line = tab.readline()
         for line in tab:
@@ -160,6 +451,7 @@ def readConfig(toRead):
     karyoConfig = {}
     heatmapConfig = {}
     colorConfig = {}
+    generalConfig = {}
     with open(toRead, 'r') as config:
         activeSection = "CIRCULAR"
         for line in config:
@@ -176,6 +468,8 @@ def readConfig(toRead):
                     activeSection = 'HEATMAP'
                 elif line.startswith('[COLORS]'):
                     activeSection = 'COLORS'
+                elif line.startswith('[GENERAL]'):
+                    activeSection = 'GENERAL'
             else:
                 if activeSection == "CIRCULAR":
                     fields = line.split('=')
@@ -193,9 +487,12 @@ def readConfig(toRead):
                     fields = line.split('=')
                     fields[1] = fields[1]
                     colorConfig[fields[0]] = fields[1].strip('\n')
-    return (circularConfig,coverageConfig,karyoConfig,heatmapConfig,colorConfig)
+                elif activeSection == 'GENERAL':
+                    fields = line.split('=')
+                    generalConfig[fields[0]] = fields[1].strip('\n')
+    return (circularConfig,coverageConfig,karyoConfig,heatmapConfig,colorConfig,generalConfig)
 
-def saveConfig(fileName,circularConfig,coverageConfig,karyoConfig,heatmapConfig,colorConfig):
+def saveConfig(fileName,circularConfig,coverageConfig,karyoConfig,heatmapConfig,colorConfig,generalConfig):
 
     with open(fileName,'r+') as config:
         configData = config.readlines()
@@ -217,6 +514,8 @@ def saveConfig(fileName,circularConfig,coverageConfig,karyoConfig,heatmapConfig,
                     activeSection = 'HEATMAP'
                 elif line.startswith('[COLORS]'):
                     activeSection = 'COLORS'
+                elif line.startswith('[GENERAL]'):
+                    activeSection = 'GENERAL'
             else:
                 if activeSection == "CIRCULAR":
                     fields = line.split('=')
@@ -232,6 +531,9 @@ def saveConfig(fileName,circularConfig,coverageConfig,karyoConfig,heatmapConfig,
                     line = line.replace(fields[1],heatmapConfig[fields[0]])
                 elif activeSection == 'COLORS':
                     pass
+                elif activeSection == "GENERAL":
+                    fields = line.split('=')
+                    line = fields[0] + '=' + generalConfig[fields[0]]
             line = line.strip('\n')
             newData.append(line)
         config.seek(0)
@@ -243,28 +545,195 @@ class Chromosome():
 
     def __init__(self, name):
         self.name = name
-        self.coverage = []
-        self.coverageLog = []
+        self.coverage = np.zeros(0, dtype=np.float32)
         self.display = False
         self.variants = []
         self.connections = []
         self.display_connections = False
         self.display_cytoBandNames = False
+        #Columnar copy of the variants, built when first needed by getVariantTable
+        self.variantTable = None
+        #Increased every time a variant is added, toggled or marked
+        self.variantVersion = 0
+        #For chromosomes loaded from a saved dataset, reads the variants from the file when they are first used
+        self.variantSource = None
+        #Coverage pyramids of the coverage and its log2, built when first needed by getCoveragePyramid
+        self.coveragePyramids = {}
+        #Cumulative sums of the coverage, built when first needed by coverageStats
+        self.coverageIndex = None
+        #Mask of the coverage bins excluded by the user, None if no bins are excluded
+        self.excludedBins = None
 
-    def addCoverage(self, coverageValue):
-        self.coverage.append(coverageValue)
-        if(coverageValue > 0):
-            self.coverageLog.append(math.log(coverageValue,2))
-        else:
-            self.coverageLog.append(0)
+    #Variants of chromosomes loaded from a saved dataset are created when first used
+    def __getattr__(self, name):
+        if name == 'variants' and self.__dict__.get('variantSource') is not None:
+            self.variants = self.variantSource.createVariants()
+            return self.variants
+        raise AttributeError(name)
+
+    #The variant table, coverage pyramids and coverage index are not saved, they are built again when needed.
+    #Memory-mapped coverage and variants of a loaded dataset are copied into the pickle.
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['variants'] = self.variants
+        state['coverage'] = np.array(self.coverage)
+        state['variantTable'] = None
+        state['variantSource'] = None
+        state['coveragePyramids'] = {}
+        state['coverageIndex'] = None
+        return state
+
+    #Datasets pickled by earlier versions store coverage and its log2 as lists, and variants as lists; convert these on load
+    def __setstate__(self, state):
+        state.pop('coverageLog', None)
+        self.variantVersion = 0
+        self.excludedBins = None
+        self.__dict__.update(state)
+        self.variantTable = None
+        self.variantSource = None
+        self.coveragePyramids = {}
+        self.coverageIndex = None
+        self.coverage = np.asarray(self.coverage, dtype=np.float32)
+        #Variants were stored as lists before the Variant class
+        self.variants = [Variant.fromList(variant) if isinstance(variant, list) else variant for variant in self.variants]
+
+    #Coverage is kept as one contiguous float32 array per chromosome
+    def setCoverage(self, coverageValues):
+        self.coverage = np.asarray(coverageValues, dtype=np.float32)
+        self.coveragePyramids = {}
+        self.coverageIndex = None
+
+    #The log2 track is computed on demand instead of being stored. Bins without coverage get 0.
+    @property
+    def coverageLog(self):
+        coverageLog = np.zeros(len(self.coverage), dtype=np.float32)
+        positive = self.coverage > 0
+        coverageLog[positive] = np.log2(self.coverage[positive])
+        return coverageLog
+
+    #Returns the CoveragePyramid of the coverage, or of its log2 if log is True
+    def getCoveragePyramid(self, log=False):
+        if log not in self.coveragePyramids:
+            self.coveragePyramids[log] = CoveragePyramid(self.coverageLog if log else self.coverage)
+        return self.coveragePyramids[log]
+
+    #Excludes the coverage bins overlapping the regions given as arrays of start and end bp
+    def excludeRegions(self, starts, ends):
+        binCount = len(self.coverage)
+        startBins = np.clip(np.asarray(starts, dtype=np.int64) // coverageBinSize, 0, binCount)
+        endBins = np.clip(-(-np.asarray(ends, dtype=np.int64) // coverageBinSize), 0, binCount)
+        validRegions = endBins > startBins
+        #Each region adds one at its first bin and subtracts one after its last, bins with a positive sum are excluded
+        changes = np.zeros(binCount + 1, dtype=np.int64)
+        np.add.at(changes, startBins[validRegions], 1)
+        np.add.at(changes, endBins[validRegions], -1)
+        excluded = np.cumsum(changes[:-1]) > 0
+        if self.excludedBins is not None:
+            excluded |= self.excludedBins
+        self.excludedBins = excluded if excluded.any() else None
+
+    def clearExclusions(self):
+        self.excludedBins = None
+
+    #Returns the mean coverage in windows of window bins and the index of each window. Excluded bins are left out
+    #of the means, and windows where all bins are excluded are left out.
+    def windowCoverage(self, window):
+        if self.excludedBins is None:
+            coverageMeans = self.getCoveragePyramid().windowStats(window)[0]
+            return (coverageMeans,np.arange(len(coverageMeans)))
+        if len(self.coverage) == 0:
+            return (np.zeros(0, dtype=np.float64),np.zeros(0, dtype=np.int64))
+        includedBins = ~self.excludedBins
+        windowStarts = np.arange(0, len(self.coverage), window)
+        sums = np.add.reduceat(np.where(includedBins, self.coverage, 0).astype(np.float64), windowStarts)
+        binCounts = np.add.reduceat(includedBins.astype(np.int64), windowStarts)
+        windows = np.flatnonzero(binCounts)
+        return (sums[windows] / binCounts[windows],windows)
+
+    #Returns the mean and standard deviation of the coverage in the bins overlapping bp start to end,
+    #or None if there are no such bins
+    def coverageStats(self, start, end):
+        if self.coverageIndex is None:
+            self.coverageIndex = CoverageIndex(self.coverage)
+        return self.coverageIndex.binStats(int(start) // coverageBinSize, -(-int(end) // coverageBinSize))
 
     def setEnd(self,end):
         self.end = end
 
     def addVariant(self,chrA,posA,chrB,posB,event_type,description,format):
+        self.variants.append(Variant(chrA,posA,chrB,posB,event_type,description,format))
+        self.variantTable = None
+        self.variantVersion += 1
+
+    #Returns the VariantTable of the variants, building it if the variants have changed since it was last built
+    def getVariantTable(self):
+        if self.variantTable is None:
+            #The table of a loaded dataset can be read from the file without creating the variants
+            if 'variants' not in self.__dict__ and self.variantSource is not None:
+                self.variantTable = self.variantSource.createTable()
+            else:
+                self.variantTable = VariantTable(self.variants)
+        return self.variantTable
+
+    #Returns the genes, posA, chrB and posB of each variant. For a loaded dataset these are read from the file
+    #if the variants have not been created.
+    def variantGenes(self):
+        if 'variants' not in self.__dict__ and self.variantSource is not None:
+            source = self.variantSource
+            chrB = [source.names[code] for code in source.column('chrB').tolist()]
+            return list(zip(source.readStrings('genes'),source.column('posA').tolist(),chrB,source.column('posB').tolist()))
+        return [(variant.genes,variant.posA,variant.chrB,variant.posB) for variant in self.variants]
+
+    #Toggling and marking goes through these so that the variant table is kept in sync with the variants
+    def setVariantActive(self, row, active):
+        self.variants[row].active = active
+        if self.variantTable is not None:
+            self.variantTable.active[row] = active
+        self.variantVersion += 1
+
+    def setVariantMarked(self, row, marked):
+        self.variants[row].marked = marked
+        if self.variantTable is not None:
+            self.variantTable.marked[row] = marked
+        self.variantVersion += 1
+
+    def createConnections(self):
+        #These corresponding values for the variant are added to the list: CHRA,CHRB,position on chrA,position on chrB,CYTOBAND
+        #The positions are the ends of the windows for interchromosomal variants, and posA and posB otherwise
+        self.connections = []
+        for variant in self.variants:
+            if not variant.active:
+                continue
+            else:
+                if variant.chrA != variant.chrB and variant.winAEnd is not None:
+                    connection = [variant.chrA,variant.chrB,variant.winAEnd,variant.winBEnd,variant.cytoband]
+                    self.connections.append(connection)
+                else:
+                    connection = [variant.chrA, variant.chrB, variant.posA, variant.posB, variant.cytoband]
+                    self.connections.append(connection)
+
+#A variant read from a vcf record. Chromosome names and the event type are interned strings and positions are ints.
+#description and format hold the INFO and FORMAT fields, genes, cytoband and rankScore are taken from INFO.
+#active is False if the variant has been toggled off, marked is True if the variant has been marked by the user.
+#winAStart, winAEnd, winBStart and winBEnd are the WINA and WINB windows as ints, set by setVariantWindows.
+class Variant():
+
+    __slots__ = ('chrA','posA','chrB','posB','eventType','description','format','genes','cytoband','active','rankScore','marked',
+                 'winAStart','winAEnd','winBStart','winBEnd')
+    #Fields saved when pickled, the windows are set again by setVariantWindows when a dataset is loaded
+    savedFields = __slots__[:12]
+
+    def __init__(self,chrA,posA,chrB,posB,event_type,description,format):
+        self.chrA = sys.intern(chrA)
+        self.posA = int(posA)
+        self.chrB = sys.intern(chrB)
+        self.posB = int(posB)
+        self.eventType = sys.intern(event_type)
+        self.description = description
+        self.format = format
         #The variants are by default set to be shown
-        display_variant = True
-        marked = False
+        self.active = True
+        self.marked = False
         #For every variant we would like the genes in CSQ, if this exists
         if "CSQ" in description:
             csqField = description["CSQ"]
@@ -278,37 +747,330 @@ class Chromosome():
             #Convert the list to a set to remove any duplicates
             geneSet = set(geneList)
             s = ', '
-            allGenes = s.join(geneSet)
+            self.genes = s.join(geneSet)
         else:
-            allGenes = ""
+            self.genes = ""
         #We would also like the CYTOBAND field, if this exists
         if "CYTOBAND" in description:
-            cband = description["CYTOBAND"]
+            self.cytoband = description["CYTOBAND"]
         else:
-            cband = None
+            self.cytoband = None
         if "RankScore" in description:
-            rankScore = description["RankScore"]
+            self.rankScore = description["RankScore"]
         else:
-            rankScore = None
-        #Add the variant data to this chromosome
-        variant = [chrA,posA,chrB,posB,event_type,description,format,allGenes,cband,display_variant,rankScore, marked]
-        self.variants.append(variant)
+            self.rankScore = None
+        self.setWindows(None)
 
-    def createConnections(self):
-        #These corresponding values for the variant are added to the list: CHRA,CHRB,WINA,WINB,CYTOBAND
-        self.connections = []
-        for variant in self.variants:
-            if not variant[9]:
-                continue
+    #Sets the windows from WINA and WINB. WINA is on the chromosome first in order, so the windows are switched
+    #if switched is True to have winA on the chromosome holding the variant. If switched is None, or there are no
+    #windows, the windows are set to None.
+    def setWindows(self, switched):
+        description = self.description
+        if switched is None or not ("WINA" in description and "WINB" in description):
+            (self.winAStart,self.winAEnd,self.winBStart,self.winBEnd) = (None,None,None,None)
+            return
+        winA = description["WINA"].split(',')
+        winB = description["WINB"].split(',')
+        if switched:
+            (winA,winB) = (winB,winA)
+        (self.winAStart,self.winAEnd) = (int(winA[0]),int(winA[1]))
+        (self.winBStart,self.winBEnd) = (int(winB[0]),int(winB[1]))
+
+    #Creates a Variant from the list [chrA,posA,chrB,posB,event_type,description,format,allGenes,cband,active,rankScore,marked]
+    #used to store variants in datasets saved by earlier versions
+    @classmethod
+    def fromList(cls, variantList):
+        variant = cls.__new__(cls)
+        variant.__setstate__(tuple(variantList))
+        #INFO and FORMAT were stored as dicts, these are turned back into the strings held by the lazy mappings
+        if isinstance(variant.description, dict):
+            variant.description = readVCF.LazyInfo.fromDict(variant.description)
+        if isinstance(variant.format, dict):
+            variant.format = readVCF.LazyFormat.fromDict(variant.format)
+        return variant
+
+    #Saved as a tuple of the values of savedFields
+    def __getstate__(self):
+        return tuple(getattr(self, name) for name in self.savedFields)
+
+    def __setstate__(self, state):
+        for (name,value) in zip(self.savedFields, state):
+            setattr(self, name, value)
+        (self.winAStart,self.winAEnd,self.winBStart,self.winBEnd) = (None,None,None,None)
+        #Strings are interned again when loaded, so that equal names share memory
+        self.chrA = sys.intern(self.chrA)
+        self.chrB = sys.intern(self.chrB)
+        self.eventType = sys.intern(self.eventType)
+
+#Returns the sorted distinct values of a list of strings and an array with the index of each value among these
+def encodeColumn(values):
+    (names,codes) = np.unique(np.array(values, dtype=object), return_inverse=True)
+    return (list(names), codes.astype(np.int32))
+
+#Structure-of-arrays copy of the variants of a chromosome, so that views can select variants with boolean masks
+#instead of looping over the Variant objects. Row i holds variant i of the chromosome.
+#Chromosome B and SVTYPE are stored as codes into chrBNames and typeNames. The windows are stored as in the
+#variants, with winA on this chromosome; hasWindows is False for variants without them.
+class VariantTable():
+
+    def __init__(self, variants):
+        count = len(variants)
+        self.posA = np.fromiter((variant.posA for variant in variants), dtype=np.int64, count=count)
+        self.posB = np.fromiter((variant.posB for variant in variants), dtype=np.int64, count=count)
+        (self.chrBNames,self.chrB) = encodeColumn([variant.chrB for variant in variants])
+        (self.typeNames,self.typeCode) = encodeColumn([variant.description.get("SVTYPE", "") for variant in variants])
+        self.active = np.fromiter((variant.active for variant in variants), dtype=bool, count=count)
+        self.marked = np.fromiter((variant.marked for variant in variants), dtype=bool, count=count)
+        self.hasWindows = np.zeros(count, dtype=bool)
+        self.winAStart = np.zeros(count, dtype=np.int64)
+        self.winAEnd = np.zeros(count, dtype=np.int64)
+        self.winBStart = np.zeros(count, dtype=np.int64)
+        self.winBEnd = np.zeros(count, dtype=np.int64)
+        for (row,variant) in enumerate(variants):
+            if variant.winAStart is not None:
+                self.hasWindows[row] = True
+                (self.winAStart[row],self.winAEnd[row]) = (variant.winAStart,variant.winAEnd)
+                (self.winBStart[row],self.winBEnd[row]) = (variant.winBStart,variant.winBEnd)
+
+    #Creates a table from arrays holding the columns, e.g. read from a saved dataset
+    @classmethod
+    def fromColumns(cls, columns):
+        table = cls.__new__(cls)
+        table.__dict__.update(columns)
+        return table
+
+    def __len__(self):
+        return len(self.posA)
+
+    #Mask of variants with chromosome B named name
+    def chrBMask(self, name):
+        if name not in self.chrBNames:
+            return np.zeros(len(self), dtype=bool)
+        return self.chrB == self.chrBNames.index(name)
+
+    #Mask of variants where the name of chromosome B starts with any of prefixes
+    def chrBPrefixMask(self, prefixes):
+        nameMask = np.array([name.startswith(prefixes) for name in self.chrBNames], dtype=bool)
+        return nameMask[self.chrB]
+
+    #Mask of variants with SVTYPE svType
+    def typeMask(self, svType):
+        if svType not in self.typeNames:
+            return np.zeros(len(self), dtype=bool)
+        return self.typeCode == self.typeNames.index(svType)
+
+    #Mask of the variants in rows, e.g. the rows selected in a variant table
+    def rowMask(self, rows):
+        mask = np.zeros(len(self), dtype=bool)
+        mask[list(rows)] = True
+        return mask
+
+#Cumulative sums of the coverage of a chromosome and of its squares, so that the mean and standard deviation
+#of the coverage in any range of bins are found from two entries of each.
+#The sums are of the difference from the mean coverage, which keeps the rounding error of the variance small.
+class CoverageIndex():
+
+    def __init__(self, coverage):
+        values = np.asarray(coverage, dtype=np.float64)
+        self.shift = float(values.mean()) if len(values) else 0.0
+        values = values - self.shift
+        self.sums = np.zeros(len(values) + 1, dtype=np.float64)
+        np.cumsum(values, out=self.sums[1:])
+        self.squareSums = np.zeros(len(values) + 1, dtype=np.float64)
+        np.cumsum(values*values, out=self.squareSums[1:])
+
+    #Returns the mean and standard deviation of the coverage in bins start to end (not included),
+    #or None if the range holds no bins
+    def binStats(self, start, end):
+        start = max(start, 0)
+        end = min(end, len(self.sums) - 1)
+        if end <= start:
+            return None
+        binCount = end - start
+        mean = (self.sums[end] - self.sums[start]) / binCount
+        #Rounding can make the variance of an even region slightly negative
+        variance = max((self.squareSums[end] - self.squareSums[start]) / binCount - mean*mean, 0.0)
+        return (float(mean) + self.shift,math.sqrt(variance))
+
+#The features of one bed track (or similarly structured file) on one chromosome, stored as int start and end arrays
+#sorted by start, with the text of each feature, so that the features within a region are found by bisection
+class BedTrack():
+
+    #lines are [track name, start, end, text...] lists as created by common.createBedDict
+    def __init__(self, name, lines):
+        self.name = name
+        starts = np.fromiter((int(line[1]) for line in lines), dtype=np.int64, count=len(lines))
+        ends = np.fromiter((int(line[2]) for line in lines), dtype=np.int64, count=len(lines))
+        order = np.argsort(starts, kind='stable')
+        self.starts = starts[order]
+        self.ends = ends[order]
+        self.texts = [lines[row][3] if len(lines[row]) > 3 else "" for row in order.tolist()]
+
+    def __len__(self):
+        return len(self.starts)
+
+    #Returns the rows of the features lying within start to end
+    def containedRows(self, start, end):
+        first = np.searchsorted(self.starts, start, side='left')
+        last = np.searchsorted(self.starts, end, side='right')
+        return first + np.flatnonzero(self.ends[first:last] <= end)
+
+#Number of window sizes whose stats are kept by each CoveragePyramid
+windowCacheSize = 4
+
+#Coverage of a chromosome summed over bins of 2, 4, 8... coverage bins, so that views can get the mean, min and max
+#coverage over windows of any size from the level closest to the window size instead of the raw bins.
+#Level k holds the sums, minimums and maximums over blocks of 2**k bins; the last block of a level may be partial.
+#Level 0 is the coverage itself.
+class CoveragePyramid():
+
+    def __init__(self, coverage):
+        self.coverage = coverage
+        self.length = len(coverage)
+        self.levels = [(None,coverage,coverage)]
+        (sums,mins,maxs) = (np.asarray(coverage, dtype=np.float64),coverage,coverage)
+        while len(sums) > 1:
+            #Odd levels are padded so that the last block holds the last bin only
+            if len(sums) % 2:
+                sums = np.append(sums, 0)
+                mins = np.append(mins, np.float32(np.inf))
+                maxs = np.append(maxs, np.float32(-np.inf))
+            sums = sums.reshape(-1, 2).sum(axis=1)
+            mins = mins.reshape(-1, 2).min(axis=1)
+            maxs = maxs.reshape(-1, 2).max(axis=1)
+            self.levels.append((sums,mins,maxs))
+        #Window stats by window size, views ask for the same few window sizes on every redraw
+        self.windowCache = {}
+
+    #Returns the sums, minimums and maximums of a level
+    def levelArrays(self, level):
+        (sums,mins,maxs) = self.levels[level]
+        if sums is None:
+            sums = np.asarray(self.coverage, dtype=np.float64)
+        return (sums,mins,maxs)
+
+    #Returns the mean, min and max coverage in windows of window bins, the same windows as coverage[i:i+window].
+    #These are combined from the highest level with a block size dividing window, so only windows of an odd
+    #number of bins are computed from the raw bins. The stats of the last windowCacheSize window sizes are kept,
+    #the returned arrays are read-only as they are shared between calls.
+    def windowStats(self, window):
+        if window not in self.windowCache:
+            if len(self.windowCache) >= windowCacheSize:
+                del self.windowCache[next(iter(self.windowCache))]
+            stats = self.computeWindowStats(window)
+            for array in stats:
+                array.flags.writeable = False
+            self.windowCache[window] = stats
+        return self.windowCache[window]
+
+    def computeWindowStats(self, window):
+        if self.length == 0:
+            empty = np.zeros(0, dtype=np.float64)
+            return (empty,empty.copy(),empty.copy())
+        level = min((window & -window).bit_length() - 1, len(self.levels) - 1)
+        (sums,mins,maxs) = self.levelArrays(level)
+        blocks = window >> level
+        windowCount = -(-self.length // window)
+        padding = windowCount*blocks - len(sums)
+        sums = np.append(sums, np.zeros(padding)).reshape(windowCount, blocks).sum(axis=1)
+        mins = np.append(mins, np.full(padding, np.inf, dtype=np.float32)).reshape(windowCount, blocks).min(axis=1)
+        maxs = np.append(maxs, np.full(padding, -np.inf, dtype=np.float32)).reshape(windowCount, blocks).max(axis=1)
+        binCounts = np.full(windowCount, window, dtype=np.float64)
+        binCounts[-1] = self.length - (windowCount - 1)*window
+        return (sums / binCounts, mins, maxs)
+
+#Builds the coverage pyramids of chromosomes, done when a dataset is read so that views find them ready
+def createCoveragePyramids(chromosomes):
+    for chromo in chromosomes:
+        chromo.getCoveragePyramid()
+
+#Sparse counts of variants in bins of a heatmap, for each zoom level.
+#Level n has bins of binSize/zoomFactor^n bp, numbered from the start of the chromosomes, so that a window of the heatmap
+#at any zoom level is sliced from the level instead of counted from the variants again.
+#Each level holds the x bins, y bins and counts of the nonempty bins, sorted by x bin and then y bin, so its size is bounded by the number of variants.
+class HeatmapPyramid():
+
+    def __init__(self, starts, ends, binSize, zoomFactor):
+        #Positions are doubled so that the centers of windows (ending in .5) are counted with integers
+        self.starts = np.rint(np.asarray(starts, dtype=np.float64)*2).astype(np.int64)
+        self.ends = np.rint(np.asarray(ends, dtype=np.float64)*2).astype(np.int64)
+        self.binSize = int(binSize)
+        self.zoomFactor = int(zoomFactor)
+        #Levels are counted when they are first used
+        self.levels = {}
+
+    def levelEntries(self, level):
+        if level not in self.levels:
+            #bin = floor(position*zoomFactor^level/binSize), with the common factor removed to keep the products small
+            (factor,divisor) = (self.zoomFactor**level,2*self.binSize)
+            common = math.gcd(factor,divisor)
+            (factor,divisor) = (factor // common,divisor // common)
+            (xBins,yBins) = (self.starts*factor // divisor,self.ends*factor // divisor)
+            if len(xBins) == 0:
+                self.levels[level] = (xBins,yBins,np.zeros(0, dtype=np.int64))
+                return self.levels[level]
+            #Bin pairs are counted as single keys, sorting by x bin and then y bin, unless the keys would overflow
+            (xMin,yMin) = (int(xBins.min()),int(yBins.min()))
+            ySpan = int(yBins.max()) - yMin + 1
+            if (int(xBins.max()) - xMin + 1)*ySpan < 2**62:
+                (keys,counts) = np.unique((xBins - xMin)*ySpan + (yBins - yMin), return_counts=True)
+                (xBins,yBins) = (keys // ySpan + xMin,keys % ySpan + yMin)
             else:
-                description = variant[5]
-                if "CYTOBAND" in description:
-                    cband = description["CYTOBAND"]
-                else:
-                    cband = None
-                if variant[0] is not variant[2]:
-                    connection = [variant[0],variant[2],description["WINA"],description["WINB"],cband]
-                    self.connections.append(connection)
-                else:
-                    connection = [variant[0], variant[2], str(variant[1]) + "," + str(variant[1]), str(variant[3]) + "," + str(variant[3]), cband]
-                    self.connections.append(connection)
+                order = np.lexsort((yBins,xBins))
+                (xBins,yBins) = (xBins[order],yBins[order])
+                firsts = np.flatnonzero(np.concatenate(([True], (np.diff(xBins) != 0) | (np.diff(yBins) != 0))))
+                counts = np.diff(np.append(firsts, len(xBins)))
+                (xBins,yBins) = (xBins[firsts],yBins[firsts])
+            self.levels[level] = (xBins,yBins,counts)
+        return self.levels[level]
+
+    #Returns the number of bytes held by the positions and levels
+    def memorySize(self):
+        size = self.starts.nbytes + self.ends.nbytes
+        for (xBins,yBins,counts) in self.levels.values():
+            size += xBins.nbytes + yBins.nbytes + counts.nbytes
+        return size
+
+    #Returns the nonempty bins of a window of xCount by yCount bins of a level, starting at bin xStart on the x axis and yStart on the y axis,
+    #as the x bins and y bins (counted from the start of the window) and counts of these
+    def windowEntries(self, level, xStart, yStart, xCount, yCount):
+        (xBins,yBins,counts) = self.levelEntries(level)
+        (first,last) = np.searchsorted(xBins, [xStart,xStart + xCount])
+        (xBins,yBins,counts) = (xBins[first:last] - xStart,yBins[first:last] - yStart,counts[first:last])
+        inside = (yBins >= 0) & (yBins < yCount)
+        return (xBins[inside],yBins[inside],counts[inside])
+
+#Heatmap pyramids of a dataset, kept so that heatmaps shown before are not counted again.
+#Pyramids are stored with the variant version of the chromosome they were counted from, and are dropped when asked for
+#after its variants have changed. The least recently used pyramids are removed when they hold more than sizeLimit bytes,
+#and a pyramid larger than sizeLimit is not kept at all. Pyramids grow as levels are counted, so evictPyramids is called again after that.
+class HeatmapCache():
+
+    def __init__(self, sizeLimit):
+        self.sizeLimit = sizeLimit
+        self.pyramids = collections.OrderedDict()
+
+    #Returns the pyramid stored for key, or None if there is none or it was counted from another variant version
+    def getPyramid(self, key, variantVersion):
+        if key not in self.pyramids:
+            return None
+        (version,pyramid) = self.pyramids[key]
+        if version != variantVersion:
+            del self.pyramids[key]
+            return None
+        self.pyramids.move_to_end(key)
+        return pyramid
+
+    def storePyramid(self, key, variantVersion, pyramid):
+        if pyramid.memorySize() > self.sizeLimit:
+            return
+        self.pyramids[key] = (variantVersion,pyramid)
+        self.pyramids.move_to_end(key)
+        self.evictPyramids()
+
+    #Removes the least recently used pyramids until the rest fit in sizeLimit
+    def evictPyramids(self):
+        size = sum(pyramid.memorySize() for (version,pyramid) in self.pyramids.values())
+        while size > self.sizeLimit:
+            (key,(version,pyramid)) = self.pyramids.popitem(last=False)
+            size -= pyramid.memorySize()
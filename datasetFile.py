@@ -0,0 +1,221 @@
+import os
+import json
+import struct
+import numpy as np
+import data
+import readVCF
+
+#A saved dataset is a single file holding the coverage and variant columns of the dataset as raw arrays, so that
+#they can be memory-mapped when the dataset is loaded, and a JSON manifest describing the dataset and the arrays.
+#The file starts with a fixed size header giving the format version and the position of the manifest,
+#which is written after the arrays. Each array starts at a multiple of arrayAlignment.
+datasetMagic = b"SCIVISDS"
+datasetVersion = 1
+datasetExtension = ".scivis"
+headerFormat = "<8sIQQ"
+headerSize = struct.calcsize(headerFormat)
+arrayAlignment = 4096
+
+#Variant fields holding strings, saved as one block of utf-8 text with the offset of each string
+stringColumns = ('info','format','genes','cytoband','rankScore')
+
+#Checks whether a file is a saved dataset in this format
+def isDatasetFile(fileName):
+    with open(fileName, 'rb') as datasetFile:
+        return datasetFile.read(len(datasetMagic)) == datasetMagic
+
+#Returns the strings as one utf-8 encoded array and the offsets of the strings in it
+def encodeStrings(strings):
+    encoded = [string.encode() for string in strings]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(string) for string in encoded], dtype=np.int64)
+    return (np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets)
+
+#Returns the arrays holding the fields of variants as columns. Chromosome names, event types and SVTYPE values
+#are stored as indexes into names, which is extended with any names not already in it.
+def createVariantColumns(variants, names, nameIndex):
+    def nameCodes(values):
+        codes = np.zeros(len(values), dtype=np.int32)
+        for (row,value) in enumerate(values):
+            if value not in nameIndex:
+                nameIndex[value] = len(names)
+                names.append(value)
+            codes[row] = nameIndex[value]
+        return codes
+    count = len(variants)
+    columns = {}
+    columns['posA'] = np.array([variant.posA for variant in variants], dtype=np.int64)
+    columns['posB'] = np.array([variant.posB for variant in variants], dtype=np.int64)
+    columns['chrA'] = nameCodes([variant.chrA for variant in variants])
+    columns['chrB'] = nameCodes([variant.chrB for variant in variants])
+    columns['eventType'] = nameCodes([variant.eventType for variant in variants])
+    columns['typeCode'] = nameCodes([variant.description.get("SVTYPE", "") for variant in variants])
+    columns['active'] = np.array([variant.active for variant in variants], dtype=bool).reshape(count)
+    columns['marked'] = np.array([variant.marked for variant in variants], dtype=bool).reshape(count)
+    columns['hasCytoband'] = np.array([variant.cytoband is not None for variant in variants], dtype=bool).reshape(count)
+    columns['hasRankScore'] = np.array([variant.rankScore is not None for variant in variants], dtype=bool).reshape(count)
+    columns['hasWindows'] = np.array([variant.winAStart is not None for variant in variants], dtype=bool).reshape(count)
+    for window in ('winAStart','winAEnd','winBStart','winBEnd'):
+        columns[window] = np.array([getattr(variant, window) or 0 for variant in variants], dtype=np.int64)
+    strings = {}
+    strings['info'] = [variant.description.info for variant in variants]
+    strings['format'] = [variant.format.columns for variant in variants]
+    strings['genes'] = [variant.genes for variant in variants]
+    strings['cytoband'] = [variant.cytoband or "" for variant in variants]
+    strings['rankScore'] = [variant.rankScore or "" for variant in variants]
+    for name in stringColumns:
+        (columns[name + 'Text'],columns[name + 'Offsets']) = encodeStrings(strings[name])
+    return columns
+
+#Saves the dataset itemData (as created by SciVisView.createDatasetItem) to fileName
+def saveDataset(itemData, fileName):
+    chromosomes = itemData['chromosomeList']
+    unplacedVariants = itemData.get('unplacedVariants', [])
+    #All variants are saved in the same columns, those of each chromosome in one range of rows
+    allVariants = []
+    chromosomeInfo = []
+    coverageStart = 0
+    for chromo in chromosomes:
+        variantStart = len(allVariants)
+        allVariants.extend(chromo.variants)
+        chromosomeInfo.append({'name':chromo.name, 'end':getattr(chromo, 'end', None), 'display':chromo.display,
+            'display_connections':chromo.display_connections, 'display_cytoBandNames':chromo.display_cytoBandNames,
+            'coverageStart':coverageStart, 'coverageEnd':coverageStart + len(chromo.coverage),
+            'variantStart':variantStart, 'variantEnd':len(allVariants)})
+        coverageStart += len(chromo.coverage)
+    unplacedStart = len(allVariants)
+    allVariants.extend(unplacedVariants)
+    names = []
+    arrays = createVariantColumns(allVariants, names, {})
+    arrays['coverage'] = np.concatenate([np.asarray(chromo.coverage, dtype=np.float32) for chromo in chromosomes] + [np.zeros(0, dtype=np.float32)])
+    #Coverage bins excluded by the user are saved as a mask over the coverage, if there are any
+    if any(chromo.excludedBins is not None for chromo in chromosomes):
+        arrays['excludedBins'] = np.concatenate([chromo.excludedBins if chromo.excludedBins is not None else np.zeros(len(chromo.coverage), dtype=bool)
+            for chromo in chromosomes])
+    manifest = {'formatVersion':datasetVersion, 'setName':itemData['setName'], 'vcfName':itemData['vcfName'],
+        'tabName':itemData['tabName'], 'coverageNorm':itemData['coverageNorm'], 'coverageNormLog':itemData['coverageNormLog'],
+        'cytoTab':itemData['cytoTab'], 'names':names, 'chromosomes':chromosomeInfo,
+        'unplacedStart':unplacedStart, 'unplacedEnd':len(allVariants), 'arrays':{}}
+    #Written under a temporary name and then moved over fileName, so that a dataset loaded from fileName (whose arrays are
+    #mapped from the file) can be saved over it, and an interrupted write does not leave a broken file
+    with open(fileName + ".tmp", 'wb') as datasetFile:
+        datasetFile.write(b"\0" * headerSize)
+        for (name,array) in arrays.items():
+            array = np.ascontiguousarray(array)
+            offset = -(-datasetFile.tell() // arrayAlignment) * arrayAlignment
+            datasetFile.write(b"\0" * (offset - datasetFile.tell()))
+            datasetFile.write(array.tobytes())
+            manifest['arrays'][name] = {'dtype':array.dtype.str, 'shape':list(array.shape), 'offset':offset}
+        manifestData = json.dumps(manifest).encode()
+        manifestOffset = datasetFile.tell()
+        datasetFile.write(manifestData)
+        datasetFile.seek(0)
+        datasetFile.write(struct.pack(headerFormat, datasetMagic, datasetVersion, manifestOffset, len(manifestData)))
+    os.replace(fileName + ".tmp", fileName)
+
+#Loads a dataset saved by saveDataset, returning the itemData dict, or None if the file can not be read.
+#Coverage and variant columns are memory-mapped, variants of a chromosome are created when first used.
+def loadDataset(fileName):
+    with open(fileName, 'rb') as datasetFile:
+        header = datasetFile.read(headerSize)
+        if len(header) < headerSize:
+            print("Dataset file is not in correct format")
+            return None
+        (magic,version,manifestOffset,manifestLength) = struct.unpack(headerFormat, header)
+        if magic != datasetMagic:
+            print("Dataset file is not in correct format")
+            return None
+        if version > datasetVersion:
+            print("Dataset file was saved by a later version, cannot read it")
+            return None
+        datasetFile.seek(manifestOffset)
+        manifest = json.loads(datasetFile.read(manifestLength).decode())
+    #The whole file is mapped once, the arrays are views of this mapping
+    fileMap = np.memmap(fileName, dtype=np.uint8, mode='r')
+    columns = {}
+    for (name,arrayInfo) in manifest['arrays'].items():
+        dtype = np.dtype(arrayInfo['dtype'])
+        shape = tuple(arrayInfo['shape'])
+        size = int(np.prod(shape)) * dtype.itemsize
+        columns[name] = fileMap[arrayInfo['offset']:arrayInfo['offset'] + size].view(dtype).reshape(shape)
+    names = manifest['names']
+    chromosomes = []
+    for chromoInfo in manifest['chromosomes']:
+        chromo = data.Chromosome(chromoInfo['name'])
+        if chromoInfo['end'] is not None:
+            chromo.setEnd(chromoInfo['end'])
+        chromo.display = chromoInfo['display']
+        chromo.display_connections = chromoInfo['display_connections']
+        chromo.display_cytoBandNames = chromoInfo['display_cytoBandNames']
+        chromo.setCoverage(columns['coverage'][chromoInfo['coverageStart']:chromoInfo['coverageEnd']])
+        if 'excludedBins' in columns:
+            excludedBins = columns['excludedBins'][chromoInfo['coverageStart']:chromoInfo['coverageEnd']]
+            chromo.excludedBins = excludedBins if excludedBins.any() else None
+        #The empty variant list set by Chromosome is removed so that variants are read when first used
+        del chromo.variants
+        chromo.variantSource = StoredVariants(columns, names, chromoInfo['variantStart'], chromoInfo['variantEnd'])
+        chromosomes.append(chromo)
+    unplacedVariants = StoredVariants(columns, names, manifest['unplacedStart'], manifest['unplacedEnd']).createVariants()
+    itemData = {'chromosomeList':chromosomes, 'coverageNormLog':manifest['coverageNormLog'], 'coverageNorm':manifest['coverageNorm'],
+        'vcfName':manifest['vcfName'], 'tabName':manifest['tabName'], 'cytoTab':manifest['cytoTab'],
+        'setName':manifest['setName'], 'unplacedVariants':unplacedVariants}
+    return itemData
+
+#The variants in rows start to end of the columns of a loaded dataset
+class StoredVariants():
+
+    def __init__(self, columns, names, start, end):
+        self.columns = columns
+        self.names = names
+        self.start = start
+        self.end = end
+
+    def __len__(self):
+        return self.end - self.start
+
+    def column(self, name):
+        return self.columns[name][self.start:self.end]
+
+    #Returns the strings in rows start to end of a string column
+    def readStrings(self, name):
+        offsets = self.columns[name + 'Offsets'][self.start:self.end+1]
+        textStart = int(offsets[0])
+        encoded = self.columns[name + 'Text'][textStart:int(offsets[-1])].tobytes()
+        offsets = (offsets - textStart).tolist()
+        text = encoded.decode()
+        #Byte offsets can be used in the decoded text if it is all ascii
+        if len(text) != len(encoded):
+            return [encoded[offsets[row]:offsets[row+1]].decode() for row in range(len(self))]
+        return [text[offsets[row]:offsets[row+1]] for row in range(len(self))]
+
+    def createVariants(self):
+        names = self.names
+        chrA = [names[code] for code in self.column('chrA').tolist()]
+        chrB = [names[code] for code in self.column('chrB').tolist()]
+        eventType = [names[code] for code in self.column('eventType').tolist()]
+        (posA,posB) = (self.column('posA').tolist(),self.column('posB').tolist())
+        (active,marked) = (self.column('active').tolist(),self.column('marked').tolist())
+        (hasCytoband,hasRankScore) = (self.column('hasCytoband').tolist(),self.column('hasRankScore').tolist())
+        hasWindows = self.column('hasWindows').tolist()
+        windows = list(zip(*[self.column(window).tolist() for window in ('winAStart','winAEnd','winBStart','winBEnd')]))
+        (info,format,genes,cytoband,rankScore) = [self.readStrings(name) for name in stringColumns]
+        variants = []
+        for row in range(len(self)):
+            variant = data.Variant.__new__(data.Variant)
+            variant.__setstate__((chrA[row],posA[row],chrB[row],posB[row],eventType[row],readVCF.LazyInfo(info[row]),
+                readVCF.LazyFormat(format[row]),genes[row],cytoband[row] if hasCytoband[row] else None,active[row],
+                rankScore[row] if hasRankScore[row] else None,marked[row]))
+            if hasWindows[row]:
+                (variant.winAStart,variant.winAEnd,variant.winBStart,variant.winBEnd) = windows[row]
+            variants.append(variant)
+        return variants
+
+    #Creates a VariantTable from the columns, without creating the variants
+    def createTable(self):
+        columns = {'chrBNames':self.names, 'typeNames':self.names}
+        for name in ('posA','posB','chrB','typeCode','hasWindows','winAStart','winAEnd','winBStart','winBEnd'):
+            columns[name] = self.column(name)
+        #Active and marked are changed when variants are toggled and marked, so these are copied from the file
+        columns['active'] = np.array(self.column('active'))
+        columns['marked'] = np.array(self.column('marked'))
+        return data.VariantTable.fromColumns(columns)
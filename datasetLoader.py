@@ -0,0 +1,144 @@
+import collections
+import data
+import parseCache
+import searchIndex
+from PySide.QtCore import *
+
+#Reads datasets from tab and vcf files in a background thread, so that the interface stays responsive.
+#Datasets are read one at a time in the order they are queued with addJob. Progress is reported with the progress
+#signal as (set name, stage, value), value being per mille of the stage or -1 if the progress of the stage is unknown.
+#Each read dataset is sent with datasetLoaded, and loadFailed is sent with a message if a dataset could not be read.
+class DatasetLoader(QThread):
+
+    progress = Signal(str, str, int)
+    datasetLoaded = Signal(object)
+    loadFailed = Signal(str, str)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.jobs = collections.deque()
+        self.mutex = QMutex()
+        self.jobAdded = QWaitCondition()
+        self.cancelled = False
+        self.stopped = False
+        self.activeJob = None
+
+    #Queues a dataset to be read. job is a dict with tabName, vcfName, setName and regions (None to read the whole vcf),
+    #and the cache settings useCache, cacheFolder and cacheSizeLimit (in bytes).
+    def addJob(self, job):
+        self.mutex.lock()
+        self.jobs.append(job)
+        self.jobAdded.wakeOne()
+        self.mutex.unlock()
+
+    #Returns the number of datasets waiting to be read, not counting the one being read
+    def queuedJobs(self):
+        self.mutex.lock()
+        queued = len(self.jobs)
+        self.mutex.unlock()
+        return queued
+
+    #Cancels the dataset being read, and any queued datasets. Returns the number of queued datasets removed.
+    def cancelAll(self):
+        self.mutex.lock()
+        removed = len(self.jobs)
+        self.jobs.clear()
+        self.cancelled = True
+        self.mutex.unlock()
+        return removed
+
+    #Stops the thread after the dataset being read, waiting for it to finish
+    def stop(self):
+        self.mutex.lock()
+        self.jobs.clear()
+        self.cancelled = True
+        self.stopped = True
+        self.jobAdded.wakeOne()
+        self.mutex.unlock()
+        self.wait()
+
+    def run(self):
+        while True:
+            self.mutex.lock()
+            while not self.jobs and not self.stopped:
+                self.jobAdded.wait(self.mutex)
+            if self.stopped:
+                self.mutex.unlock()
+                return
+            job = self.jobs.popleft()
+            self.cancelled = False
+            self.mutex.unlock()
+            #An error reading one dataset is reported, and the datasets queued after it are still read
+            try:
+                itemData = self.readDataset(job)
+            except Exception as error:
+                self.loadFailed.emit(job['setName'], "Could not read dataset " + job['setName'] + ": " + str(error))
+                continue
+            if itemData is not None:
+                self.datasetLoaded.emit(itemData)
+
+    #Passed to data.readVCFFile, returns False if the read should be cancelled
+    def vcfProgress(self, bytesRead, totalBytes):
+        if totalBytes > 0:
+            self.progress.emit(self.activeJob['setName'], "Reading VCF", int(1000*bytesRead/totalBytes))
+        return not self.cancelled
+
+    #Reads the dataset of a job, from the cache if possible. Returns the dict storing the data, or None if the
+    #dataset could not be read or the read was cancelled.
+    def readDataset(self, job):
+        self.activeJob = job
+        setName = job['setName']
+        #Datasets read from whole files are cached, and read from the cache if the files have not changed
+        cacheKey = None
+        itemData = None
+        if not job['regions'] and job['useCache']:
+            self.progress.emit(setName, "Reading cache", -1)
+            cacheKey = parseCache.createKey(job['tabName'], job['vcfName'])
+            itemData = parseCache.loadDataset(job['cacheFolder'], cacheKey)
+        if itemData is None:
+            itemData = self.readDatasetFiles(job)
+            if itemData is None:
+                return None
+            if cacheKey:
+                self.progress.emit(setName, "Writing dataset to cache", -1)
+                parseCache.storeDataset(job['cacheFolder'], cacheKey, itemData, job['cacheSizeLimit'])
+        if self.cancelled:
+            self.loadFailed.emit(setName, "Reading dataset " + setName + " cancelled")
+            return None
+        itemData['setName'] = setName
+        self.progress.emit(setName, "Reading cytoband file", -1)
+        itemData['cytoTab'] = data.readCytoTab("cytoBand.txt")
+        itemData['cytoIndex'] = data.CytobandIndex(itemData['cytoTab'])
+        self.progress.emit(setName, "Building search index", -1)
+        itemData['searchIndex'] = searchIndex.createSearchIndex(itemData['chromosomeList'], itemData['cytoIndex'])
+        self.progress.emit(setName, "Building coverage pyramids", -1)
+        data.createCoveragePyramids(itemData['chromosomeList'])
+        return itemData
+
+    #Reads the tab and vcf files of a job and returns a dict storing the data, or None if these could not be read
+    def readDatasetFiles(self, job):
+        setName = job['setName']
+        self.progress.emit(setName, "Reading TAB", -1)
+        tabResult = data.readTab(job['tabName'])
+        if not isinstance(tabResult, tuple):
+            self.loadFailed.emit(setName, "Could not read TAB, no dataset created")
+            return None
+        (chromosomeList,coverageNorm,coverageNormLog,totalBP) = tabResult
+        if self.cancelled:
+            self.loadFailed.emit(setName, "Reading dataset " + setName + " cancelled")
+            return None
+        self.progress.emit(setName, "Reading VCF", 0)
+        if job['regions']:
+            vcfResult = data.readVCFRegion(job['vcfName'],chromosomeList,job['regions'])
+        else:
+            vcfResult = data.readVCFFile(job['vcfName'],chromosomeList,self.vcfProgress)
+        if vcfResult is None:
+            if self.cancelled:
+                self.loadFailed.emit(setName, "Reading dataset " + setName + " cancelled")
+            else:
+                self.loadFailed.emit(setName, "Could not read VCF, no dataset created")
+            return None
+        (chromosomeList,vcfInfoLines,unplacedVariants) = vcfResult
+        itemData = {'chromosomeList':chromosomeList,'coverageNormLog':coverageNormLog,'coverageNorm':coverageNorm,
+        'vcfName':job['vcfName'],'tabName':job['tabName'],'cytoTab':[],'setName':setName,'unplacedVariants':unplacedVariants}
+        return itemData
@@ -30,6 +30,16 @@ class HeatmapView(QGraphicsView):
         self.chromoA = self.chromosomes[0]
         self.chromoB = self.chromosomes[0]
         self.mapping = "DEL"
+        #True when the whole genome is shown instead of a pair of chromosomes
+        self.genomeWide = False
+        #Chromosome boxes of the toolbar, set by connectChromosomeBoxes
+        self.chromoABox = None
+        self.chromoBBox = None
+        self.cacheSize = int(self.heatmapSettings['cacheSize'])
+        #Pyramids are shared by the heatmaps of a dataset
+        if 'heatmapCache' not in self.dataDict:
+            self.dataDict['heatmapCache'] = data.HeatmapCache(self.cacheSize*1000000)
+        self.heatmapCache = self.dataDict['heatmapCache']
         self.createSettings()
         self.createChInfo()
         self.setRenderHints(QPainter.Antialiasing)
@@ -46,17 +56,36 @@ class HeatmapView(QGraphicsView):
     def changeMappingType(self, mapping):
         self.variantNames = {"Break end":"BND", "Deletion":"DEL", "Duplication":"DUP", "Interspersed duplication":"IDUP", "Insertion":"INS", "Inversion":"INV", "Tandem duplication":"TDUP", "Translocation":"TLOC"}
         self.mapping = self.variantNames[mapping]
-        if self.chromoA is self.chromoB and (self.mapping == "DEL" or self.mapping == "BND" or self.mapping == "DUP" or self.mapping == "IDUP" or self.mapping == "INS" or self.mapping == "INV" or self.mapping == "TDUP"):
+        if self.genomeWide:
+            self.createGenomeHeatmap()
+        elif self.chromoA is self.chromoB and (self.mapping == "DEL" or self.mapping == "BND" or self.mapping == "DUP" or self.mapping == "IDUP" or self.mapping == "INS" or self.mapping == "INV" or self.mapping == "TDUP"):
             self.clearScene()
             self.createHeatmap(self.chromoA, self.chromoB, self.binSize, self.mapping)
         elif self.chromoA is not self.chromoB and self.mapping == "TLOC":
             self.clearScene()
             self.createHeatmap(self.chromoA, self.chromoB, self.binSize, self.mapping)
 
+    def connectChromosomeBoxes(self, chromoABox, chromoBBox):
+        self.chromoABox = chromoABox
+        self.chromoBBox = chromoBBox
+        self.updateChromosomeBoxes()
+
+    #Sets the chromosome boxes of the toolbar to the shown pair, without changing the heatmap again
+    def updateChromosomeBoxes(self):
+        if self.chromoABox is None:
+            return
+        for (box,chromo) in ((self.chromoABox,self.chromoA),(self.chromoBBox,self.chromoB)):
+            box.blockSignals(True)
+            box.setCurrentIndex(box.findText(chromo.name))
+            box.blockSignals(False)
+
     def changeBinsize(self, binSize):
         self.binSize = int(binSize)
         self.clearScene()
-        self.createHeatmap(self.chromoA, self.chromoB, self.binSize, self.mapping)
+        if self.genomeWide:
+            self.createGenomeHeatmap()
+        else:
+            self.createHeatmap(self.chromoA, self.chromoB, self.binSize, self.mapping)
 
     def changeChromoA(self, chromoA):
         self.chromoA = self.chromosomes[chromoA]
@@ -79,8 +108,16 @@ class HeatmapView(QGraphicsView):
     def createSettings(self):
         self.settingsModel = QStandardItemModel()
         #create header labels to distinguish different settings.
-        verticalHeaders = ["minCoverage", "maxCoverage"]
+        verticalHeaders = ["cacheSize"]
         self.settingsModel.setVerticalHeaderLabels(verticalHeaders)
+        cacheSizeText = QStandardItem("Cache size (MB)")
+        cacheSizeText.setEditable(False)
+        cacheSizeText.setToolTip("Memory used to keep heatmaps of this dataset, so that switching back to them is instant")
+        cacheSizeData = QStandardItem()
+        cacheSizeData.setData(self.cacheSize,0)
+        cacheSizeData.setEditable(True)
+        self.settingsModel.setItem(0,0,cacheSizeText)
+        self.settingsModel.setItem(0,1,cacheSizeData)
         self.settingsModel.itemChanged.connect(self.updateSettings)
 
     def closeOpenWindows(self):
@@ -92,6 +129,13 @@ class HeatmapView(QGraphicsView):
     def updateSettings(self):
         #Go through every row in the settings model and update accordingly
         self.color = QColor(self.colors['heatmapColor'])
+        for row in range(self.settingsModel.rowCount()):
+            item = self.settingsModel.item(row,1)
+            if row == 0:
+                self.cacheSize = int(item.data(0))
+        self.heatmapSettings["cacheSize"] = str(self.cacheSize)
+        self.heatmapCache.sizeLimit = self.cacheSize*1000000
+        self.heatmapCache.evictPyramids()
         self.clearScene()
         self.updateHeatmap(self.activeIndex)
 
@@ -215,6 +259,7 @@ class HeatmapView(QGraphicsView):
 
     def createHeatmap(self, chromoA, chromoB, binSize, mapping):
         self.clearScene()
+        self.genomeWide = False
         self.variantNames = {"BND":"Break end", "DEL":"Deletion", "DUP":"Duplication", "IDUP":"Interspersed duplication", "INS":"Insertion", "INV":"Inversion", "TDUP":"Tandem duplication", "TLOC":"Translocation"}
         binSize = binSize*1000
         self.matrices = []
@@ -223,16 +268,106 @@ class HeatmapView(QGraphicsView):
         zoomFactor = 10
         xAxis = int(int(chromoA.end)/binSize)+1
         yAxis = int(int(chromoB.end)/binSize)+1
-        A = self.constructMatrix(chromoA, chromoB, mapping, binSize, zoomFactor, xAxis, yAxis, 0, 0, zoomLevel)
+        #The pyramid is counted again only if it is not cached, or the variants of chromoA have changed since
+        cacheKey = (chromoA.name, chromoB.name, mapping, binSize, zoomFactor)
+        self.pyramid = self.heatmapCache.getPyramid(cacheKey, chromoA.variantVersion)
+        if self.pyramid is None:
+            (starts,ends) = self.variantPositions(chromoA, chromoB, mapping)
+            self.pyramid = data.HeatmapPyramid(starts, ends, binSize, zoomFactor)
+            self.heatmapCache.storePyramid(cacheKey, chromoA.variantVersion, self.pyramid)
         matrixInfo = [chromoA, chromoB, mapping, binSize, zoomFactor, xAxis, yAxis, 0, 0, zoomLevel]
-        self.matrices.append([A, matrixInfo])
+        self.matrices.append(matrixInfo)
+        self.updateHeatmap(self.activeIndex)
+
+    #Creates a heatmap of the whole genome, with the chromosomes placed one after another on both axes
+    #The matrix of the genome is stored without chromosomes, as it can not be zoomed in, clicking an element shows the heatmap of its chromosomes
+    def createGenomeHeatmap(self):
+        self.clearScene()
+        self.genomeWide = True
+        zoomFactor = 10
+        self.genomeChromosomes = [chromo for chromo in self.chromosomes if not "GL" in chromo.name]
+        #Position in the genome where each chromosome starts, and the end of the genome
+        self.genomeOffsets = np.cumsum([0] + [int(chromo.end) for chromo in self.genomeChromosomes])
+        #Bins are made large enough to have at most one bin per pixel of the graph, whatever the bin size of the pair heatmaps
+        graphWidth = self.containerRect.width()-300
+        binSize = max(self.binSize, int(math.ceil(int(self.genomeOffsets[-1])/max(graphWidth,1)/1000)))*1000
+        xAxis = int(int(self.genomeOffsets[-1])/binSize)+1
+        yAxis = xAxis
+        #The pyramid of the genome depends on the variants of every chromosome
+        cacheKey = (None, None, self.mapping, binSize, zoomFactor)
+        variantVersion = tuple(chromo.variantVersion for chromo in self.genomeChromosomes)
+        self.pyramid = self.heatmapCache.getPyramid(cacheKey, variantVersion)
+        if self.pyramid is None:
+            (starts,ends) = self.genomePositions(self.mapping)
+            self.pyramid = data.HeatmapPyramid(starts, ends, binSize, zoomFactor)
+            self.heatmapCache.storePyramid(cacheKey, variantVersion, self.pyramid)
+        self.matrices = [[None, None, self.mapping, binSize, zoomFactor, xAxis, yAxis, 0, 0, 0]]
+        self.activeIndex = 0
         self.updateHeatmap(self.activeIndex)
 
+    #Returns the positions in the genome of the variants counted in the genome heatmap
+    #The positions of each chromosome are found with array operations on its variant table, and are binned together by the pyramid
+    def genomePositions(self, mapping):
+        chromoOffsets = {chromo.name: offset for (chromo,offset) in zip(self.genomeChromosomes, self.genomeOffsets.tolist())}
+        chromoEnds = {chromo.name: int(chromo.end) for chromo in self.genomeChromosomes}
+        startList = []
+        endList = []
+        for chromo in self.genomeChromosomes:
+            table = chromo.getVariantTable()
+            #Offset and end of chromosome B of each variant, -1 if chromosome B is not in the genome heatmap
+            chrBOffsets = np.array([chromoOffsets.get(name, -1) for name in table.chrBNames] + [-1], dtype=np.int64)[table.chrB]
+            chrBEnds = np.array([chromoEnds.get(name, -1) for name in table.chrBNames] + [-1], dtype=np.int64)[table.chrB]
+            #as in the heatmap of two chromosomes, translocations are counted at the centers of WINA and WINB
+            tlocVariants = np.zeros(len(table), dtype=bool)
+            if mapping == "TLOC":
+                tlocVariants = table.active & table.hasWindows & ~table.chrBMask(chromo.name)
+            typeVariants = table.typeMask(mapping) & table.active & ~tlocVariants
+            starts = np.concatenate(((table.winAStart[tlocVariants] + table.winAEnd[tlocVariants])/2, table.posA[typeVariants].astype(np.float64)))
+            ends = np.concatenate(((table.winBStart[tlocVariants] + table.winBEnd[tlocVariants])/2, table.posB[typeVariants].astype(np.float64)))
+            endOffsets = np.concatenate((chrBOffsets[tlocVariants], chrBOffsets[typeVariants]))
+            chromoBEnds = np.concatenate((chrBEnds[tlocVariants], chrBEnds[typeVariants]))
+            #Positions past the end of a chromosome would be counted in the next one
+            inGenome = (endOffsets >= 0) & (starts <= chromoEnds[chromo.name]) & (ends <= chromoBEnds)
+            startList.append(starts[inGenome] + chromoOffsets[chromo.name])
+            endList.append(ends[inGenome] + endOffsets[inGenome])
+        return (np.concatenate(startList + [np.zeros(0)]),np.concatenate(endList + [np.zeros(0)]))
+
+    #Returns the chromosome at a position in the genome heatmap and the position on it
+    def genomeLocation(self, genomePos):
+        index = min(max(int(np.searchsorted(self.genomeOffsets, genomePos, side='right')) - 1, 0), len(self.genomeChromosomes) - 1)
+        return (self.genomeChromosomes[index], int(genomePos - self.genomeOffsets[index]))
+
+    #Draws lines between the chromosomes of the genome heatmap, with the chromosome names along the axes
+    def addGenomeGrid(self, xAxisItem, yAxisItem, binSize):
+        gridPath = QPainterPath()
+        for offset in self.genomeOffsets[1:-1].tolist():
+            gridPath.moveTo(xAxisItem.boundingRect().left() + offset/binSize*self.elementWidth, yAxisItem.boundingRect().top())
+            gridPath.lineTo(xAxisItem.boundingRect().left() + offset/binSize*self.elementWidth, yAxisItem.boundingRect().bottom())
+            gridPath.moveTo(xAxisItem.boundingRect().left(), yAxisItem.boundingRect().bottom() - offset/binSize*self.elementHeight)
+            gridPath.lineTo(xAxisItem.boundingRect().right(), yAxisItem.boundingRect().bottom() - offset/binSize*self.elementHeight)
+        gridItem = QGraphicsPathItem(gridPath)
+        gridItem.setPen(QPen(QBrush(Qt.gray),1))
+        self.scene.addItem(gridItem)
+        for (index,chromo) in enumerate(self.genomeChromosomes):
+            center = (self.genomeOffsets[index] + self.genomeOffsets[index+1])/2/binSize
+            xLabelItem = QGraphicsTextItem(chromo.name)
+            xLabelItem.setPos(xAxisItem.boundingRect().left() + center*self.elementWidth - 15, xAxisItem.boundingRect().bottom())
+            xLabelItem.setScale(2)
+            yLabelItem = QGraphicsTextItem(chromo.name)
+            yLabelItem.setPos(yAxisItem.boundingRect().left() - 50, yAxisItem.boundingRect().bottom() - center*self.elementHeight + 15)
+            yLabelItem.setScale(2)
+            yLabelItem.setRotation(270)
+            self.scene.addItem(xLabelItem)
+            self.scene.addItem(yLabelItem)
+
     def updateHeatmap(self, activeIndex):
         self.clearScene()
-        (chromoA, chromoB, mapping, binSize, zoomFactor, xAxis, yAxis, xAxisStart, yAxisStart, zoomLevel) = self.matrices[activeIndex][1]
+        (chromoA, chromoB, mapping, binSize, zoomFactor, xAxis, yAxis, xAxisStart, yAxisStart, zoomLevel) = self.matrices[activeIndex]
+        (elements,hits) = self.constructMatrix(chromoA, chromoB, mapping, binSize, zoomFactor, xAxis, yAxis, xAxisStart, yAxisStart, zoomLevel)
+        self.activeMatrix = (elements,hits)
+        #A level of the pyramid may have been counted for the window, making the cached pyramids larger
+        self.heatmapCache.evictPyramids()
         zoomFactor = math.pow(zoomFactor, -zoomLevel)
-        A = self.matrices[activeIndex][0]
         if mapping == "TLOC":
             startString = "Position"
             endString = "Position"
@@ -267,22 +402,35 @@ class HeatmapView(QGraphicsView):
         self.elementWidth = xAxisItem.boundingRect().width()/xAxis
         self.elementHeight = yAxisItem.boundingRect().height()/yAxis
 
-        #draw the actual heatmap
-        #since the y-axis is flipped, y values has an offset of yAxis - yInd - 1
-        for xInd in range(xAxis):
-            for yInd in range(yAxis):
-                elementPath = QPainterPath()
-                elementPath.addRect(xInd*self.elementWidth + xAxisItem.boundingRect().left(), yInd*self.elementHeight + yAxisItem.boundingRect().top(), self.elementWidth, self.elementHeight)
-                elementItem = ElementGraphicItem(elementPath, xAxisStart + xInd*zoomFactor, yAxisStart + (yAxis - yInd - 1)*zoomFactor)
-                elementItem.setToolTip("x: " + str((xAxisStart + xInd*zoomFactor)*binSize*1000) + "bp\n" + "y: " + str((yAxisStart + (yAxis - yInd - 1)*zoomFactor)*binSize*1000) + "bp\n" + "#interactions: " +  str(A[yInd][xInd]))
-                #Color each element depending on how many "hits" or interactions they have, more hits -> lighter color
-                color = self.color.lighter(105*(1+(A[yInd][xInd])/(np.amax(A)+1)))
-                colorPen = QPen(QBrush(self.color),1)
-                #color the edges
-                elementItem.setPen(colorPen)
-                #fill the rectangles
-                elementItem.setBrush(QBrush(color))
-                self.scene.addItem(elementItem)
+        #draw the actual heatmap as an image with one pixel per element, scaled to the size of the elements
+        #Color each element depending on how many "hits" or interactions they have, more hits -> lighter color
+        #The color of each distinct number of hits is computed once, and the pixels are looked up from these
+        #Only the elements with hits are set, the others keep the color of 0 hits
+        maxHits = int(hits.max()) if len(hits) else 0
+        minHits = int(hits.min()) if len(hits) == xAxis*yAxis else 0
+        hitValues = np.unique(np.append(hits, 0))
+        hitColors = np.array([self.color.lighter(105*(1+elementHits/(maxHits+1))).rgba() for elementHits in hitValues.tolist()], dtype=np.uint32)
+        pixels = np.full(xAxis*yAxis, hitColors[0], dtype=np.uint32)
+        pixels[elements] = hitColors[np.searchsorted(hitValues, hits)]
+        image = QImage(pixels.tobytes(), xAxis, yAxis, 4*xAxis, QImage.Format_ARGB32).copy()
+        self.heatmapItem = QGraphicsPixmapItem(QPixmap.fromImage(image))
+        self.heatmapItem.setTransform(QTransform.fromScale(self.elementWidth, self.elementHeight))
+        self.heatmapItem.setPos(xAxisItem.boundingRect().left(), yAxisItem.boundingRect().top())
+        self.scene.addItem(self.heatmapItem)
+        #color the edges of the elements, if they are large enough to be seen
+        if self.genomeWide:
+            self.addGenomeGrid(xAxisItem, yAxisItem, binSize)
+        elif self.elementWidth >= 4 and self.elementHeight >= 4:
+            gridPath = QPainterPath()
+            for xInd in range(xAxis+1):
+                gridPath.moveTo(xAxisItem.boundingRect().left() + xInd*self.elementWidth, yAxisItem.boundingRect().top())
+                gridPath.lineTo(xAxisItem.boundingRect().left() + xInd*self.elementWidth, yAxisItem.boundingRect().bottom())
+            for yInd in range(yAxis+1):
+                gridPath.moveTo(xAxisItem.boundingRect().left(), yAxisItem.boundingRect().top() + yInd*self.elementHeight)
+                gridPath.lineTo(xAxisItem.boundingRect().right(), yAxisItem.boundingRect().top() + yInd*self.elementHeight)
+            gridItem = QGraphicsPathItem(gridPath)
+            gridItem.setPen(QPen(QBrush(self.color),1))
+            self.scene.addItem(gridItem)
 
         #Creates a colorbar
         #uses a gradient which goes from self.color at 0 interactions to the darkest color on the heatmap for max interactions
@@ -291,7 +439,7 @@ class HeatmapView(QGraphicsView):
         colorBarItem = QGraphicsPathItem(colorBarPath)
         linearGradient = QLinearGradient(colorBarItem.boundingRect().bottomLeft() + QPointF(25,0), colorBarItem.boundingRect().topLeft() + QPointF(25,0))
         linearGradient.setColorAt(0, self.color)
-        linearGradient.setColorAt(1, self.color.lighter(105*(1+(np.amax(A)/(np.amax(A)+1)))))
+        linearGradient.setColorAt(1, self.color.lighter(105*(1+(maxHits/(maxHits+1)))))
         colorBarItem.setBrush(QBrush(linearGradient))
         self.scene.addItem(colorBarItem)
 
@@ -304,8 +452,8 @@ class HeatmapView(QGraphicsView):
         colorBarTick.moveTo(lineBetween.pointAt(1))
         colorBarTick.lineTo(lineBetween.pointAt(0))
         colorBarTickItem = QGraphicsPathItem(colorBarTick)
-        colorBarTickLabelTopItem = QGraphicsTextItem(str(np.amax(A)))
-        colorBarTickLabelBottomItem = QGraphicsTextItem(str(np.amin(A)))
+        colorBarTickLabelTopItem = QGraphicsTextItem(str(maxHits))
+        colorBarTickLabelBottomItem = QGraphicsTextItem(str(minHits))
         colorBarTickLabelTopItem.setPos(colorBarItem.boundingRect().topRight() + QPointF(10,-20))
         colorBarTickLabelBottomItem.setPos(colorBarItem.boundingRect().bottomRight() + QPointF(10,-20))
         colorBarTickLabelTopItem.setScale(2)
@@ -321,48 +469,55 @@ class HeatmapView(QGraphicsView):
         self.scene.addItem(colorBarTickLabelBottomItem)
         self.scene.addItem(colorBarLabel)
 
-        #Create axes ticks and labels (xAxis)
-        for i in range(xAxis+1):
-            xTickPath = QPainterPath()
-            xTickLabel = ""
-            if i%2 == 0:
-                lineBetween = QLineF(xAxisItem.boundingRect().left() + i*self.elementWidth, xAxisItem.boundingRect().bottom(), xAxisItem.boundingRect().left() + i*self.elementWidth, xAxisItem.boundingRect().bottom() + 5)
-                xTickPath.moveTo(lineBetween.pointAt(0))
-                xTickPath.lineTo(lineBetween.pointAt(1))
-                if zoomLevel == 0:
-                    xTickLabel = str(int(xAxisStart + i*zoomFactor))
-                else:
-                    xTickLabel = str(round((xAxisStart + i*zoomFactor),zoomLevel))
-            xTickItem = QGraphicsPathItem(xTickPath)
-            xTickLabelItem = QGraphicsTextItem(xTickLabel)
-            xTickLabelItem.setPos(xTickPath.currentPosition() + QPointF(-15,0))
-            xTickLabelItem.setScale(2)
-            self.scene.addItem(xTickItem)
-            self.scene.addItem(xTickLabelItem)
-
-        #yAxis
-        for i in range(yAxis+1):
-            yTickPath = QPainterPath()
-            yTickLabel = ""
-            if i%2 == 0:
-                lineBetween = QLineF(yAxisItem.boundingRect().left(), yAxisItem.boundingRect().bottom() - i*self.elementHeight, yAxisItem.boundingRect().left() - 5, yAxisItem.boundingRect().bottom() - i*self.elementHeight)
-                yTickPath.moveTo(lineBetween.pointAt(0))
-                yTickPath.lineTo(lineBetween.pointAt(1))
-                if zoomLevel == 0:
-                    yTickLabel = str(int(yAxisStart + i*zoomFactor))
-                else:
-                    yTickLabel = str(round((yAxisStart + i*zoomFactor),zoomLevel))
-            yTickItem = QGraphicsPathItem(yTickPath)
-            yTickLabelItem = QGraphicsTextItem(yTickLabel)
-            yTickLabelItem.setPos(yTickPath.currentPosition() + QPointF(-50,20))
-            yTickLabelItem.setScale(2)
-            yTickLabelItem.setRotation(270)
-            self.scene.addItem(yTickItem)
-            self.scene.addItem(yTickLabelItem)
-
-        titleLabel = QGraphicsTextItem("Heatmapping chromosome " + chromoA.name + " to " + chromoB.name + " (" + self.variantNames[mapping] + ")")
-        yAxisLabel = QGraphicsTextItem(endString + " on chromosome " + chromoB.name + " (x" + str(int(binSize/1000)) + "kb)")
-        xAxisLabel = QGraphicsTextItem(startString + " on chromosome " + chromoA.name + " (x" + str(int(binSize/1000)) + "kb)")
+        #The genome heatmap has chromosome names along the axes instead of ticks
+        if not self.genomeWide:
+            #Create axes ticks and labels (xAxis)
+            for i in range(xAxis+1):
+                xTickPath = QPainterPath()
+                xTickLabel = ""
+                if i%2 == 0:
+                    lineBetween = QLineF(xAxisItem.boundingRect().left() + i*self.elementWidth, xAxisItem.boundingRect().bottom(), xAxisItem.boundingRect().left() + i*self.elementWidth, xAxisItem.boundingRect().bottom() + 5)
+                    xTickPath.moveTo(lineBetween.pointAt(0))
+                    xTickPath.lineTo(lineBetween.pointAt(1))
+                    if zoomLevel == 0:
+                        xTickLabel = str(int(xAxisStart + i*zoomFactor))
+                    else:
+                        xTickLabel = str(round((xAxisStart + i*zoomFactor),zoomLevel))
+                xTickItem = QGraphicsPathItem(xTickPath)
+                xTickLabelItem = QGraphicsTextItem(xTickLabel)
+                xTickLabelItem.setPos(xTickPath.currentPosition() + QPointF(-15,0))
+                xTickLabelItem.setScale(2)
+                self.scene.addItem(xTickItem)
+                self.scene.addItem(xTickLabelItem)
+
+            #yAxis
+            for i in range(yAxis+1):
+                yTickPath = QPainterPath()
+                yTickLabel = ""
+                if i%2 == 0:
+                    lineBetween = QLineF(yAxisItem.boundingRect().left(), yAxisItem.boundingRect().bottom() - i*self.elementHeight, yAxisItem.boundingRect().left() - 5, yAxisItem.boundingRect().bottom() - i*self.elementHeight)
+                    yTickPath.moveTo(lineBetween.pointAt(0))
+                    yTickPath.lineTo(lineBetween.pointAt(1))
+                    if zoomLevel == 0:
+                        yTickLabel = str(int(yAxisStart + i*zoomFactor))
+                    else:
+                        yTickLabel = str(round((yAxisStart + i*zoomFactor),zoomLevel))
+                yTickItem = QGraphicsPathItem(yTickPath)
+                yTickLabelItem = QGraphicsTextItem(yTickLabel)
+                yTickLabelItem.setPos(yTickPath.currentPosition() + QPointF(-50,20))
+                yTickLabelItem.setScale(2)
+                yTickLabelItem.setRotation(270)
+                self.scene.addItem(yTickItem)
+                self.scene.addItem(yTickLabelItem)
+
+        if self.genomeWide:
+            titleLabel = QGraphicsTextItem("Heatmapping the genome (" + self.variantNames[mapping] + ")")
+            yAxisLabel = QGraphicsTextItem(endString + " in the genome (x" + str(int(binSize/1000)) + "kb)")
+            xAxisLabel = QGraphicsTextItem(startString + " in the genome (x" + str(int(binSize/1000)) + "kb)")
+        else:
+            titleLabel = QGraphicsTextItem("Heatmapping chromosome " + chromoA.name + " to " + chromoB.name + " (" + self.variantNames[mapping] + ")")
+            yAxisLabel = QGraphicsTextItem(endString + " on chromosome " + chromoB.name + " (x" + str(int(binSize/1000)) + "kb)")
+            xAxisLabel = QGraphicsTextItem(startString + " on chromosome " + chromoA.name + " (x" + str(int(binSize/1000)) + "kb)")
 
         titleLabel.setPos(xAxisItemTop.boundingRect().center() + QPointF(-400,-100-yAxisItem.boundingRect().height()/2))
         yAxisLabel.setPos(yAxisItem.boundingRect().center() + QPointF(-150, 300))
@@ -378,47 +533,40 @@ class HeatmapView(QGraphicsView):
         self.scene.addItem(yAxisLabel)
         self.scene.addItem(xAxisLabel)
 
+    #Returns the positions of the variants counted in a heatmap of chromoA and chromoB
+    def variantPositions(self, chromoA, chromoB, mapping):
+        table = chromoA.getVariantTable()
+        #special case if the mapping is a translocation, these are counted at the centers of WINA and WINB
+        tlocVariants = np.zeros(len(table), dtype=bool)
+        if mapping == "TLOC" and chromoA.name != chromoB.name:
+            tlocVariants = table.active & table.hasWindows & table.chrBMask(chromoB.name)
+        tlocStarts = (table.winAStart[tlocVariants] + table.winAEnd[tlocVariants])/2
+        tlocEnds = (table.winBStart[tlocVariants] + table.winBEnd[tlocVariants])/2
+        #Other variants of the mapped type are counted at posA and posB
+        typeVariants = table.typeMask(mapping) & table.active & ~tlocVariants
+        starts = np.concatenate((tlocStarts, table.posA[typeVariants].astype(np.float64)))
+        ends = np.concatenate((tlocEnds, table.posB[typeVariants].astype(np.float64)))
+        return (starts,ends)
+
+    #Slices the elements with hits in a window of the heatmap from the pyramid level of the zoom level
+    #The window starts are given in bins of the unzoomed heatmap, and are whole bins of the zoom level
+    #Returns the position of each element in the heatmap image as yInd*xAxis + xInd, in increasing order, and its number of hits
     def constructMatrix(self, chromoA, chromoB, mapping, binSize, zoomFactor, xAxis, yAxis, xAxisStart, yAxisStart, zoomLevel):
-        zoomFactor = math.pow(zoomFactor, -zoomLevel)
-        B=[[0 for j in range(yAxis)] for i in range(xAxis)]
-        for i in range(xAxis):
-            for j in range(yAxis):
-                counter = 0
-                for variant in chromoA.variants:
-                    #special case if the mapping is a translocation
-                    if mapping == "TLOC" and variant[9] and variant[0] is not variant[2] and variant[2] == chromoB.name:
-                        #If chrA higher in order than chrB, WINA and WINB are switched, so check this first
-                        if self.chromosomes.index(chromoA) > self.chromosomes.index(chromoB):
-                            startWinA = int(variant[5]["WINB"].split(',')[0])
-                            endWinA = int(variant[5]["WINB"].split(',')[1])
-                            startWinB = int(variant[5]["WINA"].split(',')[0])
-                            endWinB = int(variant[5]["WINA"].split(',')[1])
-                        else:
-                            startWinA = int(variant[5]["WINA"].split(',')[0])
-                            endWinA = int(variant[5]["WINA"].split(',')[1])
-                            startWinB = int(variant[5]["WINB"].split(',')[0])
-                            endWinB = int(variant[5]["WINB"].split(',')[1])
-                        start = (startWinA + endWinA)/2
-                        end = (startWinB + endWinB)/2
-                        if (start >= (xAxisStart*binSize + i*(binSize*zoomFactor)) and start < (xAxisStart*binSize + i*binSize*zoomFactor + binSize*zoomFactor) and end >= (yAxisStart*binSize + j*binSize*zoomFactor) and end < (yAxisStart*binSize + j*binSize*zoomFactor + binSize*zoomFactor)):
-                            counter = counter + 1
-                            B[i][j] = counter
-
-                    elif (variant[5]["SVTYPE"]==mapping and variant[9]):
-                        start = int(variant[1])
-                        end = int(variant[3])
-                        #going through the elements to check if an interaction is made there, if it is -> add a "hit" i.e. counter increases by one
-                        if (start >= (xAxisStart*binSize + i*(binSize*zoomFactor)) and start < (xAxisStart*binSize + i*binSize*zoomFactor + binSize*zoomFactor) and end >= (yAxisStart*binSize + j*binSize*zoomFactor) and end < (yAxisStart*binSize + j*binSize*zoomFactor + binSize*zoomFactor)):
-                            counter = counter + 1
-                            B[i][j] = counter
-        B = np.asarray(B)
-        B = B.T
+        levelFactor = zoomFactor**zoomLevel
+        (xBins,yBins,hits) = self.pyramid.windowEntries(zoomLevel, int(round(xAxisStart*levelFactor)), int(round(yAxisStart*levelFactor)), xAxis, yAxis)
         #the QT coordinate system has the origin in the top left corner, the y-axis is therefore flipped upside down to get an origin in the bottom left corner.
-        B = np.flipud(B)
-
-
-        return B
-
+        elements = (yAxis - 1 - yBins)*xAxis + xBins
+        order = np.argsort(elements)
+        return (elements[order],hits[order])
+
+    #Returns the number of hits of the element in column xInd and row yInd of the heatmap image
+    def elementHits(self, xInd, yInd):
+        (elements,hits) = self.activeMatrix
+        xAxis = self.matrices[self.activeIndex][5]
+        index = np.searchsorted(elements, yInd*xAxis + xInd)
+        if index < len(elements) and elements[index] == yInd*xAxis + xInd:
+            return int(hits[index])
+        return 0
 
     def clearScene(self):
         self.scene.clear()
@@ -436,19 +584,18 @@ class HeatmapView(QGraphicsView):
 
     #Zoom function
     #takes the argument zoom, which determines if the zoom should be magnified or not
-    #otherwise creates a new matrix B with the magnified values and adds it to the matrices list
+    #otherwise adds the window with the magnified values to the matrices list, the matrix itself is sliced from the pyramid when shown
     def zoomIn(self,zoom, xAxisStart, yAxisStart, xAxis, yAxis):
-        (chromoA, chromoB, mapping, binSize, zoomFactor, b, c, d, e, zoomLevel) = self.matrices[self.activeIndex][1]
+        (chromoA, chromoB, mapping, binSize, zoomFactor, b, c, d, e, zoomLevel) = self.matrices[self.activeIndex]
         if zoom:
             zoomLevel += 1
-        B = self.constructMatrix(chromoA, chromoB, mapping, binSize, zoomFactor, xAxis, yAxis, xAxisStart, yAxisStart, zoomLevel)
         matrixInfo = [chromoA, chromoB, mapping, binSize, zoomFactor, xAxis, yAxis, xAxisStart, yAxisStart, zoomLevel]
         #removing matrices with higher index than self.activeIndex
         if self.activeIndex < len(self.matrices)-1:
             for index in range(self.activeIndex,len(self.matrices)-1):
                 self.matrices.pop()
 
-        self.matrices.append([B, matrixInfo])
+        self.matrices.append(matrixInfo)
         self.activeIndex += 1
         self.clearScene()
         self.updateHeatmap(self.activeIndex)
@@ -474,12 +621,46 @@ class HeatmapView(QGraphicsView):
             self.rubberBand.setGeometry(QRect(self.origin, QSize()))
             self.rubberBand.show()
 
+    #Returns the x and y indices (as used by zoomIn) of the element in column xInd and row yInd of the heatmap image
+    #since the y-axis is flipped, y values has an offset of yAxis - yInd - 1
+    def elementIndices(self, xInd, yInd):
+        (chromoA, chromoB, mapping, binSize, zoomFactor, xAxis, yAxis, xAxisStart, yAxisStart, zoomLevel) = self.matrices[self.activeIndex]
+        zoomFactor = math.pow(zoomFactor, -zoomLevel)
+        return (xAxisStart + xInd*zoomFactor, yAxisStart + (yAxis - yInd - 1)*zoomFactor)
+
+    #Returns the first and last column and row of the elements touched by a rectangle in view coordinates, or None if no elements are touched
+    #The elements are found from the position of the rectangle in the heatmap image, where each pixel is one element
+    def elementRange(self, viewRect):
+        image = self.heatmapItem.pixmap()
+        imageRect = self.heatmapItem.mapFromScene(self.mapToScene(viewRect)).boundingRect()
+        firstX = max(int(math.floor(imageRect.left())), 0)
+        lastX = min(int(math.floor(imageRect.right())), image.width()-1)
+        firstY = max(int(math.floor(imageRect.top())), 0)
+        lastY = min(int(math.floor(imageRect.bottom())), image.height()-1)
+        if firstX > lastX or firstY > lastY:
+            return None
+        return (firstX, lastX, firstY, lastY)
+
     #Handles the size of the selecting rectangle on mouse movements
+    #and sets the tooltip of the heatmap to the element under the mouse
     def mouseMoveEvent(self, event):
         if self.mapFromScene(self.graphArea.boundingRect()).containsPoint(self.origin, Qt.OddEvenFill) and self.mapFromScene(self.graphArea.boundingRect()).containsPoint(event.pos(), Qt.OddEvenFill):
             if self.rubberBand.isVisible():
                 self.rubberBand.setGeometry(QRect(self.origin,event.pos()).normalized())
-                selectedItems = self.items(self.rubberBand.geometry())
+        elementRange = self.elementRange(QRect(event.pos(), QSize(1,1)))
+        if elementRange is None:
+            self.heatmapItem.setToolTip("")
+            return
+        (xInd, yInd) = (elementRange[0], elementRange[2])
+        (xIndex, yIndex) = self.elementIndices(xInd, yInd)
+        binSize = self.matrices[self.activeIndex][3]
+        elementHits = self.elementHits(xInd, yInd)
+        if self.genomeWide:
+            (chromoX,posX) = self.genomeLocation(xIndex*binSize)
+            (chromoY,posY) = self.genomeLocation(yIndex*binSize)
+            self.heatmapItem.setToolTip("x: " + chromoX.name + ":" + str(posX) + "bp\n" + "y: " + chromoY.name + ":" + str(posY) + "bp\n" + "#interactions: " +  str(elementHits))
+            return
+        self.heatmapItem.setToolTip("x: " + str(xIndex*binSize*1000) + "bp\n" + "y: " + str(yIndex*binSize*1000) + "bp\n" + "#interactions: " +  str(elementHits))
 
     #When the mouse button is released two things can happen
     #Either the rectangle has selected more than one elements, then the zoom is started without any magnification, origin will be bottomLeft of the rectangle
@@ -488,52 +669,29 @@ class HeatmapView(QGraphicsView):
     def mouseReleaseEvent(self, event):
         if self.mapFromScene(self.graphArea.boundingRect()).containsPoint(self.origin, Qt.OddEvenFill):
             self.rubberBand.hide()
-            selectedItems = self.items(self.rubberBand.geometry())
-            itemCounter = 0
-            for item in selectedItems:
-                if item.data(0) == "ElementItem":
-                    itemCounter += 1
-            if itemCounter > 1:
-                yIndices = []
-                xIndices = []
-                for item in selectedItems:
-                    if item.data(0) == "ElementItem":
-                        yIndices.append(item.yInd)
-                        xIndices.append(item.xInd)
-                self.zoomIn(False, min(xIndices), min(yIndices), len(list(set(xIndices))), len(list(set(yIndices))))
+            if self.genomeWide:
+                self.showGenomePair(event.pos())
+                return
+            elementRange = self.elementRange(self.rubberBand.geometry())
+            if elementRange is not None and (elementRange[1] - elementRange[0] + 1)*(elementRange[3] - elementRange[2] + 1) > 1:
+                (firstX, lastX, firstY, lastY) = elementRange
+                #the bottom row of the selection has the lowest y index
+                (xIndex, yIndex) = self.elementIndices(firstX, lastY)
+                self.zoomIn(False, xIndex, yIndex, lastX - firstX + 1, lastY - firstY + 1)
             else:
-                selectedItem = self.items(event.pos())
-                for item in selectedItem:
-                    if item.data(0) == "ElementItem":
-                        xInd = item.xInd
-                        yInd = item.yInd
-                self.zoomIn(True, xInd, yInd, 10, 10)
-
-#Subclass of graphics path item for custom handling of mouse events
-class ElementGraphicItem(QGraphicsPathItem):
-
-    def __init__(self,path,xInd, yInd):
-        super().__init__(path)
-        self.selected = False
-        self.xInd = xInd
-        self.yInd = yInd
-        self.setData(0,"ElementItem")
-        #self.setPen(QPen(Qt.darkRed,1))
-
-    #Marks the chromosome item with a blue outline if selected
-    def mark(self):
-        currentPen = self.pen()
-        currentPen.setStyle(Qt.DashLine)
-        currentPen.setBrush(Qt.blue)
-        currentPen.setWidth(3)
-        self.setPen(currentPen)
-        self.selected = True
-
-    def unmark(self):
-        self.setPen(QPen(Qt.darkRed,1))
-        self.selected = False
-
-    #Paints the name of the chromosone in the middle of the item -- possible to implemend changing of font etc if needed
-    #Put this in separate function for more flexible handling of when name is painted?
-    def paint(self,painter,option,widget):
-        super().paint(painter,option,widget)
+                elementRange = self.elementRange(QRect(event.pos(), QSize(1,1)))
+                if elementRange is None:
+                    return
+                (xIndex, yIndex) = self.elementIndices(elementRange[0], elementRange[2])
+                self.zoomIn(True, xIndex, yIndex, 10, 10)
+
+    #Shows the heatmap of the chromosomes at a position in the genome heatmap, given in view coordinates
+    def showGenomePair(self, viewPos):
+        if self.elementRange(QRect(viewPos, QSize(1,1))) is None:
+            return
+        imagePos = self.heatmapItem.mapFromScene(self.mapToScene(viewPos))
+        binSize = self.matrices[self.activeIndex][3]
+        (self.chromoA,posA) = self.genomeLocation(imagePos.x()*binSize)
+        (self.chromoB,posB) = self.genomeLocation((self.heatmapItem.pixmap().height() - imagePos.y())*binSize)
+        self.updateChromosomeBoxes()
+        self.createHeatmap(self.chromoA, self.chromoB, self.binSize, self.mapping)
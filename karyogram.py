@@ -14,7 +14,7 @@ class KaryogramView(QGraphicsView):
         super().__init__(self.scene,parent)
         self.chromosomes = self.dataDict['chromosomeList']
         self.chromosomeDict = {chromo.name: chromo for chromo in self.chromosomes}
-        self.cytoInfo = self.dataDict['cytoTab']
+        self.cytoIndex = self.dataDict['cytoIndex']
         self.colorNames = parent.colorNames
         self.colors = parent.colors
         self.numDispChromos = 24
@@ -304,33 +304,26 @@ class KaryogramView(QGraphicsView):
             if not chrA.display:
                 continue
             for variant in chrA.variants:
-                chrB = self.chromosomeDict[variant[2]]
-                #check whether a connection line will be shown. variant[9] is active/inactive, variant[2] is chrB - so do not show if chrB is GLXXXXX
-                #and then if either display_connections is true or if the variant is selected, or if it is marked (variant[11])
-                if variant[9] and not variant[2].startswith("G") and (chrA.display_connections or variant in selectedVariants or variant[11]):
-                    if not self.chromosomeDict[variant[2]].display:
+                chrB = self.chromosomeDict[variant.chrB]
+                #check whether a connection line will be shown. Do not show inactive variants, or variants where chrB is GLXXXXX
+                #and then if either display_connections is true or if the variant is selected, or if it is marked
+                if variant.active and not variant.chrB.startswith("G") and (chrA.display_connections or variant in selectedVariants or variant.marked):
+                    if not self.chromosomeDict[variant.chrB].display:
                         continue
                     #if the windows are present use them, otherwise use START and END
-                    if "WINA" in variant[5]:                        
-                        #If chrA is higher in order than chrB, WINA and WINB are switched, so check this first  
-                        if self.chromosomes.index(chrA) > self.chromosomes.index(chrB):
-                            connStartPos = int(variant[5]["WINB"].split(',')[1])
-                            connEndPos = int(variant[5]["WINA"].split(',')[1])
-                        else:
-                            connStartPos = int(variant[5]["WINA"].split(',')[1])
-                            connEndPos = int(variant[5]["WINB"].split(',')[1])
+                    if variant.winAEnd is not None:
+                        connStartPos = variant.winAEnd
+                        connEndPos = variant.winBEnd
                     else:
-                        connStartPos = int(variant[1])
-                        connEndPos = int(variant[3])
-                    #The cytobands which the connections will go between
-                    #look for the cytoband on chrA. data(2) is the start pos for the cytoband and data(3) is the end pos, data(0) is the band object
-                    for cytoItem in self.cytoGraphicItems[chrA.name].bandItemsDict.values():
-                        if connStartPos > cytoItem.data(2) and connStartPos < cytoItem.data(3):
-                                cbandA = cytoItem.data(0)
-                    #look for the cytoband on chrB
-                    for cytoItem in self.cytoGraphicItems[chrB.name].bandItemsDict.values():
-                        if connEndPos > cytoItem.data(2) and connEndPos < cytoItem.data(3):
-                            cbandB = cytoItem.data(0)  
+                        connStartPos = variant.posA
+                        connEndPos = variant.posB
+                    #The cytobands which the connections will go between, looked up in the cytoband index
+                    cytoA = self.cytoIndex.bandAt(chrA.name,connStartPos)
+                    cytoB = self.cytoIndex.bandAt(chrB.name,connEndPos)
+                    if cytoA is None or cytoB is None:
+                        continue
+                    cbandA = cytoA[3]
+                    cbandB = cytoB[3]
                     #do not show small variants within the same cytoband
                     if cbandA == cbandB:
                         continue
@@ -378,7 +371,7 @@ class KaryogramView(QGraphicsView):
                     pen.setWidth(2)
                     connectionItem.setZValue(2)
                     #if the variant is selected, color it red
-                    if variant[11] or variant in selectedVariants:
+                    if variant.marked or variant in selectedVariants:
                         pen.setBrush(Qt.red)
                         connectionItem.setZValue(3)
                     connectionItem.setPen(pen)
@@ -419,82 +412,74 @@ class KaryogramView(QGraphicsView):
                 firstAcen = True
                 rounded = ""
                 #Find each cytoband for this chromosome, and create band items using this data
-                for cyto in self.cytoInfo:
-                    if cyto[0] == chromo.name:
-                        cytoStart = int(cyto[1])
-                        cytoEnd = int(cyto[2])
-                        totalCytoBP = cytoEnd-cytoStart
-                        bandHeight = (totalCytoBP / int(chromo.end)) * (chromoHeight)
-                        bandYPos = (cytoStart / int(chromo.end)) * (chromoHeight)
-                        bandXPos = currentXPosition
-                        bandWidth = self.chromoWidth
-                        #If first item, round on top
-                        if cytoStart is 0:
-                            rect = QRectF(bandXPos,bandYPos,bandWidth,bandHeight)
-                            rect.setBottom(rect.bottom() + rect.height())
-                            roundPath = QPainterPath(rect.center())
-                            roundPath.arcTo(rect,0,180)
-                            roundPath.closeSubpath()
-                            bandRectItem = QGraphicsPathItem(roundPath)
-                            rounded = "top"
-                        #If first acen, round on bottom
-                        elif cyto[4] == 'acen' and firstAcen:
-                            rect = QRectF(bandXPos,bandYPos,bandWidth,bandHeight)
-                            rect.setTop(rect.top() - rect.height())
-                            roundPath = QPainterPath(rect.center())
-                            roundPath.arcTo(rect,0,-180)
-                            roundPath.closeSubpath()
-                            bandRectItem = QGraphicsPathItem(roundPath)
-                            firstAcen = False
-                            rounded = "bottom"
-                        #If second acen, round on top
-                        elif cyto[4] == 'acen':
-                            rect = QRectF(bandXPos,bandYPos,bandWidth,bandHeight)
-                            rect.setBottom(rect.bottom() + rect.height())
-                            roundPath = QPainterPath(rect.center())
-                            roundPath.arcTo(rect,0,180)
-                            roundPath.closeSubpath()
-                            bandRectItem = QGraphicsPathItem(roundPath)
-                            rounded = "top"
-                        #If last item, round on bottom (i.e. last index in last chr or new chr next on next index)
-                        elif self.cytoInfo.index(cyto) == len(self.cytoInfo)-1:
-                            rect = QRectF(bandXPos,bandYPos,bandWidth,bandHeight)
-                            rect.setTop(rect.top() - rect.height())
-                            roundPath = QPainterPath(rect.center())
-                            roundPath.arcTo(rect,0,-180)
-                            roundPath.closeSubpath()
-                            bandRectItem = QGraphicsPathItem(roundPath)
-                            rounded = "bottom"
-                        elif self.cytoInfo[self.cytoInfo.index(cyto)+1][0] != chromo.name:
-                            rect = QRectF(bandXPos,bandYPos,bandWidth,bandHeight)
-                            rect.setTop(rect.top() - rect.height())
-                            roundPath = QPainterPath(rect.center())
-                            roundPath.arcTo(rect,0,-180)
-                            roundPath.closeSubpath()
-                            bandRectItem = QGraphicsPathItem(roundPath)
-                            rounded = "bottom"
-                        else:
-                            #Create a rect item with corresponding stain color, tooltip, set data to band name for later use
-                            bandRectItem = QGraphicsRectItem(bandXPos,bandYPos,bandWidth,bandHeight)
-                            rounded = "none"
-                        bandRectItem.setBrush(self.colors[cyto[4]])
-                        bandRectItem.setToolTip(cyto[3] + ": " + str(totalCytoBP) + " bp")
-                        bandRectItem.setData(0,cyto[3])
-                        bandRectItem.setData(2, cytoStart)
-                        bandRectItem.setData(3, cytoEnd)
-                        bandRectItem.setData(4, bandYPos)
-                        bandRectItem.setData(5, rounded)
-                        self.scene.addItem(bandRectItem)
-                        bandItems.append(bandRectItem)
-                        if chromo.display_cytoBandNames:
-                            bandNameItem = QGraphicsTextItem(cyto[3])
-                            nameXPosition = bandRectItem.boundingRect().left()-bandRectItem.boundingRect().width() if placeLeft else bandRectItem.boundingRect().right()
-                            bandNameItem.setPos(nameXPosition,bandRectItem.boundingRect().center().y()-12)
-                            bandNameItem.setScale(self.chromoWidth/35)
-                            self.scene.addItem(bandNameItem)
-                            nameRectItem = QGraphicsRectItem
-                            textItems.append(bandNameItem)
-                            placeLeft = not placeLeft
+                bands = self.cytoIndex.chromosomeBands(chromo.name)
+                for (bandIndex,cyto) in enumerate(bands):
+                    cytoStart = int(cyto[1])
+                    cytoEnd = int(cyto[2])
+                    totalCytoBP = cytoEnd-cytoStart
+                    bandHeight = (totalCytoBP / int(chromo.end)) * (chromoHeight)
+                    bandYPos = (cytoStart / int(chromo.end)) * (chromoHeight)
+                    bandXPos = currentXPosition
+                    bandWidth = self.chromoWidth
+                    #If first item, round on top
+                    if cytoStart is 0:
+                        rect = QRectF(bandXPos,bandYPos,bandWidth,bandHeight)
+                        rect.setBottom(rect.bottom() + rect.height())
+                        roundPath = QPainterPath(rect.center())
+                        roundPath.arcTo(rect,0,180)
+                        roundPath.closeSubpath()
+                        bandRectItem = QGraphicsPathItem(roundPath)
+                        rounded = "top"
+                    #If first acen, round on bottom
+                    elif cyto[4] == 'acen' and firstAcen:
+                        rect = QRectF(bandXPos,bandYPos,bandWidth,bandHeight)
+                        rect.setTop(rect.top() - rect.height())
+                        roundPath = QPainterPath(rect.center())
+                        roundPath.arcTo(rect,0,-180)
+                        roundPath.closeSubpath()
+                        bandRectItem = QGraphicsPathItem(roundPath)
+                        firstAcen = False
+                        rounded = "bottom"
+                    #If second acen, round on top
+                    elif cyto[4] == 'acen':
+                        rect = QRectF(bandXPos,bandYPos,bandWidth,bandHeight)
+                        rect.setBottom(rect.bottom() + rect.height())
+                        roundPath = QPainterPath(rect.center())
+                        roundPath.arcTo(rect,0,180)
+                        roundPath.closeSubpath()
+                        bandRectItem = QGraphicsPathItem(roundPath)
+                        rounded = "top"
+                    #If last item of the chromosome, round on bottom
+                    elif bandIndex == len(bands)-1:
+                        rect = QRectF(bandXPos,bandYPos,bandWidth,bandHeight)
+                        rect.setTop(rect.top() - rect.height())
+                        roundPath = QPainterPath(rect.center())
+                        roundPath.arcTo(rect,0,-180)
+                        roundPath.closeSubpath()
+                        bandRectItem = QGraphicsPathItem(roundPath)
+                        rounded = "bottom"
+                    else:
+                        #Create a rect item with corresponding stain color, tooltip, set data to band name for later use
+                        bandRectItem = QGraphicsRectItem(bandXPos,bandYPos,bandWidth,bandHeight)
+                        rounded = "none"
+                    bandRectItem.setBrush(self.colors[cyto[4]])
+                    bandRectItem.setToolTip(cyto[3] + ": " + str(totalCytoBP) + " bp")
+                    bandRectItem.setData(0,cyto[3])
+                    bandRectItem.setData(2, cytoStart)
+                    bandRectItem.setData(3, cytoEnd)
+                    bandRectItem.setData(4, bandYPos)
+                    bandRectItem.setData(5, rounded)
+                    self.scene.addItem(bandRectItem)
+                    bandItems.append(bandRectItem)
+                    if chromo.display_cytoBandNames:
+                        bandNameItem = QGraphicsTextItem(cyto[3])
+                        nameXPosition = bandRectItem.boundingRect().left()-bandRectItem.boundingRect().width() if placeLeft else bandRectItem.boundingRect().right()
+                        bandNameItem.setPos(nameXPosition,bandRectItem.boundingRect().center().y()-12)
+                        bandNameItem.setScale(self.chromoWidth/35)
+                        self.scene.addItem(bandNameItem)
+                        nameRectItem = QGraphicsRectItem
+                        textItems.append(bandNameItem)
+                        placeLeft = not placeLeft
                 chromoNameItem = QGraphicsTextItem(chromo.name)
                 chromoNameItem.setPos(currentXPosition,chromoHeight)
                 chromoNameItem.setScale(self.chromoWidth/20)
@@ -533,11 +518,11 @@ class KaryogramView(QGraphicsView):
             chrALength = int(chrA.end)
             for variant in chrA.variants:
                 #only create marks if the variant is active, and not a GLXXXXX and if either it is selected or marked
-                if variant[9] and not variant[2].startswith("G") and (variant in selectedVariants or variant[11]):
-                    if "WINA" in variant[5]:
-                        if not self.chromosomeDict[variant[2]].display:
+                if variant.active and not variant.chrB.startswith("G") and (variant in selectedVariants or variant.marked):
+                    if variant.winAStart is not None:
+                        if not self.chromosomeDict[variant.chrB].display:
                             continue
-                        chrB = self.chromosomeDict[variant[2]]
+                        chrB = self.chromosomeDict[variant.chrB]
                         chrBHeight = 0
                         xPosB = self.cytoGraphicItems[chrB.name].mapRectToScene(self.cytoGraphicItems[chrB.name].boundingRect()).left()
                         yPosB = self.cytoGraphicItems[chrB.name].mapRectToScene(self.cytoGraphicItems[chrB.name].boundingRect()).bottom()
@@ -548,16 +533,10 @@ class KaryogramView(QGraphicsView):
                                 yPosB = band.mapRectToScene(band.boundingRect()).top()
                         chrBWidth = self.chromoWidth+1
                         chrBLength = int(chrB.end)
-                        if self.chromosomes.index(chrA) > self.chromosomes.index(chrB):
-                                startWinA = int(variant[5]["WINB"].split(',')[0])
-                                endWinA = int(variant[5]["WINB"].split(',')[1])
-                                startWinB = int(variant[5]["WINA"].split(',')[0])
-                                endWinB = int(variant[5]["WINA"].split(',')[1])
-                        else: 
-                                startWinA = int(variant[5]["WINA"].split(',')[0])
-                                endWinA = int(variant[5]["WINA"].split(',')[1])
-                                startWinB = int(variant[5]["WINB"].split(',')[0])
-                                endWinB = int(variant[5]["WINB"].split(',')[1])
+                        startWinA = variant.winAStart
+                        endWinA = variant.winAEnd
+                        startWinB = variant.winBStart
+                        endWinB = variant.winBEnd
                         lengthWinA = endWinA - startWinA
                         lengthWinB = endWinB - startWinB
                         markHeightA = (lengthWinA/chrALength)*chrAHeight
@@ -566,12 +545,12 @@ class KaryogramView(QGraphicsView):
                         markRectB = QRect(xPosB, yPosB + (startWinB/chrBLength)*chrBHeight, chrBWidth, markHeightB)
                         markRectItemA = QGraphicsRectItem(markRectA)
                         markRectItemB = QGraphicsRectItem(markRectB)
-                        if variant[4] == "DEL":
+                        if variant.eventType == "DEL":
                             markRectItemA.setBrush(QBrush(Qt.red))
                             markRectItemB.setBrush(QBrush(Qt.red))
                             markRectItemA.setPen(QPen(QBrush(Qt.red),1))
                             markRectItemB.setPen(QPen(QBrush(Qt.red),1))
-                        elif variant[4] == "DUP":
+                        elif variant.eventType == "DUP":
                             markRectItemA.setBrush(QBrush(Qt.green))
                             markRectItemB.setBrush(QBrush(Qt.green))
                             markRectItemA.setPen(QPen(QBrush(Qt.green),1))
@@ -595,16 +574,16 @@ class KaryogramView(QGraphicsView):
 
                     else:
                             
-                        startPos = variant[1]
-                        endPos = variant[3]
+                        startPos = variant.posA
+                        endPos = variant.posB
                         variantLength = endPos-startPos
                         variantHeight = (variantLength/chrALength)*chrAHeight
                         markRect = QRect(xPosA, yPosA + (startPos/chrALength)*chrAHeight, chrAWidth, variantHeight)
                         markRectItem = QGraphicsRectItem(markRect)
-                        if variant[4] == "DEL":
+                        if variant.eventType == "DEL":
                             markRectItem.setBrush(QBrush(Qt.red))
                             markRectItem.setPen(QPen(QBrush(Qt.red),1))
-                        elif variant[4] == "DUP":
+                        elif variant.eventType == "DUP":
                             markRectItem.setBrush(QBrush(Qt.green))
                             markRectItem.setPen(QPen(QBrush(Qt.green),1))
                         else:   
@@ -1,5 +1,9 @@
 import sys
 import data
+import vcfIndex
+import datasetFile
+import datasetLoader
+import searchIndex
 import circ
 import coverage
 import karyogram
@@ -33,7 +37,13 @@ class SciVisView(QMainWindow):
         self.saveIcon = QIcon("icons/save.png")
         self.settingsIcon = QIcon("icons/settings.png")
         #Load config file
-        (self.circularConfig,self.coverageConfig,self.karyoConfig,self.heatmapConfig,self.colors) = data.readConfig("userSettings.conf")
+        (self.circularConfig,self.coverageConfig,self.karyoConfig,self.heatmapConfig,self.colors,self.generalConfig) = data.readConfig("userSettings.conf")
+        #Settings files from earlier versions have no general section or heatmap settings, use the default settings for these
+        defaultConfigs = data.readConfig("defaultSettings.conf")
+        for (key,value) in defaultConfigs[3].items():
+            self.heatmapConfig.setdefault(key,value)
+        for (key,value) in defaultConfigs[5].items():
+            self.generalConfig.setdefault(key,value)
         self.colorNames = self.colors.keys()
         for name in self.colorNames:
             self.colors[name] = QColor(self.colors[name])
@@ -54,6 +64,7 @@ class SciVisView(QMainWindow):
         viewSettingsAct.triggered.connect(self.viewSettings)
         #Create menus, and add actions
         self.createColorModel()
+        self.createGeneralModel()
         self.menubar = self.menuBar()
         self.fileMenu = self.menubar.addMenu('File')
         self.fileMenu.addAction(newCircAct)
@@ -74,6 +85,26 @@ class SciVisView(QMainWindow):
         self.viewChromosomes = []
         self.initDock()
         self.bedWidget = None
+        #Datasets are read in a background thread, with progress and a cancel button shown in the status bar
+        self.datasetLoader = datasetLoader.DatasetLoader(self)
+        self.datasetLoader.progress.connect(self.updateLoadProgress)
+        self.datasetLoader.datasetLoaded.connect(self.addDatasetItem)
+        self.datasetLoader.loadFailed.connect(self.loadFailed)
+        #Number of datasets queued or being read
+        self.pendingLoads = 0
+        self.loadLabel = QLabel()
+        self.loadProgressBar = QProgressBar()
+        self.loadProgressBar.setMaximumWidth(200)
+        self.loadCancelButton = QPushButton("Cancel")
+        self.loadCancelButton.setToolTip("Cancel reading datasets")
+        self.loadCancelButton.clicked.connect(self.cancelLoading)
+        self.statusBar().addPermanentWidget(self.loadLabel)
+        self.statusBar().addPermanentWidget(self.loadProgressBar)
+        self.statusBar().addPermanentWidget(self.loadCancelButton)
+        self.loadLabel.hide()
+        self.loadProgressBar.hide()
+        self.loadCancelButton.hide()
+        self.datasetLoader.start()
         self.show()
 
     def initDock(self):
@@ -114,12 +145,16 @@ class SciVisView(QMainWindow):
         defaultFolderButton = QPushButton(self.folderIcon,"")
         defaultFolderButton.setToolTip("Set default folder")
         defaultFolderButton.clicked.connect(self.selectDefaultFolder)
-        dataLayout.addWidget(dataList,0,0,1,5)
+        regionButton = QPushButton("Region")
+        regionButton.setToolTip("Create dataset from region")
+        regionButton.clicked.connect(self.createRegionDataset)
+        dataLayout.addWidget(dataList,0,0,1,6)
         dataLayout.addWidget(newButton,1,0,1,1)
         dataLayout.addWidget(editButton,1,1,1,1)
         dataLayout.addWidget(loadButton,1,2,1,1)
         dataLayout.addWidget(saveButton,1,3,1,1)
         dataLayout.addWidget(defaultFolderButton,1,4,1,1)
+        dataLayout.addWidget(regionButton,1,5,1,1)
         #Apply layout to page, add page to tab widget
         dataPage.setLayout(dataLayout)
         tabIndex = self.dockTabs.addTab(dataPage,"Data")
@@ -224,33 +259,45 @@ class SciVisView(QMainWindow):
             index = index.parent()
         if index.isValid():
             selectedData = self.datasetModel.itemFromIndex(index).data()
-            filename = selectedData['setName'] + ".pkl"
-            if not self.defaultFolder:
-                startPath = QDir.currentPath() + "/" + filename
-            else:
-                startPath = self.defaultFolder + "/" + filename
-            savePath = QFileDialog.getSaveFileName(self, "Save dataset", startPath, "Pickle files (*.pkl)")[0]
-            if savePath:
-                with open(savePath, 'wb') as output:
-                    pickle.dump(selectedData, output, pickle.HIGHEST_PROTOCOL)
+            self.writeDataset(selectedData)
 
     def saveDataset(self):
         selectedData = self.selectDataset()
-        filename = selectedData['setName'] + ".pkl"
+        self.writeDataset(selectedData)
+
+    #Asks for a file name and saves the dataset, in the dataset file format or as a pickle if a .pkl name is given
+    def writeDataset(self, selectedData):
+        filename = selectedData['setName'] + datasetFile.datasetExtension
         if not self.defaultFolder:
             startPath = QDir.currentPath() + "/" + filename
         else:
             startPath = self.defaultFolder + "/" + filename
-        savePath = QFileDialog.getSaveFileName(self, "Save dataset", startPath, "Pickle files (*.pkl)")[0]
+        savePath = QFileDialog.getSaveFileName(self, "Save dataset", startPath,
+        "SciVis datasets (*.scivis);;Pickle files (*.pkl)")[0]
         if savePath:
-            with open(savePath, 'wb') as output:
-                pickle.dump(selectedData, output, pickle.HIGHEST_PROTOCOL)
+            if savePath.endswith(".pkl"):
+                #The cytoband and search indexes are built again when the dataset is loaded, and heatmaps counted again when shown
+                savedData = {key: value for (key,value) in selectedData.items() if key not in ('cytoIndex','searchIndex','heatmapCache')}
+                with open(savePath, 'wb') as output:
+                    pickle.dump(savedData, output, pickle.HIGHEST_PROTOCOL)
+            else:
+                datasetFile.saveDataset(selectedData, savePath)
 
     def loadDataset(self):
-        filename = QFileDialog.getOpenFileName(None,"Specify pkl file",self.defaultFolder,
-        "Pickle files (*.pkl)")[0]
+        filename = QFileDialog.getOpenFileName(None,"Specify dataset file",self.defaultFolder,
+        "Datasets (*.scivis *.pkl)")[0]
         if filename:
-            itemData = pickle.load( open( filename, "rb" ) )
+            #Datasets saved as pickles by earlier versions can still be loaded
+            if datasetFile.isDatasetFile(filename):
+                itemData = datasetFile.loadDataset(filename)
+                if itemData is None:
+                    self.statusBar().showMessage("Could not read dataset file")
+                    return
+            else:
+                itemData = pickle.load( open( filename, "rb" ) )
+                data.setVariantWindows(itemData['chromosomeList'])
+            itemData['cytoIndex'] = data.CytobandIndex(itemData['cytoTab'])
+            itemData['searchIndex'] = searchIndex.createSearchIndex(itemData['chromosomeList'], itemData['cytoIndex'])
             #Create a model item and add to the model containing datasets
             dataItem = QStandardItem(itemData['setName'])
             dataItem.setData(itemData)
@@ -266,30 +313,38 @@ class SciVisView(QMainWindow):
             dataItem.appendRow(cytoItem)
             self.datasetModel.appendRow(dataItem)
 
-    #Creates data model item, and adds to main dataset model
-    def createDatasetItem(self, tabName, vcfName, setName):
-        self.statusBar().showMessage("Reading TAB..")
-        (chromosomeList,coverageNorm,coverageNormLog,totalBP) = data.readTab(tabName)
-        self.statusBar().showMessage("Reading VCF..")
-        (chromosomeList,vcfInfoLines) = data.readVCFFile(vcfName,chromosomeList)
-        self.statusBar().showMessage("Reading cytoband file..")
-        cytoName = "cytoBand.txt"
-        cytoTab = data.readCytoTab(cytoName)
-        self.statusBar().clearMessage()
+    #Queues a dataset to be read by the dataset loader. The data model item is created when the dataset has been read.
+    #If regions are given, only variants within these are read from the (BGZF compressed and indexed) vcf
+    def createDatasetItem(self, tabName, vcfName, setName, regions=None):
+        job = {'tabName':tabName, 'vcfName':vcfName, 'setName':setName, 'regions':regions,
+            'useCache':self.generalConfig['useCache'] == "True", 'cacheFolder':self.generalConfig['cacheFolder'],
+            'cacheSizeLimit':int(self.generalConfig['cacheSizeLimit'])*1000000}
+        self.datasetLoader.addJob(job)
+        self.pendingLoads += 1
+        self.loadProgressBar.show()
+        self.loadCancelButton.show()
+        self.loadLabel.show()
+        self.updateLoadProgress(setName, "Waiting", -1)
+
+    #Creates data model item for a dataset read by the dataset loader, and adds to main dataset model
+    def addDatasetItem(self, itemData):
+        setName = itemData['setName']
+        #Variants on chromosomes missing from the TAB file are kept with the dataset but not shown in any view
+        unplacedVariants = itemData['unplacedVariants']
+        if unplacedVariants:
+            self.statusBar().showMessage(str(len(unplacedVariants)) + " variants on chromosomes not in TAB file")
         #Should display setname as parent
         dataItem = QStandardItem(setName)
-        #Create a dict storing the actual data, and attach to item
-        itemData = {'chromosomeList':chromosomeList,'coverageNormLog':coverageNormLog,'coverageNorm':coverageNorm,
-        'vcfName':vcfName,'tabName':tabName, 'cytoTab':cytoTab,'setName':setName}
+        #Attach the dict storing the actual data to the item
         dataItem.setData(itemData)
         #Vcf and tab names should be child items
-        vcfItem = QStandardItem(vcfName)
+        vcfItem = QStandardItem(itemData['vcfName'])
         vcfItem.setEditable(False)
         vcfItem.setSelectable(True)
-        tabItem = QStandardItem(tabName)
+        tabItem = QStandardItem(itemData['tabName'])
         tabItem.setEditable(False)
         tabItem.setSelectable(True)
-        cytoItem = QStandardItem(cytoName)
+        cytoItem = QStandardItem("cytoBand.txt")
         cytoItem.setEditable(False)
         cytoItem.setSelectable(True)
         dataItem.appendRow(vcfItem)
@@ -297,6 +352,42 @@ class SciVisView(QMainWindow):
         dataItem.appendRow(cytoItem)
         #Add finished item to model
         self.datasetModel.appendRow(dataItem)
+        self.hideLoadProgress()
+
+    def loadFailed(self, setName, message):
+        self.statusBar().showMessage(message)
+        self.hideLoadProgress()
+
+    #Shows the stage and progress of the dataset being read in the status bar
+    def updateLoadProgress(self, setName, stage, value):
+        queued = self.datasetLoader.queuedJobs()
+        labelText = stage + " (" + setName + ")"
+        if queued:
+            labelText += ", " + str(queued) + " more queued"
+        self.loadLabel.setText(labelText)
+        #A range of 0 to 0 shows a busy indicator for stages where the progress is not known
+        if value < 0:
+            self.loadProgressBar.setRange(0,0)
+        else:
+            self.loadProgressBar.setRange(0,1000)
+            self.loadProgressBar.setValue(value)
+
+    #Hides the progress widgets once all queued datasets have been read
+    def hideLoadProgress(self):
+        self.pendingLoads -= 1
+        if self.pendingLoads <= 0:
+            self.pendingLoads = 0
+            self.loadProgressBar.hide()
+            self.loadCancelButton.hide()
+            self.loadLabel.hide()
+
+    #Queued datasets are removed at once, the dataset being read reports that it was cancelled through loadFailed
+    def cancelLoading(self):
+        self.pendingLoads -= self.datasetLoader.cancelAll()
+
+    def closeEvent(self, event):
+        self.datasetLoader.stop()
+        super().closeEvent(event)
 
     #Creates a new set of data consisting of a vcf and a tab file
     def createNewDataset(self):
@@ -311,29 +402,54 @@ class SciVisView(QMainWindow):
             #Some confusion with python bindings makes getOpenFileName return a tuple.
             #First element is the name of the file.
             tabFile = QFileDialog.getOpenFileName(None,"Specify TAB file",startFolder,
-            "TAB files (*.tab)")[0]
+            "TAB files (*.tab *.tab.gz)")[0]
             #If no default folder was set, set it to folder containing chosen tab
             if not self.defaultFolder and tabFile:
                 self.defaultFolder = QFileInfo(tabFile).absolutePath()
             #Don't continue if user has cancelled
             if tabFile:
                 vcfFile = QFileDialog.getOpenFileName(None,"Specify VCF file",self.defaultFolder,
-                "VCF files (*.vcf)")[0]
+                "VCF files (*.vcf *.vcf.gz)")[0]
                 #Cancel results in empty string, only go ahead if not empty
                 if tabFile and vcfFile:
                     #Create a model item to be used for viewing datasets
                     self.createDatasetItem(tabFile,vcfFile,setName)
 
+    #Creates a new set of data using only the variants within regions of a BGZF compressed vcf.
+    #The vcf is indexed on first use, after which regions are read without going through the whole file.
+    def createRegionDataset(self):
+        setName, ok = QInputDialog.getText(self, "Enter set name", "Set name", QLineEdit.Normal, "New set")
+        if not (ok and setName):
+            return
+        regionString, ok = QInputDialog.getText(self, "Enter regions", "Chromosomes or regions (e.g. 1, 2:100000-200000)")
+        if not (ok and regionString):
+            return
+        regions = vcfIndex.parseRegions(regionString)
+        if not regions:
+            self.statusBar().showMessage("Regions not formatted correctly")
+            return
+        if not self.defaultFolder:
+            startFolder = QDir.currentPath()
+        else:
+            startFolder = self.defaultFolder
+        tabFile = QFileDialog.getOpenFileName(None,"Specify TAB file",startFolder,
+        "TAB files (*.tab *.tab.gz)")[0]
+        if tabFile:
+            vcfFile = QFileDialog.getOpenFileName(None,"Specify BGZF compressed VCF file",startFolder,
+            "Compressed VCF files (*.vcf.gz)")[0]
+            if vcfFile:
+                self.createDatasetItem(tabFile,vcfFile,setName,regions)
+
     def editDataset(self,index):
         #User might have clicked on a child item with no data -- try to get parent item if so
         if index.isValid() and not self.datasetModel.itemFromIndex(index).hasChildren():
             index = index.parent()
         if index.isValid():
             tabFile = QFileDialog.getOpenFileName(None,"Specify TAB file",self.defaultFolder,
-            "TAB files (*.tab)")[0]
+            "TAB files (*.tab *.tab.gz)")[0]
             if tabFile:
                 vcfFile = QFileDialog.getOpenFileName(None,"Specify VCF file",self.defaultFolder,
-                "VCF files (*.vcf)")[0]
+                "VCF files (*.vcf *.vcf.gz)")[0]
                 cytoFile = "cytoBand.txt"
                 #Cancel results in empty string, only go ahead if not empty
                 if tabFile and vcfFile:
@@ -491,13 +607,24 @@ class SciVisView(QMainWindow):
             addExcludeFileAct.triggered.connect(view.addExcludeFile)
             addExcludeGCFileAct = QAction('Add GC file',self)
             addExcludeGCFileAct.triggered.connect(view.addExcludeGCFile)
+            clearExclusionsAct = QAction('Clear exclusions',self)
+            clearExclusionsAct.triggered.connect(view.clearExclusions)
             searchBox = QLineEdit()
             searchBox.setMaximumWidth(100)
             searchBox.returnPressed.connect(lambda: view.searchString(searchBox.text()))
+            #Genes, cytobands and bed elements in the whole genome are suggested while typing
+            searchCompleter = QCompleter(searchBox)
+            searchCompleter.setModel(QStringListModel(searchCompleter))
+            searchCompleter.setCompletionMode(QCompleter.UnfilteredPopupCompletion)
+            searchCompleter.popup().setMinimumWidth(300)
+            searchBox.setCompleter(searchCompleter)
+            searchBox.textEdited.connect(lambda text: searchCompleter.model().setStringList(view.searchCompletions(text)))
+            searchCompleter.activated[str].connect(lambda completion: self.showSearchResult(view,completion))
             self.tools.addAction(showChInfoAct)
             self.tools.addAction(addBedAct)
             self.tools.addAction(addExcludeFileAct)
             self.tools.addAction(addExcludeGCFileAct)
+            self.tools.addAction(clearExclusionsAct)
             self.tools.addWidget(plotTypeBox)
             self.tools.addWidget(QLabel("Start (kb):"))
             self.tools.addWidget(startPosBox)
@@ -534,6 +661,7 @@ class SciVisView(QMainWindow):
             chromoBBox = QComboBox()
             chromoBBox.addItems(chromoStrings)
             chromoBBox.currentIndexChanged.connect(view.changeChromoB)
+            view.connectChromosomeBoxes(chromoABox,chromoBBox)
             binSizeBox = QLineEdit()
             binSizeBox.setValidator(QIntValidator(2000,20000, self))
             binSizeBox.insert("10000")
@@ -550,6 +678,8 @@ class SciVisView(QMainWindow):
             forwardAct = QAction('Forward', self)
             forwardAct.setShortcut(QKeySequence(Qt.Key_Right))
             forwardAct.triggered.connect(view.forward)
+            genomeAct = QAction('Genome', self)
+            genomeAct.triggered.connect(view.createGenomeHeatmap)
             binSizeBox.setMaximumWidth(100)
             self.tools.addAction(showChInfoAct)
             self.tools.addWidget(QLabel("Map chromosome:"))
@@ -564,6 +694,7 @@ class SciVisView(QMainWindow):
             self.tools.addAction(colorAct)
             self.tools.addAction(backAct)
             self.tools.addAction(forwardAct)
+            self.tools.addAction(genomeAct)
             self.tools.show()
         return True
 
@@ -652,6 +783,40 @@ class SciVisView(QMainWindow):
         self.colorModel.appendColumn(nameItems)
         self.colorModel.appendColumn(colorItems)
 
+    #Model with general settings, edited in the settings dialog
+    def createGeneralModel(self):
+        self.generalModel = QStandardItemModel()
+        settings = [("useCache","Cache parsed datasets","Keep datasets read from tab and vcf files in the cache folder, and read them from there if the files have not changed"),
+            ("cacheFolder","Cache folder","Folder where cached datasets are stored"),
+            ("cacheSizeLimit","Cache size limit (MB)","Least recently used datasets are removed when the cache grows larger than this")]
+        for (row,(key,text,toolTip)) in enumerate(settings):
+            textItem = QStandardItem(text)
+            textItem.setEditable(False)
+            textItem.setToolTip(toolTip)
+            dataItem = QStandardItem()
+            if key == "useCache":
+                dataItem.setCheckable(True)
+                dataItem.setEditable(False)
+                if self.generalConfig[key] == "True":
+                    dataItem.setCheckState(Qt.Checked)
+                else:
+                    dataItem.setCheckState(Qt.Unchecked)
+            elif key == "cacheSizeLimit":
+                dataItem.setData(int(self.generalConfig[key]),0)
+            else:
+                dataItem.setData(self.generalConfig[key],0)
+            dataItem.setData(key,32)
+            self.generalModel.setItem(row,0,textItem)
+            self.generalModel.setItem(row,1,dataItem)
+        self.generalModel.itemChanged.connect(self.updateGeneralSettings)
+
+    def updateGeneralSettings(self,item):
+        key = item.data(32)
+        if key == "useCache":
+            self.generalConfig[key] = str(item.checkState() == Qt.Checked)
+        elif key:
+            self.generalConfig[key] = str(item.data(0))
+
     def pickColor(self,modelIndex):
         selectedRow = modelIndex.row()
         nameItem = self.colorModel.item(selectedRow,0)
@@ -680,6 +845,8 @@ class SciVisView(QMainWindow):
         generalList.setShowGrid(False)
         generalList.horizontalHeader().hide()
         generalList.verticalHeader().hide()
+        generalList.setModel(self.generalModel)
+        generalList.resizeColumnsToContents()
         generalLayout.addWidget(generalList,0,0)
         generalPage.setLayout(generalLayout)
         #Color settings
@@ -739,16 +906,31 @@ class SciVisView(QMainWindow):
                 self.heatmapConfig = view.returnSettingsDict()
 
     def saveSettings(self):
-        if self.activeScene:
-            data.saveConfig("userSettings.conf",self.circularConfig,self.coverageConfig,self.karyoConfig,self.heatmapConfig,self.colors)
+        data.saveConfig("userSettings.conf",self.circularConfig,self.coverageConfig,self.karyoConfig,self.heatmapConfig,self.colors,self.generalConfig)
 
     def resetSettings(self):
-        (self.circularConfig,self.coverageConfig,self.karyoConfig,self.heatmapConfig,self.colors) = data.readConfig("defaultSettings.conf")
-        data.saveConfig("userSettings.conf",self.circularConfig,self.coverageConfig,self.karyoConfig,self.heatmapConfig,self.colors)
+        (self.circularConfig,self.coverageConfig,self.karyoConfig,self.heatmapConfig,self.colors,self.generalConfig) = data.readConfig("defaultSettings.conf")
+        data.saveConfig("userSettings.conf",self.circularConfig,self.coverageConfig,self.karyoConfig,self.heatmapConfig,self.colors,self.generalConfig)
+        self.createGeneralModel()
         self.colorNames = self.colors.keys()
         for name in self.colorNames:
             self.colors[name] = QColor(self.colors[name])
 
+    #Shows a search result chosen in the search box of a coverage view, selecting its chromosome first
+    def showSearchResult(self,view,completion):
+        result = view.searchResults.get(completion)
+        if result is None:
+            return
+        (name,kind,chromoName,start,end) = result
+        chromoIndex = view.chromosomes.index(view.chromosomeDict[chromoName])
+        if chromoIndex != view.activeChromo:
+            #The chromosome table of the view, shown in the dock, selects the chromosome as when the user selects it
+            if chromoIndex < view.chList.model().rowCount():
+                view.chList.selectRow(chromoIndex)
+            else:
+                view.setActiveChromosome(chromoIndex,view.varTable)
+        view.showRegion(start,end)
+
     def selectChromosome(self,selected,deselected):
         view = self.sceneTabs.currentWidget()
         viewInd = self.views.index(view)
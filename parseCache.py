@@ -0,0 +1,73 @@
+import os
+import glob
+import hashlib
+import datasetFile
+
+#Parsed datasets are cached as dataset files, named by a key computed from the fingerprints of the input files.
+#Size of the blocks at the start and end of each input file included in its fingerprint.
+fingerprintBlockSize = 1<<16
+
+#Returns a fingerprint of a file from its path, size, modification time and the contents of its first and last blocks,
+#so that a changed file gets a new fingerprint even if the size and time are unchanged.
+def fileFingerprint(fileName):
+    fileInfo = os.stat(fileName)
+    fingerprint = hashlib.sha1()
+    fingerprint.update(os.path.abspath(fileName).encode())
+    fingerprint.update(str(fileInfo.st_size).encode())
+    fingerprint.update(str(fileInfo.st_mtime_ns).encode())
+    with open(fileName, 'rb') as inputFile:
+        fingerprint.update(inputFile.read(fingerprintBlockSize))
+        if fileInfo.st_size > fingerprintBlockSize:
+            inputFile.seek(max(fingerprintBlockSize, fileInfo.st_size - fingerprintBlockSize))
+            fingerprint.update(inputFile.read(fingerprintBlockSize))
+    return fingerprint.hexdigest()
+
+#Returns the cache key of the dataset read from a tab and a vcf file
+def createKey(tabName, vcfName):
+    return hashlib.sha1((fileFingerprint(tabName) + fileFingerprint(vcfName)).encode()).hexdigest()
+
+def cacheFileName(cacheFolder, key):
+    return os.path.join(cacheFolder, key + datasetFile.datasetExtension)
+
+#Returns the cached itemData for key, or None if there is none. The modification time of a cached file is
+#updated when it is used, so that the least recently used files are removed first when the cache is full.
+def loadDataset(cacheFolder, key):
+    fileName = cacheFileName(cacheFolder, key)
+    if not os.path.exists(fileName):
+        return None
+    try:
+        os.utime(fileName)
+        return datasetFile.loadDataset(fileName)
+    except (OSError, ValueError):
+        print("Could not read cached dataset " + fileName)
+        return None
+
+#Adds itemData to the cache and removes the least recently used files to keep the cache within sizeLimit bytes
+def storeDataset(cacheFolder, key, itemData, sizeLimit):
+    fileName = cacheFileName(cacheFolder, key)
+    try:
+        os.makedirs(cacheFolder, exist_ok=True)
+        datasetFile.saveDataset(itemData, fileName)
+    except OSError:
+        print("Could not write dataset to cache folder " + cacheFolder)
+        return
+    evictDatasets(cacheFolder, sizeLimit)
+
+#Removes cached files, least recently used first, until the cache is within sizeLimit bytes.
+#The most recently used file is always kept.
+def evictDatasets(cacheFolder, sizeLimit):
+    cachedFiles = []
+    for fileName in glob.glob(os.path.join(cacheFolder, "*" + datasetFile.datasetExtension)):
+        fileInfo = os.stat(fileName)
+        cachedFiles.append((fileInfo.st_mtime,fileInfo.st_size,fileName))
+    cachedFiles.sort()
+    totalSize = sum(fileSize for (lastUsed,fileSize,fileName) in cachedFiles)
+    for (lastUsed,fileSize,fileName) in cachedFiles[:-1]:
+        if totalSize <= sizeLimit:
+            break
+        try:
+            os.remove(fileName)
+            totalSize -= fileSize
+        except OSError:
+            #Files in use can not be removed on some systems
+            pass
@@ -1,41 +1,153 @@
 #author J35P312 - http://github.com/J35P312/SVDB
 
 import sys,re
+import array
+from collections.abc import Mapping
+
+#INFO keys used when reading variants and by the views, the positions of their values are found when a record is read
+#and kept in this order, so that the values are used without searching or splitting the INFO string
+hotInfoKeys = ("SVTYPE", "END", "CHR2", "WINA", "WINB", "CYTOBAND", "CSQ", "RankScore")
+hotInfoIndex = {key:index for (index,key) in enumerate(hotInfoKeys)}
+
+#Returns the start and end in an INFO string of the value of the last key=value entry for key, or (-1,-1) if there is
+#no such entry. As when splitting the whole string, the value ends at the next ';' or '='.
+def findInfoValue(info, key):
+    pattern = key + "="
+    position = info.rfind(pattern)
+    while position > 0 and info[position-1] != ";":
+        position = info.rfind(pattern, 0, position + len(pattern) - 1)
+    if position < 0:
+        return (-1,-1)
+    valueStart = position + len(pattern)
+    valueEnd = info.find(";", valueStart)
+    if valueEnd < 0:
+        valueEnd = len(info)
+    equalsSign = info.find("=", valueStart, valueEnd)
+    if equalsSign >= 0:
+        valueEnd = equalsSign
+    return (valueStart,valueEnd)
+
+#Read-only mapping of INFO keys to values for a record. The start and end of the value of each key in hotInfoKeys
+#are found when the mapping is created and held in a compact int array, -1 for keys not in the INFO string.
+#The whole string is split into a dict the first time any other key is used.
+class LazyInfo(Mapping):
+
+    __slots__ = ('info','hotSpans','decoded')
+
+    def __init__(self, info):
+        self.info = info
+        self.hotSpans = array.array('i')
+        for key in hotInfoKeys:
+            self.hotSpans.extend(findInfoValue(info, key))
+        self.decoded = None
+
+    #Creates the mapping from a dict of INFO values, as stored in datasets saved by earlier versions
+    @classmethod
+    def fromDict(cls, description):
+        return cls(";".join(key + "=" + value for (key,value) in description.items()))
+
+    #Only the INFO string is saved with the record, the hot spans and the decoded dict are rebuilt from it
+    def __getstate__(self):
+        return self.info
+
+    def __setstate__(self, state):
+        self.__init__(state)
+
+    def decode(self):
+        if self.decoded is None:
+            description = {}
+            for tag in self.info.split(";"):
+                tag = tag.split("=")
+                if(len(tag) > 1):
+                    description[tag[0]] = tag[1]
+            self.decoded = description
+        return self.decoded
+
+    def __getitem__(self, key):
+        index = hotInfoIndex.get(key)
+        if index is None:
+            return self.decode()[key]
+        valueStart = self.hotSpans[2*index]
+        if valueStart < 0:
+            raise KeyError(key)
+        return self.info[valueStart:self.hotSpans[2*index+1]]
+
+    def __contains__(self, key):
+        index = hotInfoIndex.get(key)
+        if index is None:
+            return key in self.decode()
+        return self.hotSpans[2*index] >= 0
+
+    def __iter__(self):
+        return iter(self.decode())
+
+    def __len__(self):
+        return len(self.decode())
+
+#Read-only mapping of FORMAT keys to lists holding the value of each sample.
+#Holds the FORMAT column and sample columns of a record as one string, which is only split the first time the mapping is used.
+class LazyFormat(Mapping):
+
+    __slots__ = ('columns','decoded')
+
+    def __init__(self, columns):
+        self.columns = columns
+        self.decoded = None
+
+    #Creates the mapping from a dict of FORMAT keys to sample values, as stored in datasets saved by earlier versions
+    @classmethod
+    def fromDict(cls, format):
+        if not format:
+            return cls("")
+        keys = list(format)
+        samples = [":".join(format[key][sample] for key in keys) for sample in range(len(format[keys[0]]))]
+        return cls("\t".join([":".join(keys)] + samples))
+
+    def __getstate__(self):
+        return self.columns
+
+    def __setstate__(self, state):
+        self.columns = state
+        self.decoded = None
+
+    def decode(self):
+        if self.decoded is None:
+            format = {}
+            if self.columns:
+                columns = self.columns.split("\t")
+                format_keys = columns[0].split(":")
+                for key in format_keys:
+                    format[key] = []
+                for sample in columns[1:]:
+                    format_string = sample.split(":")
+                    for i in range(0,len(format_keys)):
+                        format[format_keys[i]].append(format_string[i])
+            self.decoded = format
+        return self.decoded
+
+    def __getitem__(self, key):
+        return self.decode()[key]
+
+    def __iter__(self):
+        return iter(self.decode())
+
+    def __len__(self):
+        return len(self.decode())
 
 def readVCFLine(line):
     if line[0] == "#":
         return(None)
 
-    variation   = line.rstrip().split("\t")
+    #FORMAT and the sample columns are left as one string
+    variation   = line.rstrip().split("\t", 8)
     event_type=""
     chrA=variation[0].replace("chr","").replace("Chr","").replace("CHR","");
     posA=int(variation[1]);
     posB=0;
 
-    description ={}
-    INFO=variation[7].split(";");
-    for tag in INFO:
-        tag=tag.split("=")
-        if(len(tag) > 1):
-            description[tag[0]]=tag[1];
-
-    format={}
-    format_keys={}
-    if len(variation) > 8:
-        format_string=variation[8].split(":")
-
-        i = 0;
-        for key in format_string:
-            format_keys[i]=key
-            format[key]=[]
-            i += 1
-        format_fields=variation[9:]
-        for sample in format_fields:
-            i=0
-            format_string= sample.split(":")
-            for i in range(0,len(format_keys)):
-                format[format_keys[i]].append(format_string[i])
-                i += 1
+    #INFO and FORMAT are kept as strings and only decoded when a field is used
+    description = LazyInfo(variation[7])
+    format = LazyFormat(variation[8] if len(variation) > 8 else "")
 
     #Delly translocations
     if("TRA" in variation[4]):
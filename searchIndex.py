@@ -0,0 +1,76 @@
+import bisect
+
+#Kinds of searchable names, in the order they are ranked when names are equal
+entryKinds = ('gene','band','bed')
+
+#Sorted table of searchable names (genes, cytobands and bed features) with their positions in the genome,
+#so that names starting with a typed prefix can be found by bisection.
+#Each entry is a tuple (lowercase name, kind order, chromosome order, start, end, name), so that sorting the entries
+#ranks them by name, then kind, then the order of the chromosomes in the dataset.
+class SearchIndex():
+
+    def __init__(self, chromosomeNames):
+        self.chromosomeNames = list(chromosomeNames)
+        self.chromosomeOrder = {name: order for (order,name) in enumerate(self.chromosomeNames)}
+        self.entries = []
+        self.keys = []
+        self.newEntries = []
+
+    #Adds a name for the region start to end of a chromosome. Added names are sorted into the index when next searched.
+    def addEntry(self, name, kind, chromoName, start, end):
+        if chromoName not in self.chromosomeOrder:
+            return
+        self.newEntries.append((name.lower(),entryKinds.index(kind),self.chromosomeOrder[chromoName],start,end,name))
+
+    def sortEntries(self):
+        if self.newEntries:
+            self.entries.extend(self.newEntries)
+            self.newEntries = []
+            self.entries.sort()
+            self.keys = [entry[0] for entry in self.entries]
+
+    #Returns up to limit entries with names starting with prefix (ignoring case), best ranked first
+    def prefixQuery(self, prefix, limit):
+        self.sortEntries()
+        prefix = prefix.strip().lower()
+        if not prefix:
+            return []
+        matches = []
+        index = bisect.bisect_left(self.keys, prefix)
+        while index < len(self.keys) and len(matches) < limit and self.keys[index].startswith(prefix):
+            matches.append(self.entries[index])
+            index += 1
+        return matches
+
+    #Returns the name, kind, chromosome name, start and end of an entry
+    def describeEntry(self, entry):
+        return (entry[5],entryKinds[entry[1]],self.chromosomeNames[entry[2]],entry[3],entry[4])
+
+#Creates the search index of a dataset, holding the cytobands and the genes in the CSQ field of the variants.
+#A gene is found at the region spanned by the variants in it on each chromosome.
+def createSearchIndex(chromosomes, cytoIndex):
+    index = SearchIndex([chromo.name for chromo in chromosomes])
+    for (chromoName,bands) in cytoIndex.bands.items():
+        for cyto in bands:
+            index.addEntry(chromoName + cyto[3], 'band', chromoName, int(cyto[1]), int(cyto[2]))
+    for chromo in chromosomes:
+        geneRegions = {}
+        for (genes,posA,chrB,posB) in chromo.variantGenes():
+            if not genes:
+                continue
+            #Only the position on this chromosome is used for interchromosomal variants
+            if chrB != chromo.name:
+                posB = posA
+            (start,end) = (min(posA,posB),max(posA,posB))
+            for gene in genes.split(', '):
+                if not gene:
+                    continue
+                if gene in geneRegions:
+                    (regionStart,regionEnd) = geneRegions[gene]
+                    geneRegions[gene] = (min(regionStart,start),max(regionEnd,end))
+                else:
+                    geneRegions[gene] = (start,end)
+        for (gene,(start,end)) in geneRegions.items():
+            index.addEntry(gene, 'gene', chromo.name, start, end)
+    index.sortEntries()
+    return index
@@ -0,0 +1,232 @@
+import os
+import json
+import struct
+import zlib
+
+#Records are indexed in windows of this many bp. For every window the index stores the virtual offset
+#of the first record overlapping it, similar to the linear index of tabix.
+indexWindowSize = 16384
+
+#Extension of the index file, stored next to the indexed vcf
+indexExtension = ".svi"
+
+#Reads a BGZF compressed file (as written by bgzip) one block at a time and supports seeking.
+#Positions are virtual offsets: the file offset of a block shifted 16 bits left, plus the offset within the
+#uncompressed block, in the same way as for tabix indexed files.
+class BgzfReader():
+
+    def __init__(self, fileName):
+        self.bgzfFile = open(fileName, 'rb')
+        self.blockOffset = 0
+        self.nextBlockOffset = 0
+        self.buffer = b""
+        self.bufferOffset = 0
+        self.loadBlock(0)
+
+    #Reads and decompresses the block starting at blockOffset in the file. Returns False at end of file.
+    def loadBlock(self, blockOffset):
+        self.bgzfFile.seek(blockOffset)
+        self.blockOffset = blockOffset
+        self.nextBlockOffset = blockOffset
+        self.buffer = b""
+        self.bufferOffset = 0
+        header = self.bgzfFile.read(12)
+        if not header:
+            return False
+        if len(header) < 12 or header[:4] != b"\x1f\x8b\x08\x04":
+            raise ValueError("Not a BGZF compressed file")
+        #The size of the block is stored in the BC subfield of the gzip extra field
+        extraLength = struct.unpack("<H", header[10:12])[0]
+        extra = self.bgzfFile.read(extraLength)
+        blockSize = None
+        extraOffset = 0
+        while extraOffset + 4 <= extraLength:
+            (subfieldId,subfieldLength) = struct.unpack("<2sH", extra[extraOffset:extraOffset+4])
+            if subfieldId == b"BC":
+                blockSize = struct.unpack("<H", extra[extraOffset+4:extraOffset+6])[0] + 1
+            extraOffset += 4 + subfieldLength
+        if blockSize is None:
+            raise ValueError("Not a BGZF compressed file")
+        compressedData = self.bgzfFile.read(blockSize - 12 - extraLength - 8)
+        self.bgzfFile.read(8)
+        self.buffer = zlib.decompress(compressedData, -15)
+        self.nextBlockOffset = blockOffset + blockSize
+        return True
+
+    def tell(self):
+        return (self.blockOffset << 16) | self.bufferOffset
+
+    def seek(self, virtualOffset):
+        blockOffset = virtualOffset >> 16
+        if blockOffset != self.blockOffset or not self.buffer:
+            self.loadBlock(blockOffset)
+        self.bufferOffset = virtualOffset & 0xFFFF
+
+    #Returns the next line as bytes including the line break, lines may span several blocks. Returns b"" at end of file.
+    def readline(self):
+        parts = []
+        while True:
+            lineEnd = self.buffer.find(b"\n", self.bufferOffset)
+            if lineEnd >= 0:
+                parts.append(self.buffer[self.bufferOffset:lineEnd+1])
+                self.bufferOffset = lineEnd + 1
+                return b"".join(parts)
+            parts.append(self.buffer[self.bufferOffset:])
+            self.bufferOffset = len(self.buffer)
+            if not self.loadBlock(self.nextBlockOffset):
+                return b"".join(parts)
+
+    def close(self):
+        self.bgzfFile.close()
+
+#Checks whether a file is BGZF compressed, i.e. gzip with a BC subfield holding the block size
+def isBgzf(fileName):
+    with open(fileName, 'rb') as inputFile:
+        header = inputFile.read(18)
+    return len(header) == 18 and header[:4] == b"\x1f\x8b\x08\x04" and header[12:14] == b"BC"
+
+#Chromosome names are stored without chr prefix, in the same way as by readVCF
+def chromosomeName(name):
+    return name.replace("chr","").replace("Chr","").replace("CHR","")
+
+#Returns the chromosome, start and end of a vcf data line. The end is taken from an END entry in the INFO field
+#if present, only used when the variant is on a single chromosome and the end lies after the start.
+def recordSpan(line):
+    fields = line.split(b"\t", 8)
+    chrom = chromosomeName(fields[0].decode())
+    start = int(fields[1])
+    end = start
+    if len(fields) > 7 and b"END=" in fields[7]:
+        otherChrom = None
+        for entry in fields[7].split(b";"):
+            if entry.startswith(b"END="):
+                try:
+                    end = max(start, int(entry[4:]))
+                except ValueError:
+                    pass
+            elif entry.startswith(b"CHR2="):
+                otherChrom = chromosomeName(entry[5:].decode())
+        if otherChrom is not None and otherChrom != chrom:
+            end = start
+    return (chrom,start,end)
+
+#Reads through a BGZF compressed vcf and creates an index of the records. The vcf must be sorted by position
+#within each chromosome, with all records of a chromosome in one block of lines. The index is saved next to the
+#vcf if possible and returned as a dict; None is returned if the file can not be indexed.
+def buildIndex(vcfName):
+    if not isBgzf(vcfName):
+        print("VCF file is not BGZF compressed, cannot build index")
+        return None
+    reader = BgzfReader(vcfName)
+    windows = {}
+    lastChrom = None
+    lastStart = 0
+    while True:
+        offset = reader.tell()
+        line = reader.readline()
+        if not line:
+            break
+        if line.startswith(b"#") or not line.strip():
+            continue
+        (chrom,start,end) = recordSpan(line)
+        if chrom != lastChrom:
+            if chrom in windows:
+                print("VCF file is not sorted by chromosome, cannot build index")
+                reader.close()
+                return None
+            windows[chrom] = {}
+            lastChrom = chrom
+            lastStart = start
+        if start < lastStart:
+            print("VCF file is not sorted by position, cannot build index")
+            reader.close()
+            return None
+        lastStart = start
+        #Records are read in order, so the first record seen overlapping a window has the lowest offset
+        chromWindows = windows[chrom]
+        for window in range(start // indexWindowSize, end // indexWindowSize + 1):
+            if window not in chromWindows:
+                chromWindows[window] = offset
+    reader.close()
+    #Windows without overlapping records start reading at the next window holding any
+    contigs = {}
+    for (chrom,chromWindows) in windows.items():
+        offsets = [None] * (max(chromWindows) + 1)
+        for (window,offset) in chromWindows.items():
+            offsets[window] = offset
+        for window in range(len(offsets) - 2, -1, -1):
+            if offsets[window] is None:
+                offsets[window] = offsets[window+1]
+        contigs[chrom] = offsets
+    fileInfo = os.stat(vcfName)
+    index = {'windowSize':indexWindowSize, 'fileSize':fileInfo.st_size, 'modified':fileInfo.st_mtime, 'contigs':contigs}
+    #The index is still used if it can not be saved, e.g. when the vcf is in a read-only folder
+    try:
+        with open(vcfName + indexExtension, 'w') as indexFile:
+            json.dump(index, indexFile)
+    except OSError:
+        print("Could not save index of VCF file next to it, the index is built again next time")
+    return index
+
+#Returns the saved index of a vcf, building it if there is none or if the vcf has changed since
+def loadIndex(vcfName):
+    indexName = vcfName + indexExtension
+    if os.path.exists(indexName):
+        with open(indexName, 'r') as indexFile:
+            index = json.load(indexFile)
+        fileInfo = os.stat(vcfName)
+        if index['fileSize'] == fileInfo.st_size and index['modified'] == fileInfo.st_mtime:
+            return index
+    return buildIndex(vcfName)
+
+#Returns the meta-information and header lines at the start of the vcf read by reader
+def readHeader(reader):
+    headerLines = []
+    reader.seek(0)
+    while True:
+        offset = reader.tell()
+        line = reader.readline()
+        if not line.startswith(b"#"):
+            reader.seek(offset)
+            return headerLines
+        headerLines.append(line.decode())
+
+#Yields (virtual offset, data line) for records on chrom overlapping start-end, using an index from loadIndex.
+#If start or end is None the region extends to the start or end of the chromosome.
+def queryRegion(reader, index, chrom, start=None, end=None):
+    chrom = chromosomeName(chrom)
+    if chrom not in index['contigs']:
+        return
+    offsets = index['contigs'][chrom]
+    window = 0
+    if start is not None:
+        window = start // index['windowSize']
+    if window >= len(offsets):
+        return
+    reader.seek(offsets[window])
+    while True:
+        offset = reader.tell()
+        line = reader.readline()
+        if not line or line.startswith(b"#"):
+            return
+        (recordChrom,recordStart,recordEnd) = recordSpan(line)
+        if recordChrom != chrom or (end is not None and recordStart > end):
+            return
+        if start is None or recordEnd >= start:
+            yield (offset,line.decode())
+
+#Parses regions given as e.g. "1, 2:100000-200000" into a list of (chrom, start, end), start and end being None
+#for whole chromosomes. Returns None if the string is not formatted correctly.
+def parseRegions(regionString):
+    regions = []
+    for regionField in regionString.replace(",", " ").split():
+        if ":" in regionField:
+            (chrom,span) = regionField.split(":", 1)
+            try:
+                (start,end) = [int(pos) for pos in span.split("-")]
+            except ValueError:
+                return None
+            regions.append((chromosomeName(chrom),start,end))
+        else:
+            regions.append((chromosomeName(regionField),None,None))
+    return regions